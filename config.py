@@ -43,6 +43,43 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     # Esquema preferido para generar URLs externas (útil para OAuth tras proxy)
     PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME', 'http')
+    # Usar static/dist/manifest.json (scripts/build_static.py) si existe; 0 para desactivarlo
+    STATIC_FINGERPRINT = os.environ.get('STATIC_FINGERPRINT', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+    # Generar derivados WebP/AVIF de las imágenes subidas en segundo plano (0 = en la misma petición)
+    IMAGE_DERIVATIVES_ASYNC = os.environ.get('IMAGE_DERIVATIVES_ASYNC', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+    # Compresión de respuestas (utils/compression.py)
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', '4'))
+    # Delegar la entrega de /media y tickets al proxy: '', 'x-accel' (nginx) o 'x-sendfile' (utils/file_offload.py)
+    FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD', '').strip().lower()
+    X_ACCEL_UPLOADS_PREFIX = os.environ.get('X_ACCEL_UPLOADS_PREFIX', '/_protected/uploads/')
+    # Caché de páginas públicas para anónimos (utils/page_cache.py); TTLs en segundos
+    PAGE_CACHE = os.environ.get('PAGE_CACHE', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', '300'))
+    PAGE_CACHE_VERSION_TTL = float(os.environ.get('PAGE_CACHE_VERSION_TTL', '5'))
+    # ETag / 304 en páginas públicas y JSON de calendario (utils/conditional.py)
+    CONDITIONAL_GET = os.environ.get('CONDITIONAL_GET', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+    # Identificador del build para los ETag; si falta se deriva del manifiesto y las plantillas
+    BUILD_ID = os.environ.get('BUILD_ID', '')
+    # Sesiones del lado del servidor (utils/server_session.py): 'db', 'filesystem' o 'cookie'
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'db').strip().lower()
+    SESSION_FILE_DIR = os.environ.get('SESSION_FILE_DIR', '')
+    SESSION_SWEEP_INTERVAL = int(os.environ.get('SESSION_SWEEP_INTERVAL', '300'))
+    # Bandeja de salida de correo (utils/email_outbox.py): 'thread' entrega desde cada proceso
+    # web, 'off' la deja a scripts/outbox_worker.py. Tiempos en segundos
+    EMAIL_OUTBOX_WORKER = os.environ.get('EMAIL_OUTBOX_WORKER', 'thread').strip().lower()
+    EMAIL_OUTBOX_POLL = float(os.environ.get('EMAIL_OUTBOX_POLL', '30'))
+    EMAIL_OUTBOX_BATCH = int(os.environ.get('EMAIL_OUTBOX_BATCH', '50'))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+    EMAIL_OUTBOX_BACKOFF = float(os.environ.get('EMAIL_OUTBOX_BACKOFF', '60'))
+    EMAIL_OUTBOX_LEASE = int(os.environ.get('EMAIL_OUTBOX_LEASE', '300'))
+    # Entrega en paralelo (utils/email_dispatch.py): hilos/conexiones SMTP y mensajes por segundo (0 = sin límite).
+    # El límite es para todo el despliegue: con él, un solo proceso entrega a la vez (email_sender_lease)
+    EMAIL_DISPATCH_WORKERS = int(os.environ.get('EMAIL_DISPATCH_WORKERS', '4'))
+    EMAIL_RATE_LIMIT = float(os.environ.get('EMAIL_RATE_LIMIT', '0'))
+    EMAIL_RATE_BURST = int(os.environ.get('EMAIL_RATE_BURST', '0'))
     
     # Configuración adaptable según el tipo de base de datos
     if 'sqlite' in SQLALCHEMY_DATABASE_URI:
@@ -10,4 +10,32 @@ timeout = 120  # Aumentar timeout a 2 minutos
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 100
-preload_app = False  # Cambiar a False para evitar problemas de inicialización
\ No newline at end of file
+# La app se crea una sola vez en el maestro (create_app: migraciones, OAuth, Jinja) y los
+# workers la heredan por copy-on-write; el pool de conexiones se descarta tras el fork.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def when_ready(server):
+    # Antes de crear workers: compilar plantillas en el maestro para compartirlas
+    if not preload_app:
+        return
+    try:
+        from run import app, warm_templates
+        n = warm_templates(app)
+        server.log.info("Plantillas precompiladas antes del fork: %s", n)
+    except Exception as e:
+        server.log.warning("No se pudieron precompilar plantillas: %s", e)
+
+
+def post_fork(server, worker):
+    # Cada worker necesita sus propias conexiones: no reutilizar sockets heredados del maestro.
+    # close=False solo suelta las referencias sin cerrar las conexiones del padre.
+    if not preload_app:
+        return
+    try:
+        from run import app
+        from utils.extensions import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+    except Exception as e:
+        server.log.warning("No se pudo reiniciar el pool de BD tras el fork: %s", e)
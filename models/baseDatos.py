@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.dialects import mysql
 from utils.extensions import db
 """
 Los modelos usan la configuración de SQLAlchemy definida en Flask (app.config['SQLALCHEMY_DATABASE_URI']).
@@ -188,6 +189,137 @@ class Reserva(db.Model):
     estado = db.Column(db.String(20), nullable=False, default='Activa')  # Activa, Completada, Cancelada
     total = db.Column(db.Float, nullable=True)
 
+    # Sin backref: solo navegación desde la reserva (los listados usan joinedload/selectinload)
+    habitacion = db.relationship('nuevaHabitacion', lazy='select')
+    usuario = db.relationship('Usuario', lazy='select')
+    ticket = db.relationship('TicketHospedaje', uselist=False, lazy='select')
+    datos_hospedaje = db.relationship('ReservaDatosHospedaje', uselist=False, lazy='select')
+
+
+# ------------------------------
+# Sellos de versión para cachés en memoria (compartidos entre workers)
+# ------------------------------
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_version'
+
+    clave = db.Column(db.String(100), primary_key=True)  # ej. 'reservas:12'
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.clave}={self.version}>"
+
+
+# ------------------------------
+# Pasos de migración de esquema aplicados (ver utils/migrations.py)
+# ------------------------------
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nombre = db.Column(db.String(100), nullable=False)
+    aplicada_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchemaVersion {self.version} {self.nombre}>"
+
+
+# ------------------------------
+# Sesiones del lado del servidor (ver utils/server_session.py)
+# ------------------------------
+class SessionRecord(db.Model):
+    __tablename__ = 'server_session'
+
+    sid = db.Column(db.String(64), primary_key=True)  # valor opaco de la cookie
+    datos = db.Column(db.Text, nullable=False)  # dict de la sesión serializado (JSON etiquetado de Flask)
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SessionRecord {self.sid[:8]}… expira={self.expira}>"
+
+
+# ------------------------------
+# Bandeja de salida de correo (ver utils/email_outbox.py)
+# ------------------------------
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    clave = db.Column(db.String(150), nullable=True, unique=True)  # idempotencia: mismo correo, una sola vez
+    destinatario = db.Column(db.String(255), nullable=False)
+    asunto = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'), nullable=False)
+    # JSON [{"nombre": ..., "datos": base64}] (se vacía al enviarse)
+    adjuntos = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=True)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente', index=True)  # pendiente, enviando, enviado, fallido
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=6)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    bloqueado_hasta = db.Column(db.DateTime, nullable=True)  # lease del worker que lo está enviando
+    ultimo_error = db.Column(db.Text, nullable=True)
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow)
+    enviado_en = db.Column(db.DateTime, nullable=True)
+    latencia_ms = db.Column(db.Integer, nullable=True)  # duración del último intento de envío SMTP
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} {self.estado} -> {self.destinatario}>"
+
+
+class EmailSenderLease(db.Model):
+    """Turno de envío: con EMAIL_RATE_LIMIT solo el proceso que lo tiene entrega correos."""
+    __tablename__ = 'email_sender_lease'
+
+    nombre = db.Column(db.String(50), primary_key=True)
+    dueno = db.Column(db.String(150), nullable=True)  # host:pid:hilo
+    hasta = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<EmailSenderLease {self.nombre} {self.dueno} hasta {self.hasta}>"
+
+
+class EmailDispatchRun(db.Model):
+    """Resumen de una ronda de entrega de la bandeja (panel de notificaciones)."""
+    __tablename__ = 'email_dispatch_run'
+
+    id = db.Column(db.Integer, primary_key=True)
+    origen = db.Column(db.String(30), nullable=False)  # worker, script, notificaciones...
+    iniciado_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    duracion_ms = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    enviados = db.Column(db.Integer, nullable=False, default=0)
+    reintentos = db.Column(db.Integer, nullable=False, default=0)
+    fallidos = db.Column(db.Integer, nullable=False, default=0)
+    p50_ms = db.Column(db.Float, nullable=True)
+    p95_ms = db.Column(db.Float, nullable=True)
+    detalle = db.Column(db.Text, nullable=True)  # JSON con los fallos de la ronda
+
+    def __repr__(self):
+        return f"<EmailDispatchRun {self.id} {self.origen} {self.enviados}/{self.total}>"
+
+
+# ------------------------------
+# Derivados responsivos de imágenes (ver utils/image_derivatives.py)
+# ------------------------------
+class ImageDerivative(db.Model):
+    __tablename__ = 'image_derivative'
+
+    id = db.Column(db.Integer, primary_key=True)
+    origen = db.Column(db.String(255), nullable=False, index=True)  # 'uploads/<f>' o 'static/<ruta>'
+    variante = db.Column(db.String(20), nullable=False)  # thumb, card, hero, blur
+    formato = db.Column(db.String(10), nullable=False)  # webp, avif
+    ancho = db.Column(db.Integer, nullable=False)
+    alto = db.Column(db.Integer, nullable=False)
+    ruta = db.Column(db.String(255), nullable=True)  # relativa a instance/uploads (servida por /media)
+    bytes = db.Column(db.Integer, nullable=False, default=0)
+    datos = db.Column(db.Text, nullable=True)  # data URI del placeholder difuminado
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('origen', 'variante', 'formato', name='uq_image_derivative'),
+    )
+
+    def __repr__(self):
+        return f"<ImageDerivative {self.origen} {self.variante}.{self.formato}>"
+
 
 # ------------------------------
 # Datos de huéspedes capturados al reservar (antes del pago)
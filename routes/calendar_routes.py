@@ -1,73 +1,106 @@
-from flask import Blueprint, render_template, request, session, redirect, url_for, flash
-from models.baseDatos import db, ReservaRestaurante, Reserva, Usuario, nuevaHabitacion, TicketHospedaje
-from datetime import datetime
+from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify
+from datetime import datetime, timedelta
+from utils.admin_calendar import VISTAS, ESTADOS_MATRIZ, window_for, reservation_data, occupancy_matrix, history_data
 
 calendar_bp = Blueprint('calendar_routes', __name__, url_prefix='/calendar')
 
+HISTORIAL_LIMITE = 500
+
+
+def _es_admin():
+    user = session.get('user')
+    return bool(user and user.get('rol') == 'admin')
+
+
+def _ventana_desde_args():
+    """Lee ?vista=mes|semana&fecha=YYYY-MM-DD y devuelve (vista, desde, hasta) o None si son inválidos."""
+    vista = (request.args.get('vista') or 'mes').strip().lower()
+    if vista not in VISTAS:
+        return None
+    fecha_raw = request.args.get('fecha')
+    try:
+        fecha = datetime.strptime(fecha_raw, '%Y-%m-%d').date() if fecha_raw else datetime.now().date()
+    except Exception:
+        return None
+    desde, hasta = window_for(vista, fecha)
+    return vista, desde, hasta
+
+
 @calendar_bp.route('/admin/historial')
 def admin_historial():
     """Ruta independiente para el calendario de administración"""
     # Verificar que sea administrador
-    user = session.get('user')
-    if not user or user.get('rol') != 'admin':
+    if not _es_admin():
         flash('Acceso restringido solo para administradores', 'warning')
         return redirect(url_for('registro.login'))
-    
-    from sqlalchemy import or_
-    
-    # Obtener el mes y año actual
+
+    # Mes visible (por defecto el actual); el resto se pide a /calendar/admin/reservas al navegar
     now = datetime.now()
-    current_year = now.year
-    current_month = now.month
-    
-    # Obtener reservas de restaurante
-    reservas_restaurante = db.session.query(ReservaRestaurante).all()
-    restaurant_data = []
-    
-    for reserva in reservas_restaurante:
-        if reserva.fecha_reserva:
-            restaurant_data.append({
-                'id': reserva.id,
-                'date': reserva.fecha_reserva.strftime('%Y-%m-%d'),
-                'time': reserva.fecha_reserva.strftime('%H:%M'),
-                'guests': reserva.cupo_personas,
-                'name': reserva.nombre_cliente or 'Cliente',
-                'ticket': reserva.ticket_numero,
-                'status': reserva.estado
-            })
-    
-    # Obtener reservas de hospedaje con relaciones
-    reservas_hospedaje = db.session.query(Reserva)\
-        .join(Usuario, Reserva.usuario_id == Usuario.idUsuario)\
-        .join(nuevaHabitacion, Reserva.habitacion_id == nuevaHabitacion.id)\
-        .all()
-    
-    hotel_data = []
-    
-    for reserva in reservas_hospedaje:
-        # Obtener ticket asociado si existe
-        ticket = TicketHospedaje.query.filter_by(reserva_id=reserva.id).first()
-        
-        hotel_data.append({
-            'id': reserva.id,
-            'checkIn': reserva.check_in.strftime('%Y-%m-%d'),
-            'checkOut': reserva.check_out.strftime('%Y-%m-%d') if reserva.check_out else '',
-            'room': reserva.habitacion.numero or reserva.habitacion.nombre,
-            'type': reserva.habitacion.plan or 'Standard',
-            'guest': ticket.nombre1 if ticket else reserva.usuario.usuario,
-            'status': reserva.estado,
-            'nights': (reserva.check_out - reserva.check_in).days if reserva.check_out else 1
-        })
-    
-    # Preparar datos para el template
-    reservation_data = {
-        'restaurant': restaurant_data,
-        'hotel': hotel_data
-    }
-    
+    try:
+        current_year = int(request.args.get('year', now.year))
+        current_month = int(request.args.get('month', now.month))
+        desde, hasta = window_for('mes', datetime(current_year, current_month, 1).date())
+    except Exception:
+        current_year, current_month = now.year, now.month
+        desde, hasta = window_for('mes', now.date())
+
     return render_template('dashboard/admin_calendar.html',
                          current_year=current_year,
                          current_month=current_month,
-                         reservation_data=reservation_data)
+                         reservation_data=reservation_data(desde, hasta))
+
+
+@calendar_bp.route('/admin/reservas')
+def admin_reservas():
+    """Reservas de restaurante y hospedaje de la ventana visible (mes o semana)."""
+    if not _es_admin():
+        return jsonify({'ok': False, 'error': 'forbidden'}), 403
+    ventana = _ventana_desde_args()
+    if not ventana:
+        return jsonify({'ok': False, 'error': 'invalid_params'}), 400
+    vista, desde, hasta = ventana
+    data = reservation_data(desde, hasta)
+    return jsonify({
+        'ok': True,
+        'vista': vista,
+        'desde': desde.isoformat(),
+        'hasta': (hasta - timedelta(days=1)).isoformat(),
+        'restaurant': data['restaurant'],
+        'hotel': data['hotel'],
+    })
+
+
+@calendar_bp.route('/admin/ocupacion')
+def admin_ocupacion():
+    """Matriz de ocupación habitaciones × días para la ventana visible (mes o semana)."""
+    if not _es_admin():
+        return jsonify({'ok': False, 'error': 'forbidden'}), 403
+    ventana = _ventana_desde_args()
+    if not ventana:
+        return jsonify({'ok': False, 'error': 'invalid_params'}), 400
+    vista, desde, hasta = ventana
+    habitaciones, matriz, ocupadas = occupancy_matrix(desde, hasta)
+    n_days = (hasta - desde).days
+    return jsonify({
+        'ok': True,
+        'vista': vista,
+        'desde': desde.isoformat(),
+        'hasta': (hasta - timedelta(days=1)).isoformat(),
+        'dias': [(desde + timedelta(days=i)).isoformat() for i in range(n_days)],
+        'estados': list(ESTADOS_MATRIZ),
+        'habitaciones': habitaciones,
+        'matriz': matriz,
+        'ocupadas_por_dia': ocupadas,
+    })
 
 
+@calendar_bp.route('/admin/historial/datos')
+def admin_historial_datos():
+    """Reservas pasadas para el modal de historial (?tipo=restaurant|hotel), las más recientes primero."""
+    if not _es_admin():
+        return jsonify({'ok': False, 'error': 'forbidden'}), 403
+    tipo = (request.args.get('tipo') or 'restaurant').strip().lower()
+    if tipo not in ('restaurant', 'hotel'):
+        return jsonify({'ok': False, 'error': 'invalid_params'}), 400
+    items, truncado = history_data(tipo, HISTORIAL_LIMITE)
+    return jsonify({'ok': True, 'tipo': tipo, 'items': items, 'truncado': truncado, 'limite': HISTORIAL_LIMITE})
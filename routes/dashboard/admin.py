@@ -3,29 +3,15 @@ from models.baseDatos import db, nuevaHabitacion, Usuario, InventarioHabitacion,
 from datetime import datetime
 from flask import session
 from flask import send_file, make_response
+from utils.occupancy import occupancy_index
+from utils.image_derivatives import process_upload
+from utils.page_cache import page_cache
+from utils.room_catalog import room_catalog
+from sqlalchemy.orm import joinedload, selectinload
 import io, csv
-try:
-    from openpyxl import Workbook
-    from openpyxl.utils import get_column_letter
-except Exception:
-    Workbook = None
-    def get_column_letter(col_index:int):
-        # Fallback simple mapping A..Z, AA.. as naive
-        letters = ''
-        i = col_index
-        while i:
-            i, rem = divmod(i - 1, 26)
-            letters = chr(65 + rem) + letters
-        return letters or 'A'
 from datetime import date
-try:
-    # ReportLab para exportar PDF del inventario
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import inch
-except Exception:
-    # Si no está instalado en dev, la ruta seguirá fallando hasta instalar requirements
-    letter = None
+# openpyxl y reportlab solo se cargan al exportar (no en cada arranque de worker)
+from utils.lazy_imports import openpyxl, openpyxl_utils, rl_canvas, rl_pagesizes
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -72,6 +58,8 @@ def hospedaje_actualizar(habitacion_id):
             save_path = os.path.join(img_folder, unique)
             imagen_file.save(save_path)
             habitacion.imagen = f"img/uploads/{unique}"
+            process_upload(habitacion.imagen)
+        page_cache.invalidate('habitaciones')
         db.session.commit()
         flash("✅ Habitación actualizada correctamente", "success")
     except Exception as e:
@@ -85,28 +73,11 @@ def hospedaje_actualizar(habitacion_id):
 # ==========================
 @admin_bp.route("/hospedaje")
 def hospedaje_index():
-    # Optional text search
+    # Búsqueda de texto opcional sobre el índice ya construido del catálogo
     q = (request.args.get('q') or '').strip().lower()
-    habitaciones = nuevaHabitacion.query.all()
-    if q:
-        def _match(h):
-            return any([(h.nombre or '').lower().find(q) >= 0,
-                        (h.plan or '').lower().find(q) >= 0,
-                        (h.estado or '').lower().find(q) >= 0])
-        habitaciones = [h for h in habitaciones if _match(h)]
-    # Agrupar por plan en Python para evitar errores de ordenación en Jinja (None vs None)
-    habitaciones_por_plan = {}
-    for h in habitaciones:
-        label = (h.plan or '').strip() or 'Sin plan'
-        habitaciones_por_plan.setdefault(label, []).append(h)
-    # Ordenar cada grupo por número y luego por nombre
-    for k, lst in habitaciones_por_plan.items():
-        lst.sort(key=lambda x: (x.numero is None, x.numero if x.numero is not None else 0, (x.nombre or '').lower()))
-    # Orden deseado de planes
-    base_order = ['Oro', 'Plata', 'Bronce', 'Sin plan']
-    # Incluir cualquier otro plan que exista
-    extras = [p for p in habitaciones_por_plan.keys() if p not in base_order]
-    plan_order = [p for p in base_order if p in habitaciones_por_plan] + sorted(extras)
+    catalog = room_catalog.snapshot()
+    habitaciones = catalog.search(q)
+    habitaciones_por_plan, plan_order = catalog.grouped(habitaciones if q else None)
     current_year = datetime.utcnow().year
     return render_template(
         "dashboard/hospedaje_admin.html",
@@ -152,16 +123,16 @@ def restaurante_reserva_estado(reserva_id):
 @admin_bp.route('/hospedaje/reservas')
 def hospedaje_reservas_list():
     estado = (request.args.get('estado') or '').strip()
-    q = Reserva.query.order_by(Reserva.check_in.desc())
+    q = (
+        Reserva.query
+        .options(joinedload(Reserva.habitacion), joinedload(Reserva.usuario), selectinload(Reserva.ticket))
+        .order_by(Reserva.check_in.desc())
+    )
     if estado:
         q = q.filter(Reserva.estado == estado)
     reservas = q.limit(200).all()
-    # Adjuntar ticket si existe
-    tickets_map = {}
-    for r in reservas:
-        t = TicketHospedaje.query.filter_by(reserva_id=r.id).first()
-        if t:
-            tickets_map[r.id] = t
+    # Adjuntar ticket si existe (ya cargado en la misma tanda de consultas)
+    tickets_map = {r.id: r.ticket for r in reservas if r.ticket}
     return render_template('dashboard/hospedaje_reservas_admin.html', reservas=reservas, tickets=tickets_map, estado=estado)
 
 
@@ -181,6 +152,7 @@ def hospedaje_reserva_estado(reserva_id: int):
         return redirect(url_for('admin.hospedaje_reservas_list'))
     try:
         r.estado = nuevo
+        occupancy_index.invalidate(r.habitacion_id)
         db.session.commit()
         flash('Estado actualizado', 'success')
     except Exception as e:
@@ -286,6 +258,7 @@ def _save_uploaded_image(file_field_name: str):
         os.makedirs(inst_uploads, exist_ok=True)
         save_path = os.path.join(inst_uploads, unique)
         img.save(save_path)
+        process_upload(f"uploads/{unique}")
         return f"uploads/{unique}"
     return None
 
@@ -302,6 +275,7 @@ def home_post_create():
         if imagen_path:
             post.imagen = imagen_path
         db.session.add(post)
+        page_cache.invalidate('posts')
         db.session.commit()
         flash('Sección creada correctamente', 'success')
     except Exception as e:
@@ -318,6 +292,7 @@ def home_post_update(post_id):
         new_img = _save_uploaded_image('imagen')
         if new_img:
             post.imagen = new_img
+        page_cache.invalidate('posts')
         db.session.commit()
         flash('Sección actualizada', 'success')
     except Exception as e:
@@ -330,6 +305,7 @@ def home_post_delete(post_id):
     post = Post.query.get_or_404(post_id)
     try:
         db.session.delete(post)
+        page_cache.invalidate('posts')
         db.session.commit()
         flash('Sección eliminada', 'warning')
     except Exception as e:
@@ -352,6 +328,7 @@ def home_post_orden(post_id):
             neighbor = Post.query.filter_by(categoria='home').filter(Post.orden > post.orden).order_by(Post.orden.asc()).first()
         if neighbor:
             post.orden, neighbor.orden = neighbor.orden, post.orden
+            page_cache.invalidate('posts')
             db.session.commit()
         else:
             flash('No hay más elementos para reordenar', 'info')
@@ -651,7 +628,11 @@ def inventario_export_xlsx():
         return redirect(url_for('admin.inventarios_list'))
     rec = InventarioHabitacion.query.get_or_404(rec_id)
 
-    wb = Workbook()
+    if not openpyxl.available():
+        flash('Exportación a Excel no disponible. Instala dependencias.', 'danger')
+        return redirect(url_for('admin.inventarios_list'))
+
+    wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = 'Inventario'
 
@@ -690,7 +671,7 @@ def inventario_export_xlsx():
     # Auto ancho de columnas básico
     for col in ws.columns:
         max_len = 10
-        col_letter = get_column_letter(col[0].column)
+        col_letter = openpyxl_utils.get_column_letter(col[0].column)
         for cell in col:
             try:
                 max_len = max(max_len, len(str(cell.value)))
@@ -713,12 +694,13 @@ def inventario_export_pdf():
         return redirect(url_for('admin.inventarios_list'))
     rec = InventarioHabitacion.query.get_or_404(rec_id)
 
-    if letter is None:
+    if not rl_canvas.available():
         flash('Exportación a PDF no disponible. Instala dependencias.', 'danger')
         return redirect(url_for('admin.inventarios_list'))
 
     buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
+    letter = rl_pagesizes.letter
+    c = rl_canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
 
     left = 50
@@ -795,7 +777,11 @@ def inventarios_export_xlsx():
         flash('No se encontraron registros', 'warning')
         return redirect(url_for('admin.inventarios_list'))
 
-    wb = Workbook()
+    if not openpyxl.available():
+        flash('Exportación a Excel no disponible. Instala dependencias.', 'danger')
+        return redirect(url_for('admin.inventarios_list'))
+
+    wb = openpyxl.Workbook()
     # Eliminar hoja por defecto si vamos a crear varias
     ws0 = wb.active
     ws0.title = 'Resumen'
@@ -837,7 +823,7 @@ def inventarios_export_xlsx():
             ])
         for col in ws.columns:
             max_len = 10
-            col_letter = get_column_letter(col[0].column)
+            col_letter = openpyxl_utils.get_column_letter(col[0].column)
             for cell in col:
                 try: max_len = max(max_len, len(str(cell.value)))
                 except Exception: pass
@@ -885,6 +871,7 @@ def hospedaje_nueva():
             save_path = os.path.join(img_folder, unique)
             imagen_file.save(save_path)
             imagen_path = f"img/uploads/{unique}"
+            process_upload(imagen_path)
 
         habitacion = nuevaHabitacion(
             nombre=nombre,
@@ -898,6 +885,7 @@ def hospedaje_nueva():
             imagen=imagen_path
         )
         db.session.add(habitacion)
+        page_cache.invalidate('habitaciones')
         db.session.commit()
 
         flash("✅ Habitación creada correctamente", "success")
@@ -918,6 +906,7 @@ def hospedaje_eliminar(habitacion_id):
     habitacion = nuevaHabitacion.query.get_or_404(habitacion_id)
     try:
         db.session.delete(habitacion)
+        page_cache.invalidate('habitaciones')
         db.session.commit()
         flash("🗑️ Habitación eliminada", "warning")
     except Exception as e:
@@ -955,6 +944,7 @@ def admin_restaurante_nuevo():
         next_order = (last.orden + 1) if last else 1
         p = PlatoRestaurante(nombre=nombre, categoria=categoria, precio=precio, descripcion=descripcion, icono=icono, imagen=imagen_path, orden=next_order)
         db.session.add(p)
+        page_cache.invalidate('menu')
         db.session.commit()
         total = PlatoRestaurante.query.count()
         current_app.logger.info(f"[RESTO] Creado plato '{p.nombre}' cat={p.categoria} orden={p.orden}. Total ahora={total}")
@@ -979,6 +969,7 @@ def admin_restaurante_editar(plato_id):
             new_img = _save_uploaded_image('imagen')
             if new_img:
                 plato.imagen = new_img
+            page_cache.invalidate('menu')
             db.session.commit()
             flash('Plato actualizado', 'success')
             return redirect(url_for("admin.admin_restaurante"))
@@ -996,6 +987,7 @@ def admin_restaurante_eliminar(plato_id):
     p = PlatoRestaurante.query.get_or_404(plato_id)
     try:
         db.session.delete(p)
+        page_cache.invalidate('menu')
         db.session.commit()
         flash('Plato eliminado', 'warning')
     except Exception as e:
@@ -1015,6 +1007,7 @@ def admin_restaurante_orden(pid):
             neighbor = PlatoRestaurante.query.filter(PlatoRestaurante.categoria == p.categoria, PlatoRestaurante.orden > p.orden).order_by(PlatoRestaurante.orden.asc()).first()
         if neighbor:
             p.orden, neighbor.orden = neighbor.orden, p.orden
+            page_cache.invalidate('menu')
             db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -1048,8 +1041,10 @@ def admin_nosotros_nuevo():
         path = os.path.join(img_folder, unique)
         img.save(path)
         imagen = f"img/uploads/{unique}"
+        process_upload(imagen)
     p = Post(titulo=titulo, contenido=contenido, categoria=categoria, activo=activo, imagen=imagen)
     db.session.add(p)
+    page_cache.invalidate('posts')
     db.session.commit()
     flash('Contenido creado', 'success')
     return redirect(url_for('admin.admin_nosotros'))
@@ -1073,6 +1068,8 @@ def admin_nosotros_editar(pid):
         path = os.path.join(img_folder, unique)
         img.save(path)
         p.imagen = f"img/uploads/{unique}"
+        process_upload(p.imagen)
+    page_cache.invalidate('posts')
     db.session.commit()
     flash('Contenido actualizado', 'success')
     return redirect(url_for('admin.admin_nosotros'))
@@ -1081,6 +1078,7 @@ def admin_nosotros_editar(pid):
 def admin_nosotros_eliminar(pid):
     p = Post.query.get_or_404(pid)
     db.session.delete(p)
+    page_cache.invalidate('posts')
     db.session.commit()
     flash('Contenido eliminado', 'warning')
     return redirect(url_for('admin.admin_nosotros'))
@@ -1089,62 +1087,22 @@ def admin_nosotros_eliminar(pid):
 @admin_bp.route('/calendar/historial')
 def calendar_historial():
     """Ruta para mostrar el calendario con historial de reservas"""
-    from sqlalchemy import or_
-    
-    # Obtener el mes y año actual
+    from utils.admin_calendar import window_for, reservation_data
+
+    # Mes visible (por defecto el actual); solo se cargan las reservas de esa ventana
     now = datetime.now()
-    current_year = now.year
-    current_month = now.month
-    
-    # Obtener reservas de restaurante
-    reservas_restaurante = db.session.query(ReservaRestaurante).all()
-    restaurant_data = []
-    
-    for reserva in reservas_restaurante:
-        if reserva.fecha_reserva:
-            restaurant_data.append({
-                'id': reserva.id,
-                'date': reserva.fecha_reserva.strftime('%Y-%m-%d'),
-                'time': reserva.fecha_reserva.strftime('%H:%M'),
-                'guests': reserva.cupo_personas,
-                'name': reserva.nombre_cliente or 'Cliente',
-                'ticket': reserva.ticket_numero,
-                'status': reserva.estado
-            })
-    
-    # Obtener reservas de hospedaje con relaciones
-    reservas_hospedaje = db.session.query(Reserva)\
-        .join(Usuario, Reserva.usuario_id == Usuario.idUsuario)\
-        .join(nuevaHabitacion, Reserva.habitacion_id == nuevaHabitacion.id)\
-        .all()
-    
-    hotel_data = []
-    
-    for reserva in reservas_hospedaje:
-        # Obtener ticket asociado si existe
-        ticket = TicketHospedaje.query.filter_by(reserva_id=reserva.id).first()
-        
-        hotel_data.append({
-            'id': reserva.id,
-            'checkIn': reserva.check_in.strftime('%Y-%m-%d'),
-            'checkOut': reserva.check_out.strftime('%Y-%m-%d') if reserva.check_out else '',
-            'room': reserva.habitacion.numero or reserva.habitacion.nombre,
-            'type': reserva.habitacion.plan or 'Standard',
-            'guest': ticket.nombre1 if ticket else reserva.usuario.usuario,
-            'status': reserva.estado,
-            'nights': (reserva.check_out - reserva.check_in).days if reserva.check_out else 1
-        })
-    
-    # Preparar datos para el template
-    reservation_data = {
-        'restaurant': restaurant_data,
-        'hotel': hotel_data
-    }
-    
+    try:
+        current_year = int(request.args.get('year', now.year))
+        current_month = int(request.args.get('month', now.month))
+        desde, hasta = window_for('mes', date(current_year, current_month, 1))
+    except Exception:
+        current_year, current_month = now.year, now.month
+        desde, hasta = window_for('mes', now.date())
+
     return render_template('dashboard/calendar_historial.html',
                          current_year=current_year,
                          current_month=current_month,
-                         reservation_data=reservation_data)
+                         reservation_data=reservation_data(desde, hasta))
 
 
 # ========================================
@@ -1190,7 +1148,18 @@ def notifications_panel():
         'total_users': total_users
     }
     
-    return render_template('dashboard/notifications_panel.html', stats=stats)
+    # Estado de la bandeja de salida y últimas rondas de entrega (utils/email_dispatch.py)
+    from utils import email_outbox
+    from utils.email_dispatch import recent_runs
+    try:
+        outbox = email_outbox.stats()
+        runs = recent_runs(10)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning('No se pudo leer el estado de la bandeja de correo: %s', e)
+        outbox, runs = None, []
+
+    return render_template('dashboard/notifications_panel.html', stats=stats, outbox=outbox, runs=runs)
 
 
 @admin_bp.route('/notifications/send-manual', methods=['POST'])
@@ -1204,18 +1173,18 @@ def send_manual_notifications():
         if notification_type == 'daily':
             checkins_sent, checkouts_sent = send_daily_notifications()
             total_sent = checkins_sent + checkouts_sent
-            flash(f'Notificaciones diarias enviadas: {checkins_sent} check-ins, {checkouts_sent} check-outs', 'success')
+            flash(f'Notificaciones diarias encoladas: {checkins_sent} check-ins, {checkouts_sent} check-outs', 'success')
             
         elif notification_type == 'reminders':
             checkin_reminders, checkout_reminders = send_reminder_notifications()
             total_sent = checkin_reminders + checkout_reminders
-            flash(f'Recordatorios enviados: {checkin_reminders} check-ins, {checkout_reminders} check-outs', 'success')
+            flash(f'Recordatorios encolados: {checkin_reminders} check-ins, {checkout_reminders} check-outs', 'success')
             
         elif notification_type == 'all':
             checkins_sent, checkouts_sent = send_daily_notifications()
             checkin_reminders, checkout_reminders = send_reminder_notifications()
             total_sent = checkins_sent + checkouts_sent + checkin_reminders + checkout_reminders
-            flash(f'Todas las notificaciones enviadas: {total_sent} emails en total', 'success')
+            flash(f'Todas las notificaciones encoladas: {total_sent} emails en total', 'success')
             
         else:
             flash('Tipo de notificación no válido', 'danger')
@@ -1235,11 +1204,11 @@ def test_notification(reserva_id):
     
     try:
         if notification_type == 'checkin':
-            success = send_checkin_notification(reserva_id)
-            message = f'Notificación de check-in {"enviada" if success else "falló"} para reserva #{reserva_id}'
+            success = send_checkin_notification(reserva_id, dedupe=False)
+            message = f'Notificación de check-in {"encolada" if success else "falló"} para reserva #{reserva_id}'
         else:
-            success = send_checkout_notification(reserva_id)
-            message = f'Notificación de check-out {"enviada" if success else "falló"} para reserva #{reserva_id}'
+            success = send_checkout_notification(reserva_id, dedupe=False)
+            message = f'Notificación de check-out {"encolada" if success else "falló"} para reserva #{reserva_id}'
             
         flash(message, 'success' if success else 'danger')
         
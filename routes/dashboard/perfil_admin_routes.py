@@ -3,6 +3,7 @@ from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
 from models.baseDatos import db, Usuario, PerfilAdmin
+from utils.image_derivatives import process_upload
 
 perfil_admin_bp = Blueprint('perfil_admin', __name__, url_prefix='/admin/perfil')
 
@@ -60,6 +61,7 @@ def update():
         avatar_file.save(save_path)
         # Guardar ruta relativa para url_for('static', filename=...)
         usuario.avatar = f"img/avatars/{unique}"
+        process_upload(usuario.avatar)
 
     # Actualizar perfil admin
     perfil.cargo = request.form.get('cargo') or perfil.cargo
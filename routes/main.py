@@ -1,13 +1,19 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, current_app, flash
 from jinja2 import TemplateNotFound
 from datetime import datetime
-from models.baseDatos import nuevaHabitacion, Post, PlatoRestaurante, ResenaExperiencia
+from models.baseDatos import Post, ResenaExperiencia
+from utils.page_cache import page_cache
+from utils.conditional import conditional
+from utils.room_catalog import room_catalog
+from utils.menu_catalog import menu_catalog
 
 main_bp = Blueprint('main', __name__)
 
 #Rutas Home ---------------------------------------------------------
  
 @main_bp.route('/')
+@conditional('contenido:posts', 'contenido:imagenes')
+@page_cache.cached('posts')
 def home():
     # Contenido dinámico del home (ordenado por 'orden')
     posts = Post.query.filter_by(categoria='home').order_by(Post.orden.asc(), Post.creado_en.desc()).all()
@@ -24,32 +30,21 @@ def home():
         )
 
 @main_bp.route('/hospedaje')
+@conditional('contenido:habitaciones', 'contenido:imagenes')
+@page_cache.cached('habitaciones')
 def hospedaje():
-    # Mostrar habitaciones públicas organizadas sin depender de groupby Jinja (evita TypeError con None)
-    habitaciones = nuevaHabitacion.query.order_by(nuevaHabitacion.numero.asc()).all()
-
-    # Agrupar en Python con fallback de plan y orden preferido
-    prefer_order = ["Oro", "Plata", "Bronce", "Sin plan"]
-    habitaciones_por_plan = {}
-    for h in habitaciones:
-        plan_label = (h.plan or '').strip() or 'Sin plan'
-        habitaciones_por_plan.setdefault(plan_label, []).append(h)
-
-    # Ordenar cada grupo por numero si existe, luego por id
-    for key, items in habitaciones_por_plan.items():
-        items.sort(key=lambda x: (x.numero if getattr(x, 'numero', None) is not None else 1_000_000, x.id))
-
-    # Orden estable de planes
-    presentes = list(habitaciones_por_plan.keys())
-    plan_order = [p for p in prefer_order if p in presentes] + sorted([p for p in presentes if p not in prefer_order])
-
-    return render_template('home/Hospedaje.html', habitaciones=habitaciones, habitaciones_por_plan=habitaciones_por_plan, plan_order=plan_order)
+    # Habitaciones públicas agrupadas por plan en orden canónico (utils/room_catalog.py)
+    catalog = room_catalog.snapshot()
+    habitaciones_por_plan, plan_order = catalog.grouped()
+    return render_template('home/Hospedaje.html', habitaciones=catalog.rooms, habitaciones_por_plan=habitaciones_por_plan, plan_order=plan_order)
 
 @main_bp.route('/restaurante')
 def restaurantes():
     return render_template('home/Restaurante.html')
 
 @main_bp.route('/nosotros')
+@conditional('contenido:posts', 'contenido:imagenes')
+@page_cache.cached('posts')
 def nosotros():
     # Mostrar solo contenido categorizado como 'nosotros'
     posts = Post.query.filter_by(categoria='nosotros', activo=True).order_by(Post.creado_en.desc()).limit(10).all()
@@ -107,6 +102,8 @@ def experiencias():
 #Rutas Usuario -----------------------------------------------------------
 
 @main_bp.route('/home_usuario')
+@conditional('contenido:posts', 'contenido:imagenes')
+@page_cache.cached('posts')
 def home_usuario():
     posts = Post.query.filter_by(categoria='home').order_by(Post.orden.asc(), Post.creado_en.desc()).all()
     return render_template('usuario/home_usuario.html', posts=posts)
@@ -117,19 +114,12 @@ def hospedaje_usuario():
     return redirect(url_for('hospedaje_usuario.hospedaje_usuario'))
 
 @main_bp.route('/restaurante_usuario')
+@conditional('contenido:menu', 'contenido:imagenes')
+@page_cache.cached('menu')
 def restaurante_usuario():
-    # Obtener platos activos, agrupados por categoria
-    platos = PlatoRestaurante.query.filter_by(activo=True).order_by(PlatoRestaurante.categoria.asc(), PlatoRestaurante.orden.asc(), PlatoRestaurante.creado_en.desc()).all()
-    grupos = {}
-    for p in platos:
-        cat = p.categoria or 'Otros'
-        grupos.setdefault(cat, []).append(p)
-    categorias = ['Entradas','Principales','Postres','Bebidas']
-    # mantener orden predefinido y añadir otras categorías al final
-    cat_presentes = [c for c in categorias if c in grupos]
-    extra = [c for c in grupos.keys() if c not in categorias]
-    categorias_final = cat_presentes + extra
-    return render_template('usuario/restaurante_usuario.html', grupos=grupos, categorias=categorias_final)
+    # Platos activos agrupados por categoría (utils/menu_catalog.py)
+    menu = menu_catalog.snapshot()
+    return render_template('usuario/restaurante_usuario.html', grupos=menu.grupos, categorias=menu.categorias)
 
 @main_bp.route('/experiencias_usuario', methods=['GET', 'POST'])
 def experiencias_usuario():
@@ -1,43 +1,22 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from utils.extensions import db, bcrypt, serializer
+from utils.extensions import db, bcrypt
+import utils.extensions as extensions
 import os
 from models.baseDatos import Usuario
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from utils import email_outbox
+import logging
 
 recuperar_bp = Blueprint('recuperar', __name__)
+logger = logging.getLogger(__name__)
 
 # ------------------ Función para enviar correo ------------------
 def enviar_email(destinatario, asunto, cuerpo):
+    # Se encola y lo entrega el worker de la bandeja: la petición no espera al SMTP
     try:
-        host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-        port = int(os.getenv("SMTP_PORT", "587"))
-        remitente = os.getenv("SMTP_USER")
-        password = os.getenv("SMTP_PASSWORD")
-        use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
-        use_ssl = os.getenv("SMTP_USE_SSL", "false").lower() == "true"
-
-        if not remitente or not password:
-            raise RuntimeError("SMTP_USER o SMTP_PASSWORD no configurados")
-
-        msg = MIMEMultipart()
-        msg["From"] = remitente
-        msg["To"] = destinatario
-        msg["Subject"] = asunto
-        msg.attach(MIMEText(cuerpo, "html"))
-
-        if use_ssl:
-            server = smtplib.SMTP_SSL(host, port)
-        else:
-            server = smtplib.SMTP(host, port)
-            if use_tls:
-                server.starttls()
-        server.login(remitente, password)
-        server.sendmail(remitente, destinatario, msg.as_string())
-        server.quit()
+        email_outbox.enqueue(destinatario, asunto, cuerpo)
     except Exception as e:
-        print(f"❌ Error al enviar correo: {e}")
+        db.session.rollback()
+        logger.warning("No se pudo encolar el correo de recuperación: %s", e)
 
 # ------------------ RUTA: Solicitar recuperación ------------------
 @recuperar_bp.route('/recuperar_contrasena', methods=['GET', 'POST'])
@@ -47,7 +26,7 @@ def recuperar_contrasena():
         usuario = Usuario.query.filter_by(correo=correo).first()
 
         if usuario:
-            token = serializer.dumps(correo, salt='password-reset-salt')
+            token = extensions.serializer.dumps(correo, salt='password-reset-salt')
             enlace = url_for('recuperar.restablecer_contrasena', token=token, _external=True)
 
             asunto = "Recuperación de contraseña"
@@ -69,7 +48,7 @@ def recuperar_contrasena():
 @recuperar_bp.route('/restablecer_contrasena/<token>', methods=['GET', 'POST'])
 def restablecer_contrasena(token):
     try:
-        correo = serializer.loads(token, salt='password-reset-salt', max_age=3600)
+        correo = extensions.serializer.loads(token, salt='password-reset-salt', max_age=3600)
     except:
         flash("El enlace es inválido o ha caducado.", "error")
         return redirect(url_for('recuperar.recuperar_contrasena'))
@@ -1,22 +1,23 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from models.baseDatos import db, nuevaHabitacion, Huesped, Reserva, ReservaDatosHospedaje
 from datetime import datetime, date, timedelta
+from sqlalchemy import func, or_
 from sqlalchemy.exc import SQLAlchemyError
+from utils.occupancy import occupancy_index
+from utils.page_cache import page_cache
+from utils.conditional import conditional
+from utils.room_catalog import room_catalog
 
 hospedaje_usuario_bp = Blueprint('hospedaje_usuario', __name__)
 
 @hospedaje_usuario_bp.route('/hospedaje_usuario')
+@conditional('contenido:habitaciones', 'contenido:imagenes')
+@page_cache.cached('habitaciones')
 def hospedaje_usuario():
-    habitaciones = nuevaHabitacion.query.order_by(nuevaHabitacion.plan.asc(), nuevaHabitacion.numero.asc()).all()
-    # Agrupar por plan para la vista
-    grouped = { 'Oro': [], 'Plata': [], 'Bronce': [], 'Otro': [] }
-    for h in habitaciones:
-        key = (h.plan or 'Otro')
-        if key not in grouped:
-            grouped[key] = []
-        grouped[key].append(h)
+    catalog = room_catalog.snapshot()
+    habitaciones_por_plan, _ = catalog.grouped()
     current_year = datetime.utcnow().year
-    return render_template('usuario/hospedaje_usuario.html', habitaciones=habitaciones, habitaciones_por_plan=grouped, current_year=current_year)
+    return render_template('usuario/hospedaje_usuario.html', habitaciones=catalog.rooms, habitaciones_por_plan=habitaciones_por_plan, current_year=current_year)
 
 
 @hospedaje_usuario_bp.route('/reservar/<int:habitacion_id>', methods=['GET', 'POST'])
@@ -108,6 +109,8 @@ def reservar_habitacion(habitacion_id):
             procedencia2=(request.form.get('procedencia2') or None),
         )
         db.session.add(datos)
+        # Las fechas de esta habitación cambian: invalidar el índice de ocupación junto con el commit
+        occupancy_index.invalidate(habitacion.id)
         try:
             db.session.commit()
         except SQLAlchemyError as e:
@@ -131,7 +134,14 @@ def reservar_habitacion(habitacion_id):
 def _habitacion_disponible(habitacion_id: int, check_in, check_out) -> bool:
     """Retorna True si no existen reservas traslapadas para la habitación en el rango dado.
     La lógica de traslape permite check-in el mismo día del check-out previo.
+    Se resuelve con el índice de ocupación en memoria; si falla, se consulta la BD directamente.
     """
+    try:
+        return occupancy_index.is_free(habitacion_id, check_in, check_out)
+    except Exception as e:
+        from flask import current_app
+        current_app.logger.warning('Índice de ocupación no disponible, consultando BD: %s', e)
+        db.session.rollback()
     # Excluir reservas canceladas
     qs = Reserva.query.filter(
         Reserva.habitacion_id == habitacion_id,
@@ -143,6 +153,7 @@ def _habitacion_disponible(habitacion_id: int, check_in, check_out) -> bool:
 
 
 @hospedaje_usuario_bp.route('/disponibilidad/<int:habitacion_id>')
+@conditional('reservas:{habitacion_id}', 'contenido:habitaciones')
 def disponibilidad_habitacion(habitacion_id):
     """Endpoint simple para consultar disponibilidad por fechas."""
     habitacion = nuevaHabitacion.query.get_or_404(habitacion_id)
@@ -161,67 +172,215 @@ def disponibilidad_habitacion(habitacion_id):
     return jsonify({'ok': True, 'available': available})
 
 
-@hospedaje_usuario_bp.route('/calendar/<int:habitacion_id>')
-def calendario_habitacion(habitacion_id: int):
-    """Devuelve el cronograma anual día a día para una habitación.
+# Ordenamientos permitidos para la búsqueda (clave -> columnas ORDER BY)
+_ORDEN_BUSQUEDA = {
+    'precio': (nuevaHabitacion.precio.asc(), nuevaHabitacion.id.asc()),
+    '-precio': (nuevaHabitacion.precio.desc(), nuevaHabitacion.id.asc()),
+    'cupo': (nuevaHabitacion.cupo_personas.asc(), nuevaHabitacion.precio.asc(), nuevaHabitacion.id.asc()),
+    'numero': (nuevaHabitacion.plan.asc(), nuevaHabitacion.numero.asc(), nuevaHabitacion.id.asc()),
+}
+
+
+def _query_habitaciones_libres(check_in, check_out, personas=None, plan=None):
+    """Query de todas las habitaciones libres en el rango [check_in, check_out).
+    Usa un anti-join (NOT EXISTS) contra Reserva en lugar de consultar habitación por habitación,
+    con la misma regla de traslape que _habitacion_disponible.
+    """
+    ocupada = (
+        db.session.query(Reserva.id)
+        .filter(
+            Reserva.habitacion_id == nuevaHabitacion.id,
+            Reserva.estado != 'Cancelada',
+            Reserva.check_in < check_out,
+            Reserva.check_out > check_in,
+        )
+    )
+    q = nuevaHabitacion.query.filter(~ocupada.exists())
+    # Las habitaciones en mantenimiento no se ofrecen aunque no tengan reservas
+    q = q.filter(func.lower(nuevaHabitacion.estado) != 'mantenimiento')
+    if personas:
+        q = q.filter(nuevaHabitacion.cupo_personas >= personas)
+    if plan:
+        if plan == 'Sin plan':
+            q = q.filter(or_(nuevaHabitacion.plan.is_(None), nuevaHabitacion.plan == ''))
+        else:
+            q = q.filter(nuevaHabitacion.plan == plan)
+    return q
+
+
+@hospedaje_usuario_bp.route('/buscar')
+def buscar_habitaciones():
+    """Busca todas las habitaciones libres para un rango de fechas en una sola consulta.
+    Parámetros: check_in, check_out (YYYY-MM-DD), personas, plan, orden (precio|-precio|cupo|numero),
+    page, per_page.
     Response JSON shape:
     {
-      ok: true,
-      habitacion_id: N,
-      year: 2025,
-      days: [{date:"YYYY-MM-DD", status:"disponible|ocupada|mantenimiento"}, ...]
+      ok: true, check_in, check_out, noches, total, page, pages, per_page,
+      habitaciones: [{id, nombre, plan, numero, cupo_personas, precio, total_estadia, imagen}, ...]
     }
     """
-    habitacion = nuevaHabitacion.query.get_or_404(habitacion_id)
-    # Año solicitado o actual
+    sin = request.args.get('check_in')
+    sout = request.args.get('check_out')
     try:
-        year = int(request.args.get('year')) if request.args.get('year') else datetime.utcnow().year
+        d_in = datetime.strptime(sin, '%Y-%m-%d').date() if sin else None
+        d_out = datetime.strptime(sout, '%Y-%m-%d').date() if sout else None
     except Exception:
-        year = datetime.utcnow().year
+        return jsonify({'ok': False, 'error': 'invalid_dates'}), 400
 
-    start = date(year, 1, 1)
-    end = date(year, 12, 31)
+    if not d_in or not d_out or d_out <= d_in:
+        return jsonify({'ok': False, 'error': 'invalid_range'}), 400
+
+    try:
+        personas = int(request.args.get('personas')) if request.args.get('personas') else None
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(50, max(1, int(request.args.get('per_page', 20))))
+    except Exception:
+        return jsonify({'ok': False, 'error': 'invalid_params'}), 400
+
+    plan = (request.args.get('plan') or '').strip() or None
+    orden = request.args.get('orden') or 'precio'
+    if orden not in _ORDEN_BUSQUEDA:
+        return jsonify({'ok': False, 'error': 'invalid_order'}), 400
+
+    q = _query_habitaciones_libres(d_in, d_out, personas=personas, plan=plan)
+    q = q.order_by(*_ORDEN_BUSQUEDA[orden])
+    pagina = q.paginate(page=page, per_page=per_page, error_out=False)
+
+    noches = (d_out - d_in).days
+    habitaciones = [{
+        'id': h.id,
+        'nombre': h.nombre,
+        'plan': h.plan,
+        'numero': h.numero,
+        'cupo_personas': h.cupo_personas,
+        'precio': float(h.precio or 0),
+        'total_estadia': float(h.precio or 0) * noches,
+        'imagen': h.imagen,
+    } for h in pagina.items]
+
+    return jsonify({
+        'ok': True,
+        'check_in': d_in.isoformat(),
+        'check_out': d_out.isoformat(),
+        'noches': noches,
+        'personas': personas,
+        'plan': plan,
+        'orden': orden,
+        'total': pagina.total,
+        'page': pagina.page,
+        'pages': pagina.pages,
+        'per_page': pagina.per_page,
+        'habitaciones': habitaciones,
+    })
+
+
+# Ventana máxima (en días) que se acepta en una consulta de calendario
+_MAX_DIAS_CALENDARIO = 366 * 5
 
-    # Pre-cargar reservas no canceladas que intersecten con el año
-    reservas = (
-        Reserva.query
+
+def _calendario_runs(habitacion, desde: date, hasta: date):
+    """Tramos [inicio, fin, estado] (fin inclusive) que cubren la ventana [desde, hasta].
+    Se construyen ordenando y fusionando los intervalos de reserva, sin recorrer día a día.
+    """
+    if (habitacion.estado or '').lower() == 'mantenimiento':
+        return [[desde, hasta, 'mantenimiento']]
+
+    fin_excl = hasta + timedelta(days=1)
+    rows = (
+        db.session.query(Reserva.check_in, Reserva.check_out)
         .filter(Reserva.habitacion_id == habitacion.id, Reserva.estado != 'Cancelada')
-        .filter(Reserva.check_out >= start, Reserva.check_in <= end)
+        .filter(Reserva.check_in < fin_excl)
+        .filter(or_(Reserva.check_out > desde, Reserva.check_out.is_(None)))
+        .order_by(Reserva.check_in.asc())
         .all()
     )
 
-    # Construir mapa de fechas
-    days = {}
+    runs = []
+    cursor = desde  # primer día aún no cubierto por un tramo
+    for ci, co in rows:
+        # check_out puede ser None; asumir al menos 1 noche (exclusivo al salir)
+        co = co or (ci + timedelta(days=1))
+        ini = max(ci, desde)
+        fin = min(co, fin_excl)
+        if fin <= cursor or fin <= ini:
+            continue  # contenido en un tramo ocupado anterior o reserva sin noches
+        if ini > cursor:
+            runs.append([cursor, ini - timedelta(days=1), 'disponible'])
+            runs.append([ini, fin - timedelta(days=1), 'ocupada'])
+        elif runs and runs[-1][2] == 'ocupada':
+            runs[-1][1] = fin - timedelta(days=1)  # extender el tramo ocupado actual
+        else:
+            runs.append([cursor, fin - timedelta(days=1), 'ocupada'])
+        cursor = fin
+    if cursor <= hasta:
+        runs.append([cursor, hasta, 'disponible'])
+    return runs
+
+
+def _calendario_dias(habitacion, year: int):
+    """Formato anterior: un objeto {date, status} por cada día del año."""
+    start = date(year, 1, 1)
+    end = date(year, 12, 31)
+    n_days = (end - start).days + 1
 
     # Si la habitación está en mantenimiento permanente, marcar todo el año
     if (habitacion.estado or '').lower() == 'mantenimiento':
-        cur = start
-        while cur <= end:
-            days[cur] = 'mantenimiento'
-            cur += timedelta(days=1)
+        statuses = ['mantenimiento'] * n_days
     else:
-        # Inicialmente disponible
-        cur = start
-        while cur <= end:
-            days[cur] = 'disponible'
-            cur += timedelta(days=1)
-
-        # Marcar ocupadas según reservas (check_in inclusive, check_out exclusivo)
-        for r in reservas:
-            d0 = max(start, r.check_in)
-            # check_out puede ser None; asumir al menos 1 noche
-            co = r.check_out or (r.check_in + timedelta(days=1))
-            # exclusivo al salir; acotar al rango del año (+1 para poder usar <)
-            d1_excl = min(end + timedelta(days=1), co)
-            cur = d0
-            while cur < d1_excl:
-                days[cur] = 'ocupada'
-                cur += timedelta(days=1)
-
-    payload = {
+        # Bits de ocupación del año (check_in inclusive, check_out exclusivo) desde el índice
+        bits = occupancy_index.year_bits(habitacion.id, year)
+        statuses = ['ocupada' if (bits >> i) & 1 else 'disponible' for i in range(n_days)]
+
+    return {
         'ok': True,
         'habitacion_id': habitacion.id,
         'year': year,
-        'days': [{'date': d.isoformat(), 'status': days[d]} for d in sorted(days.keys())]
+        'days': [{'date': (start + timedelta(days=i)).isoformat(), 'status': st} for i, st in enumerate(statuses)]
+    }
+
+
+@hospedaje_usuario_bp.route('/calendar/<int:habitacion_id>')
+@conditional('reservas:{habitacion_id}', 'contenido:habitaciones')
+def calendario_habitacion(habitacion_id: int):
+    """Devuelve el cronograma de una habitación como tramos de estado.
+    Parámetros: desde/hasta (YYYY-MM-DD, ventana arbitraria) o year (año completo; por defecto el actual).
+    Response JSON shape:
+    {
+      ok: true,
+      habitacion_id: N,
+      desde: "YYYY-MM-DD",
+      hasta: "YYYY-MM-DD",
+      runs: [["YYYY-MM-DD", "YYYY-MM-DD", "disponible|ocupada|mantenimiento"], ...]  (fin inclusive)
     }
-    return jsonify(payload)
+    Compatibilidad: con ?formato=dias se devuelve el formato anterior
+    {ok, habitacion_id, year, days: [{date, status}, ...]} para el año pedido.
+    """
+    habitacion = nuevaHabitacion.query.get_or_404(habitacion_id)
+    # Año solicitado o actual
+    try:
+        year = int(request.args.get('year')) if request.args.get('year') else datetime.utcnow().year
+    except Exception:
+        year = datetime.utcnow().year
+
+    if (request.args.get('formato') or '').lower() == 'dias':
+        return jsonify(_calendario_dias(habitacion, year))
+
+    sdesde = request.args.get('desde')
+    shasta = request.args.get('hasta')
+    try:
+        desde = datetime.strptime(sdesde, '%Y-%m-%d').date() if sdesde else date(year, 1, 1)
+        hasta = datetime.strptime(shasta, '%Y-%m-%d').date() if shasta else date(year, 12, 31)
+    except Exception:
+        return jsonify({'ok': False, 'error': 'invalid_dates'}), 400
+
+    if hasta < desde or (hasta - desde).days >= _MAX_DIAS_CALENDARIO:
+        return jsonify({'ok': False, 'error': 'invalid_range'}), 400
+
+    runs = _calendario_runs(habitacion, desde, hasta)
+    return jsonify({
+        'ok': True,
+        'habitacion_id': habitacion.id,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'runs': [[a.isoformat(), b.isoformat(), st] for a, b, st in runs],
+    })
@@ -1,14 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, current_app, flash, session, jsonify, send_from_directory
+from flask import Blueprint, render_template, request, redirect, url_for, current_app, flash, session, jsonify
 from models.baseDatos import db, Reserva, nuevaHabitacion, TicketHospedaje, ReservaDatosHospedaje, Usuario
-from utils.mailer import send_email
+from utils import email_outbox
+from utils.email_templates import render_email
+from utils.occupancy import occupancy_index
+# requests, mercadopago y reportlab se importan en el primer uso
+from utils.lazy_imports import requests, mercadopago, rl_canvas, rl_pagesizes
+from utils.file_offload import send_protected_file
 import os
-import requests
 import hmac
 import hashlib
 import io
 
-mercadopago = None  # import dinámico cuando se necesite
-
 pagos_usuario_bp = Blueprint('pagos_usuario', __name__)
 
 
@@ -36,13 +38,9 @@ def checkout_reserva(reserva_id):
 
     if provider == 'MP':
         # Mercado Pago Checkout Pro (redirect a init_point)
-        if mercadopago is None:
-            try:
-                import mercadopago as _mp
-                globals()['mercadopago'] = _mp
-            except Exception:
-                flash('Mercado Pago no está instalado en el servidor. Contacta al administrador.', 'danger')
-                return redirect(url_for('perfil_usuario.perfil'))
+        if not mercadopago.available():
+            flash('Mercado Pago no está instalado en el servidor. Contacta al administrador.', 'danger')
+            return redirect(url_for('perfil_usuario.perfil'))
         access_token = os.getenv('MP_ACCESS_TOKEN')
         if not access_token:
             flash('Falta configurar MP_ACCESS_TOKEN para Mercado Pago.', 'danger')
@@ -253,7 +251,8 @@ def mp_webhook():
 
     status = None
     ref = None
-    if mercadopago and payment_id:
+    # Antes solo funcionaba si este worker ya había importado mercadopago en un checkout
+    if payment_id and mercadopago.available():
         try:
             access_token = os.getenv('MP_ACCESS_TOKEN')
             sdk = mercadopago.SDK(access_token)
@@ -402,20 +401,16 @@ def _ensure_ticket_for_reserva(reserva: Reserva):
         with open(path, 'wb') as f:
             f.write(pdf_bytes.getvalue())
         t.file_ticket = f"uploads/tickets_hospedaje/{t.ticket_numero}.pdf"
-        # Intentar enviar por correo al usuario
+        # Encolar el correo al usuario: se confirma con el ticket y lo entrega el worker
         try:
             if user and user.correo:
                 subject = f"Tu ticket de reserva #{reserva.id}"
-                body = (
-                    f"<p>Hola {user.usuario},</p>"
-                    f"<p>Adjuntamos tu ticket de hospedaje para la reserva #{reserva.id}.</p>"
-                    f"<p>Check-in: {t.check_in} · Check-out: {t.check_out}</p>"
-                    f"<p>Gracias por tu reserva.</p>"
-                )
+                body = render_email('ticket_hospedaje.html', usuario=user, reserva=reserva, ticket=t)
                 attach_name = f"{t.ticket_numero}.pdf"
-                send_email(user.correo, subject, body, [(attach_name, pdf_bytes.getvalue())])
-        except Exception:
-            pass
+                email_outbox.enqueue(user.correo, subject, body, [(attach_name, pdf_bytes.getvalue())],
+                                     key=f'ticket-hospedaje:{reserva.id}', commit=False)
+        except Exception as e:
+            current_app.logger.warning('No se pudo encolar el correo del ticket %s: %s', t.ticket_numero, e)
     except Exception as e:
         try:
             current_app.logger.warning('No se pudo generar/guardar el PDF de ticket: %s', e)
@@ -431,11 +426,9 @@ def _ensure_ticket_for_reserva(reserva: Reserva):
 
 def _build_hospedaje_ticket_pdf(ticket: TicketHospedaje, habitacion: nuevaHabitacion):
     buf = io.BytesIO()
-    # Importar reportlab de forma perezosa
     try:
-        from reportlab.lib.pagesizes import A4 as _A4
-        from reportlab.pdfgen import canvas as _canvas
-        c = _canvas.Canvas(buf, pagesize=_A4)
+        _A4 = rl_pagesizes.A4
+        c = rl_canvas.Canvas(buf, pagesize=_A4)
         width, height = _A4
     except Exception:
         buf.write((f"Ticket {ticket.ticket_numero}\n").encode('utf-8'))
@@ -517,17 +510,29 @@ def descargar_ticket_hospedaje(reserva_id: int):
     if rel.startswith('uploads/'):
         base = current_app.instance_path
         subdir, fname = os.path.split(rel)
-        return send_from_directory(os.path.join(base, subdir), fname, as_attachment=True)
+        # Ya autorizado: el proxy puede enviar el PDF (FILE_OFFLOAD)
+        return send_protected_file(os.path.join(base, subdir), fname, as_attachment=True)
     base = os.path.dirname(t.file_ticket)
     fname = os.path.basename(t.file_ticket)
-    return send_from_directory(base, fname, as_attachment=True)
+    return send_protected_file(base, fname, as_attachment=True)
 
 
 def _apply_status_to_reserva(reserva: Reserva, wompi_status: str):
     st = (wompi_status or '').upper()
     if st == 'APPROVED':
         # Mantener bloqueadas las fechas: 'Completada' confirma ocupación
-        reserva.estado = 'Completada'
+        nuevo = 'Completada'
+    elif st in ('DECLINED', 'ERROR', 'VOIDED'):  # cancelada/declinada
+        # Liberar fechas: 'Cancelada' libera disponibilidad para ese rango
+        nuevo = 'Cancelada'
+    else:
+        nuevo = 'Activa'
+    # Solo cancelar o reactivar cambia las fechas bloqueadas: los webhooks repetidos no
+    # invalidan el índice (se confirma con el commit del llamador)
+    if (reserva.estado == 'Cancelada') != (nuevo == 'Cancelada'):
+        occupancy_index.invalidate(reserva.habitacion_id)
+    reserva.estado = nuevo
+    if nuevo == 'Completada':
         # Generar ticket de hospedaje si no existe
         try:
             _ensure_ticket_for_reserva(reserva)
@@ -536,11 +541,6 @@ def _apply_status_to_reserva(reserva: Reserva, wompi_status: str):
                 current_app.logger.exception('Error generando ticket de hospedaje: %s', e)
             except Exception:
                 pass
-    elif st in ('DECLINED', 'ERROR', 'VOIDED'):  # cancelada/declinada
-        # Liberar fechas: 'Cancelada' libera disponibilidad para ese rango
-        reserva.estado = 'Cancelada'
-    else:
-        reserva.estado = 'Activa'
 
 
 # ----------------- EPAYCO HANDLERS ----------------- #
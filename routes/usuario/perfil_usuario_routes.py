@@ -5,6 +5,7 @@ from datetime import datetime
 from utils.extensions import db
 from models.baseDatos import Usuario, MetodoPago, Reserva, Notificacion, ActividadUsuario, Factura, nuevaHabitacion
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.image_derivatives import process_upload
 
 perfil_usuario_bp = Blueprint('perfil_usuario', __name__, template_folder='../templates')
 
@@ -70,6 +71,7 @@ def editar_perfil():
         os.makedirs(dest, exist_ok=True)
         avatar_file.save(os.path.join(dest, unique))
         user.avatar = f"img/avatars/{unique}"
+        process_upload(user.avatar)
 
     try:
         db.session.commit()
@@ -304,6 +306,7 @@ def cambiar_avatar():
         os.makedirs(dest, exist_ok=True)
         avatar_file.save(os.path.join(dest, unique))
         user.avatar = f"img/avatars/{unique}"
+        process_upload(user.avatar)
         db.session.commit()
         return jsonify({'success': True, 'avatar_url': url_for('static', filename=user.avatar)})
     except Exception as e:
@@ -1,44 +1,44 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, send_file, current_app
-from models.baseDatos import db, PlatoRestaurante, ReservaRestaurante, ReservaPlato, Usuario
+from models.baseDatos import db, ReservaRestaurante, ReservaPlato, Usuario
 from datetime import datetime
 import io
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from utils.lazy_imports import rl_canvas, rl_pagesizes
+from utils.menu_catalog import menu_catalog, current_prices
 
 restaurante_cart_bp = Blueprint('restaurante_cart', __name__)
 
 
-def _get_cart():
+def _get_cart(create=False):
+    """Carrito en la sesión (del lado del servidor): items indexados por id de plato.
+
+    Sin carrito devuelve uno vacío que solo se guarda en la sesión con create=True: ver el
+    carrito (visitantes, crawlers) no crea una sesión ni envía cookie.
+    """
     cart = session.get('rest_cart')
     if not cart:
-        cart = {'items': [], 'people': 1}
-        session['rest_cart'] = cart
+        cart = {'items': {}, 'people': 1}
+        if create:
+            session['rest_cart'] = cart
+    elif isinstance(cart.get('items'), list):
+        # Formato anterior (lista): convertir una sola vez
+        cart['items'] = {str(it.get('plato_id')): it for it in cart['items']}
+        session.modified = True
     return cart
 
 
+def _cart_items(cart):
+    return list(cart['items'].values())
+
+
 @restaurante_cart_bp.route('/restaurante/cart')
 def view_cart():
     cart = _get_cart()
-    # recompute totals
-    total = 0
-    for it in cart['items']:
-        it['subtotal'] = round(it['precio'] * it['cantidad'], 2)
-        total += it['subtotal']
-    cart['total'] = round(total, 2)
-    session.modified = True
-    # Mostrar categorías también (para navegar de vuelta al menú)
-    platos = PlatoRestaurante.query.filter_by(activo=True).order_by(PlatoRestaurante.categoria.asc(), PlatoRestaurante.orden.asc()).all()
-    grupos = {}
-    for p in platos:
-        cat = p.categoria or 'Otros'
-        grupos.setdefault(cat, []).append(p)
-    categorias = ['Entradas','Principales','Postres','Bebidas']
-    cat_presentes = [c for c in categorias if c in grupos]
-    extra = [c for c in grupos.keys() if c not in categorias]
-    categorias_final = cat_presentes + extra
-    # Evitar conflicto Jinja con cart.items (método). Pasar lista explícita.
-    cart_items = cart.get('items', [])
-    return render_template('usuario/restaurante_cart.html', cart=cart, cart_items=cart_items, grupos=grupos, categorias=categorias_final)
+    menu = menu_catalog.snapshot()
+    # Subtotales solo para mostrar: ver el carrito no reescribe la sesión
+    cart_items = [dict(it, subtotal=round(it['precio'] * it['cantidad'], 2)) for it in _cart_items(cart)]
+    resumen = {'people': cart.get('people', 1), 'total': round(sum(it['subtotal'] for it in cart_items), 2)}
+    # Categorías del menú para navegar de vuelta (desde la instantánea, sin consultar la BD)
+    return render_template('usuario/restaurante_cart.html', cart=resumen, cart_items=cart_items, grupos=menu.grupos, categorias=menu.categorias)
 
 
 @restaurante_cart_bp.route('/restaurante/cart/add', methods=['POST'])
@@ -47,35 +47,33 @@ def cart_add():
     cant = int(request.form.get('cantidad') or 1)
     if cant < 1:
         cant = 1
-    plato = PlatoRestaurante.query.get(pid)
-    if not plato or not plato.activo:
+    plato = menu_catalog.snapshot().get(pid)
+    if not plato:
         flash('Plato no disponible', 'warning')
         return redirect(url_for('main.restaurante_usuario'))
-    cart = _get_cart()
-    # merge by plato id
-    for it in cart['items']:
-        if it.get('plato_id') == plato.id:
-            it['cantidad'] += cant
-            break
+    cart = _get_cart(create=True)
+    it = cart['items'].get(str(plato.id))
+    if it:
+        it['cantidad'] += cant
     else:
-        cart['items'].append({
+        cart['items'][str(plato.id)] = {
             'plato_id': plato.id,
             'nombre': plato.nombre,
             'precio': float(plato.precio or 0),
             'cantidad': cant,
-        })
+        }
     session.modified = True
     return redirect(url_for('restaurante_cart.view_cart'))
 
 
 @restaurante_cart_bp.route('/restaurante/cart/update', methods=['POST'])
 def cart_update():
-    cart = _get_cart()
-    for it in cart['items']:
-        key = f"qty_{it.get('plato_id')}"
-        if key in request.form:
+    cart = _get_cart(create=True)
+    for key, it in cart['items'].items():
+        field = f"qty_{key}"
+        if field in request.form:
             try:
-                q = int(request.form.get(key) or 1)
+                q = int(request.form.get(field) or 1)
             except Exception:
                 q = 1
             it['cantidad'] = max(1, q)
@@ -92,14 +90,8 @@ def cart_update():
 def cart_remove():
     cart = _get_cart()
     pid = request.form.get('plato_id')
-    if pid:
-        try:
-            pid = int(pid)
-        except Exception:
-            pid = None
-    if pid is not None:
-        cart['items'] = [it for it in cart['items'] if it.get('plato_id') != pid]
-    session.modified = True
+    if pid and cart['items'].pop(pid.strip(), None) is not None:
+        session.modified = True
     return redirect(url_for('restaurante_cart.view_cart'))
 
 
@@ -123,9 +115,29 @@ def reservar_restaurante():
     except Exception:
         cupo = cart.get('people') or 1
 
+    # Comprobación final contra la BD: el carrito se armó con la instantánea del menú
+    items = _cart_items(cart)
+    precios = current_prices(it.get('plato_id') for it in items)
+    faltantes = [it for it in items if it.get('plato_id') not in precios]
+    cambiados = False
+    for it in items:
+        if it.get('plato_id') in precios:
+            nombre_plato, precio = precios[it['plato_id']]
+            if abs(float(it['precio']) - precio) > 0.005 or it.get('nombre') != nombre_plato:
+                it['nombre'], it['precio'] = nombre_plato, precio
+                cambiados = True
+    if faltantes or cambiados:
+        cart['items'] = {k: it for k, it in cart['items'].items() if it.get('plato_id') in precios}
+        session.modified = True
+        if faltantes:
+            flash('Algunos platos ya no están disponibles y se quitaron del carrito: ' + ', '.join(it.get('nombre') or '' for it in faltantes), 'warning')
+        if cambiados:
+            flash('Los precios del menú cambiaron. Revisa el total antes de confirmar.', 'info')
+        return redirect(url_for('restaurante_cart.view_cart'))
+
     # Calcular total
     total = 0
-    for it in cart['items']:
+    for it in items:
         subtotal = float(it['precio']) * int(it['cantidad'])
         total += subtotal
 
@@ -143,7 +155,7 @@ def reservar_restaurante():
     db.session.flush()  # obtener id
 
     # Detalle
-    for it in cart['items']:
+    for it in items:
         rp = ReservaPlato(
             reserva_id=reserva.id,
             plato_id=it.get('plato_id'),
@@ -172,7 +184,7 @@ def reservar_restaurante():
         current_app.logger.warning('No se pudo persistir ticket en disco: %s', e)
 
     # Vaciar carrito tras crear la reserva
-    session['rest_cart'] = {'items': [], 'people': 1}
+    session['rest_cart'] = {'items': {}, 'people': 1}
 
     pdf_bytes.seek(0)
     return send_file(pdf_bytes, mimetype='application/pdf', as_attachment=True, download_name=f"{reserva.ticket_numero}.pdf")
@@ -180,7 +192,8 @@ def reservar_restaurante():
 
 def _build_ticket_pdf(reserva: ReservaRestaurante):
     buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
+    A4 = rl_pagesizes.A4
+    c = rl_canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
 
     y = height - 50
@@ -0,0 +1,47 @@
+"""
+Genera los derivados WebP/AVIF y el placeholder difuminado de las imágenes existentes
+en static/img e instance/uploads (ver utils/image_derivatives.py).
+
+Uso:
+    python scripts/backfill_image_derivatives.py [--workers 4] [--force]
+
+Sin --force se saltan las imágenes que ya tienen derivados registrados, así que se
+puede interrumpir y volver a ejecutar.
+"""
+import argparse
+import os
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJ_ROOT not in sys.path:
+    sys.path.insert(0, PROJ_ROOT)
+
+from run import app
+from utils import image_derivatives
+
+
+def _progress(done, total, key, counts):
+    print(f'  {done}/{total}  {key}  generadas={counts["generated"]} errores={counts["error"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill de derivados responsivos de imágenes')
+    parser.add_argument('--workers', type=int, default=4, help='hilos para redimensionar/codificar')
+    parser.add_argument('--force', action='store_true', help='regenerar aunque ya existan derivados')
+    args = parser.parse_args()
+
+    with app.app_context():
+        formats = image_derivatives.available_formats()
+        if not formats:
+            print('Pillow no está instalado o no soporta WebP/AVIF')
+            return 1
+        print(f'Formatos: {", ".join(formats)}')
+        counts = image_derivatives.backfill(force=args.force, workers=args.workers, progress=_progress)
+    print(f'Listo: {counts["total"]} imágenes, {counts["generated"]} generadas, '
+          f'{counts["skipped"]} ya tenían derivados, {counts["error"]} errores')
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
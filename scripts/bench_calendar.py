@@ -0,0 +1,134 @@
+"""
+Compara el calendario de /hospedaje/calendar/<id> contra la implementación original
+(un registro por día, recorrido con timedelta y consulta de reservas en cada petición):
+
+- base  : copia de la función original, incluida abajo como referencia fija;
+- dias  : formato compatible actual (?formato=dias, bits del índice de ocupación);
+- runs  : formato por tramos (por defecto).
+
+Se mide la construcción de la respuesta (consulta + JSON) en el mismo contexto para los
+tres, y se comprueba que base y dias devuelven los mismos días.
+
+Uso:
+    python scripts/bench_calendar.py [--year 2025] [--rounds 50] [--habitacion 1]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+root = str(Path(__file__).resolve().parents[1])
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from run import app
+from models.baseDatos import nuevaHabitacion, Reserva
+from routes.usuario.hospedaje_usuario_routes import _calendario_dias, _calendario_runs
+
+
+def _calendario_base(habitacion, year):
+    """Implementación original (antes del índice de ocupación y de los tramos)."""
+    start = date(year, 1, 1)
+    end = date(year, 12, 31)
+
+    reservas = (
+        Reserva.query
+        .filter(Reserva.habitacion_id == habitacion.id, Reserva.estado != 'Cancelada')
+        .filter(Reserva.check_out >= start, Reserva.check_in <= end)
+        .all()
+    )
+
+    days = {}
+    if (habitacion.estado or '').lower() == 'mantenimiento':
+        cur = start
+        while cur <= end:
+            days[cur] = 'mantenimiento'
+            cur += timedelta(days=1)
+    else:
+        cur = start
+        while cur <= end:
+            days[cur] = 'disponible'
+            cur += timedelta(days=1)
+
+        for r in reservas:
+            d0 = max(start, r.check_in)
+            co = r.check_out or (r.check_in + timedelta(days=1))
+            d1_excl = min(end + timedelta(days=1), co)
+            cur = d0
+            while cur < d1_excl:
+                days[cur] = 'ocupada'
+                cur += timedelta(days=1)
+
+    return {
+        'ok': True,
+        'habitacion_id': habitacion.id,
+        'year': year,
+        'days': [{'date': d.isoformat(), 'status': days[d]} for d in sorted(days.keys())]
+    }
+
+
+def _runs_payload(habitacion, year):
+    desde, hasta = date(year, 1, 1), date(year, 12, 31)
+    runs = _calendario_runs(habitacion, desde, hasta)
+    return {
+        'ok': True,
+        'habitacion_id': habitacion.id,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'runs': [[a.isoformat(), b.isoformat(), st] for a, b, st in runs],
+    }
+
+
+def _medir(fn, habitacion, year, rounds):
+    body = json.dumps(fn(habitacion, year))  # calentamiento (índice de ocupación, conexión)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        body = json.dumps(fn(habitacion, year))
+    elapsed_ms = (time.perf_counter() - start) * 1000 / rounds
+    return len(body), elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--year', type=int, default=time.localtime().tm_year)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--habitacion', type=int, default=None, help='id de habitación (por defecto todas)')
+    args = parser.parse_args()
+
+    impls = (('base', _calendario_base), ('dias', _calendario_dias), ('runs', _runs_payload))
+
+    with app.app_context():
+        q = nuevaHabitacion.query.order_by(nuevaHabitacion.id.asc())
+        habitaciones = q.filter_by(id=args.habitacion).all() if args.habitacion else q.all()
+        if not habitaciones:
+            print('No hay habitaciones registradas.')
+            return
+
+        tot = {name: [0, 0] for name, _ in impls}
+        print(f"{'hab':>5}" + ''.join(f' {name + " bytes":>11} {name + " ms":>8}' for name, _ in impls))
+        for hab in habitaciones:
+            if _calendario_base(hab, args.year)['days'] != _calendario_dias(hab, args.year)['days']:
+                raise SystemExit(f'habitación {hab.id}: formato=dias no coincide con la implementación original')
+            row = f'{hab.id:>5}'
+            for name, fn in impls:
+                size, ms = _medir(fn, hab, args.year, args.rounds)
+                tot[name][0] += size
+                tot[name][1] += ms
+                row += f' {size:>11} {ms:>8.2f}'
+            print(row)
+
+    n = len(habitaciones)
+    b_size, b_ms = tot['base'][0] / n, tot['base'][1] / n
+    print(f'\nPromedio por habitación ({n} habitaciones, {args.rounds} rondas):')
+    for name, _ in impls:
+        size, ms = tot[name][0] / n, tot[name][1] / n
+        line = f'  {name:<5}: {size:>9,.0f} bytes, {ms:6.2f} ms'
+        if name != 'base' and b_size and b_ms:
+            line += f'  ({100 * (1 - size / b_size):.1f}% bytes, {100 * (1 - ms / b_ms):.1f}% tiempo vs base)'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
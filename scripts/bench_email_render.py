@@ -0,0 +1,154 @@
+"""
+Costo por render del correo de check-in:
+
+- fstring : copia de la implementación original (f-string con <style> embebido, sin escapar),
+            incluida abajo como referencia fija;
+- herencia: las mismas plantillas Jinja resueltas en cada render ({% extends %} + {% include %},
+            Template.render, filtro fecha sin memoizar), como se renderizaban antes;
+- actual  : utils.email_templates.render_email (plantilla aplanada, contexto sin globals).
+
+Las mediciones se intercalan y se toma el mínimo de cada una, para que el ruido de la máquina
+afecte igual a todas. No necesita base de datos.
+
+Uso:
+    python scripts/bench_email_render.py [--renders 2000] [--rounds 15]
+"""
+import argparse
+import sys
+import timeit
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+root = str(Path(__file__).resolve().parents[1])
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from utils.email_templates import STYLESHEET, TEMPLATES_DIR, inline_css, parse_css, render_email
+
+
+def _render_checkin_fstring(reserva, usuario, habitacion, datos_hospedaje=None):
+    """Implementación original (antes de las plantillas Jinja)."""
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-align: center; padding: 30px; border-radius: 8px 8px 0 0; }}
+            .content {{ background: white; padding: 30px; border: 1px solid #ddd; }}
+            .footer {{ background: #f8f9fa; padding: 20px; text-align: center; border-radius: 0 0 8px 8px; }}
+            .highlight {{ background: #e3f2fd; padding: 15px; border-radius: 5px; margin: 15px 0; }}
+            .button {{ display: inline-block; background: #667eea; color: white; padding: 12px 25px; text-decoration: none; border-radius: 5px; margin: 10px 0; }}
+            .warning {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 15px 0; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>🏨 ¡Bienvenido al Hotel Isla Encanto!</h1>
+                <p>Tu check-in es hoy - ¡Te esperamos!</p>
+            </div>
+
+            <div class="content">
+                <h2>Hola {usuario.usuario},</h2>
+
+                <p>¡Qué emoción! Hoy es el día de tu llegada al <strong>Hotel Isla Encanto</strong>. Estamos preparando todo para que tengas una experiencia inolvidable.</p>
+
+                <div class="highlight">
+                    <h3>📋 Detalles de tu Reserva</h3>
+                    <p><strong>Reserva #:</strong> {reserva.id}</p>
+                    <p><strong>Habitación:</strong> {habitacion.nombre if habitacion else f'Habitación #{reserva.habitacion_id}'}</p>
+                    <p><strong>Check-in:</strong> {reserva.check_in.strftime('%d de %B de %Y')}</p>
+                    <p><strong>Check-out:</strong> {reserva.check_out.strftime('%d de %B de %Y') if reserva.check_out else 'No definido'}</p>
+                    {f'<p><strong>Huésped Principal:</strong> {datos_hospedaje.nombre1}</p>' if datos_hospedaje else ''}
+                </div>
+
+                <div class="warning">
+                    <h3>⏰ Información Importante</h3>
+                    <ul>
+                        <li><strong>Horario de Check-in:</strong> 3:00 PM - 11:00 PM</li>
+                        <li><strong>Documentos requeridos:</strong> Cédula de ciudadanía o pasaporte</li>
+                        <li><strong>Check-in anticipado:</strong> Sujeto a disponibilidad (cargo adicional puede aplicar)</li>
+                    </ul>
+                </div>
+
+                <h3>🎯 Lo que puedes esperar:</h3>
+                <ul>
+                    <li>WiFi gratuito en todas las instalaciones</li>
+                    <li>Servicio de recepción 24/7</li>
+                    <li>Desayuno buffet (según tu plan)</li>
+                    <li>Acceso a todas nuestras instalaciones</li>
+                </ul>
+
+                <p><strong>¿Tienes alguna pregunta?</strong> No dudes en contactarnos:</p>
+                <p>📞 <strong>Teléfono:</strong> +57 316 027 0709</p>
+                <p>📧 <strong>Email:</strong> info@hotelislaencanto.com</p>
+            </div>
+
+            <div class="footer">
+                <p><strong>Hotel Isla Encanto</strong></p>
+                <p>Experiencias únicas, momentos inolvidables</p>
+                <p style="font-size: 12px; color: #666; margin-top: 15px;">
+                    Puedes desactivar estas notificaciones desde tu perfil de usuario.
+                </p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return html_content
+
+
+class _HerenciaLoader(FileSystemLoader):
+    """Estilos en línea al cargar, pero sin aplanar: extends/include se resuelven en cada render."""
+
+    def __init__(self):
+        super().__init__(TEMPLATES_DIR)
+        with open(STYLESHEET, 'r', encoding='utf-8') as fh:
+            self.rules = parse_css(fh.read())
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        return inline_css(source, self.rules), filename, uptodate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=2000, help='renders por medición')
+    parser.add_argument('--rounds', type=int, default=15, help='mediciones intercaladas (se toma el mínimo)')
+    args = parser.parse_args()
+
+    reserva = SimpleNamespace(id=1024, habitacion_id=3, check_in=date(2025, 3, 14), check_out=date(2025, 3, 17))
+    usuario = SimpleNamespace(usuario='Ana María')
+    habitacion = SimpleNamespace(nombre='Suite Vista al Mar')
+    datos = SimpleNamespace(nombre1='Ana')
+    context = dict(reserva=reserva, usuario=usuario, habitacion=habitacion, datos_hospedaje=datos)
+
+    env = Environment(loader=_HerenciaLoader(), autoescape=select_autoescape(['html']),
+                      auto_reload=False, trim_blocks=True, lstrip_blocks=True)
+    # Filtro original, sin memoizar
+    env.filters['fecha'] = lambda value, default='': value.strftime('%d de %B de %Y') if value else default
+
+    impls = {
+        'fstring': lambda: _render_checkin_fstring(reserva, usuario, habitacion, datos),
+        'herencia': lambda: env.get_template('email/checkin.html').render(**context),
+        'actual': lambda: render_email('checkin.html', **context),
+    }
+    sizes = {name: len(fn()) for name, fn in impls.items()}  # calentamiento (compilación)
+    best = dict.fromkeys(impls, float('inf'))
+    for _ in range(args.rounds):
+        for name, fn in impls.items():
+            best[name] = min(best[name], timeit.timeit(fn, number=args.renders) / args.renders * 1e6)
+
+    base = best['fstring']
+    print(f'Render de checkin.html ({args.renders} renders x {args.rounds} rondas, mínimo):')
+    for name, us in best.items():
+        print(f'  {name:<9}: {us:6.2f} us/render  {us / base:4.2f}x  {sizes[name]:>5} bytes')
+
+
+if __name__ == '__main__':
+    main()
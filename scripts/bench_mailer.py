@@ -0,0 +1,75 @@
+"""
+Compara el envío de correos con una conexión SMTP por mensaje (modo anterior) contra
+send_many() sobre una sola sesión autenticada, usando el SMTP local de scripts/smtp_sink.py.
+
+Uso:
+    python scripts/bench_mailer.py [--messages 50] [--latency-ms 5] [--handshake-ms 150]
+
+--handshake-ms simula lo que cuesta abrir la sesión con un proveedor real (TCP + STARTTLS
++ login, normalmente 100-300 ms) y --latency-ms el ida y vuelta de cada comando.
+"""
+import argparse
+import os
+import sys
+import time
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+for p in (PROJ_ROOT, THIS_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from smtp_sink import SmtpSink  # noqa: E402
+
+
+def _configure(port: int, persistent: bool):
+    os.environ.update({
+        'SMTP_HOST': '127.0.0.1', 'SMTP_PORT': str(port), 'SMTP_USE_TLS': 'false', 'SMTP_USE_SSL': 'false',
+        'SMTP_USER': 'bench@example.com', 'SMTP_PASSWORD': 'x',
+        'SMTP_PERSISTENT': 'true' if persistent else 'false',
+    })
+
+
+def _messages(n: int):
+    body = '<p>' + 'Recordatorio de tu reserva en Hotel Isla Encanto. ' * 40 + '</p>'
+    return [(f'huesped{i}@example.com', f'Recordatorio #{i}', body) for i in range(n)]
+
+
+def _run(label, sink, fn):
+    c0, m0 = sink.connections, sink.messages
+    start = time.perf_counter()
+    ok = fn()
+    elapsed = time.perf_counter() - start
+    sent = sink.messages - m0
+    print(f'{label:<28} {sent:>4} enviados ({ok} ok)  {sink.connections - c0:>4} conexiones  '
+          f'{elapsed * 1000:>8.0f} ms  {sent / elapsed:>7.1f} msg/s')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del transporte SMTP')
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--handshake-ms', type=float, default=150.0)
+    args = parser.parse_args()
+
+    sink = SmtpSink(port=0, latency_ms=args.latency_ms, handshake_ms=args.handshake_ms).start()
+    from utils import mailer
+    msgs = _messages(args.messages)
+    print(f'SMTP sink en 127.0.0.1:{sink.port}  latencia={args.latency_ms} ms  handshake={args.handshake_ms} ms')
+
+    _configure(sink.port, persistent=False)
+    t_old = _run('send_email (1 conexión/msg)', sink, lambda: sum(mailer.send_email(*m) for m in msgs))
+
+    _configure(sink.port, persistent=True)
+    t_new = _run('send_many (1 sesión)', sink, lambda: sum(mailer.send_many(msgs)))
+    mailer.close_transport()
+
+    print(f'Aceleración: x{t_old / t_new:.1f}')
+    sink.shutdown()
+    sink.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
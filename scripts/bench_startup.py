@@ -0,0 +1,100 @@
+"""
+Benchmark de arranque de un worker: tiempo de `import run` + create_app() y memoria
+residente (RSS) al terminar, con las librerías pesadas cargadas de forma perezosa
+(estado actual) frente a importarlas al arrancar (como se hacía antes).
+
+Uso:
+    python scripts/bench_startup.py [--runs 5] [--json]
+
+Cada medición es un proceso nuevo (arranque en frío). El modo "eager" importa
+reportlab, openpyxl, numpy, requests y mercadopago antes de crear la app para
+reproducir el costo anterior; la diferencia es lo que ahorra cada worker.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+
+LAZY_MODULES = ('reportlab.pdfgen.canvas', 'openpyxl', 'numpy', 'requests', 'mercadopago')
+
+_PROBE = '''
+import importlib, json, sys, time
+t0 = time.perf_counter()
+if {eager!r}:
+    for name in {modules!r}:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+import run
+run.get_app()
+ms = (time.perf_counter() - t0) * 1000
+rss_kb = None
+try:
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+loaded = sorted({{m.split('.')[0] for m in {modules!r} if m in sys.modules}})
+print('BENCH_JSON=' + json.dumps({{'ms': ms, 'rss_kb': rss_kb, 'loaded': loaded}}))
+'''
+
+
+def _measure(eager: bool, timeout: int = 120):
+    env = dict(os.environ)
+    env['MIGRATE_ON_BOOT'] = '0'
+    code = _PROBE.format(eager=eager, modules=LAZY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=PROJ_ROOT, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith('BENCH_JSON='):
+            return json.loads(line[len('BENCH_JSON='):])
+    raise RuntimeError('La app no arrancó en el proceso de medición:\n' + proc.stderr[-2000:])
+
+
+def _summary(samples):
+    return {
+        'ms': round(statistics.median(s['ms'] for s in samples), 1),
+        'rss_mb': round(statistics.median(s['rss_kb'] for s in samples) / 1024, 1),
+        'loaded': samples[-1]['loaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque: imports perezosos vs anticipados')
+    parser.add_argument('--runs', type=int, default=5, help='corridas por modo (se reporta la mediana)')
+    parser.add_argument('--json', action='store_true', help='salida JSON')
+    args = parser.parse_args()
+
+    runs = max(1, args.runs)
+    result = {'runs': runs}
+    for mode, eager in (('lazy', False), ('eager', True)):
+        result[mode] = _summary([_measure(eager) for _ in range(runs)])
+    result['saved_ms'] = round(result['eager']['ms'] - result['lazy']['ms'], 1)
+    result['saved_rss_mb'] = round(result['eager']['rss_mb'] - result['lazy']['rss_mb'], 1)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0
+
+    print(f'Arranque de un worker (mediana de {runs} corridas)')
+    for mode in ('lazy', 'eager'):
+        r = result[mode]
+        loaded = ', '.join(r['loaded']) or '-'
+        print(f"  {mode:<6} {r['ms']:>8.1f} ms  {r['rss_mb']:>7.1f} MB RSS  cargados: {loaded}")
+    print(f"Ahorro por worker: {result['saved_ms']} ms, {result['saved_rss_mb']} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
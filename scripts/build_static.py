@@ -0,0 +1,42 @@
+"""
+Genera static/dist/ con los archivos estáticos renombrados por el hash de su contenido
+y static/dist/manifest.json (ver utils/static_assets.py).
+
+Uso:
+    python scripts/build_static.py [--no-prune] [--no-precompress]
+
+Se ejecuta en el build de la imagen (Dockerfile) y cada vez que cambie algo en static/;
+los workers leen el manifiesto al arrancar.
+"""
+import argparse
+import os
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJ_ROOT not in sys.path:
+    sys.path.insert(0, PROJ_ROOT)
+
+# No importa run: el build no necesita base de datos
+from utils import static_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprinting de archivos estáticos')
+    parser.add_argument('--static-dir', default=os.path.join(PROJ_ROOT, 'static'), help='carpeta static/')
+    parser.add_argument('--no-prune', action='store_true', help='conservar versiones anteriores en dist/')
+    parser.add_argument('--no-precompress', action='store_true', help='no generar hermanos .br/.gz')
+    args = parser.parse_args()
+
+    manifest = static_assets.build(args.static_dir, prune=not args.no_prune, precompress=not args.no_precompress)
+    print(f'{len(manifest)} archivos en {os.path.join(args.static_dir, static_assets.DIST_DIR)}')
+    for rel in ('Styles.css', 'bubbles.js'):
+        if rel in manifest:
+            path = os.path.join(args.static_dir, manifest[rel])
+            sizes = ', '.join(f'{ext or "original"} {os.path.getsize(path + ext)} B' for ext in ('', '.br', '.gz') if os.path.isfile(path + ext))
+            print(f'  {rel} -> {manifest[rel]}  ({sizes})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from models.baseDatos import db, nuevaHabitacion
 from run import app
+from utils.page_cache import page_cache
 
 habitaciones_fijas = [
     {
@@ -311,5 +312,7 @@ with app.app_context():
             )
             db.session.add(nueva)
 
+    # Sello del catálogo de habitaciones: los workers en marcha recargan la instantánea
+    page_cache.invalidate('habitaciones')
     db.session.commit()
     print("Habitaciones fijas + Plan Oro (8), Plata (12) y Bronce (20) registradas en la base de datos.")
@@ -0,0 +1,49 @@
+"""
+Aplica las migraciones de esquema pendientes (ver utils/migrations.py).
+
+Uso:
+    python scripts/migrate.py            # aplica los pasos pendientes
+    python scripts/migrate.py --status   # muestra versión actual y pasos pendientes
+
+Se puede ejecutar con los workers corriendo: el candado (GET_LOCK en MySQL,
+flock en SQLite) garantiza que un solo proceso aplique cada paso.
+"""
+import argparse
+import os
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJ_ROOT not in sys.path:
+    sys.path.insert(0, PROJ_ROOT)
+
+# Evitar que el import de la app migre por su cuenta: aquí se hace explícitamente
+os.environ['MIGRATE_ON_BOOT'] = '0'
+
+from run import app
+from utils.migrations import current_version, target_version, pending_migrations, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migraciones de esquema versionadas')
+    parser.add_argument('--status', action='store_true', help='solo mostrar el estado')
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f'Versión actual: {current_version()} / objetivo: {target_version()}')
+        pendientes = pending_migrations()
+        for version, nombre in pendientes:
+            print(f'  pendiente {version}: {nombre}')
+        if args.status:
+            return 0
+        if not pendientes:
+            print('Esquema al día.')
+            return 0
+        applied = run_migrations()
+        print(f'Aplicadas: {applied or "ninguna (otro proceso ya migró)"}')
+        print(f'Versión actual: {current_version()}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Mueve las imágenes legacy de static/img/uploads a instance/uploads y actualiza las
+rutas de Post y PlatoRestaurante (ver utils/media_migration.py).
+
+Uso:
+    python scripts/migrate_media.py --dry-run      # solo muestra qué haría
+    python scripts/migrate_media.py [--workers 8] [--batch 200]
+    python scripts/migrate_media.py --reset        # olvida el manifiesto y el marcador
+
+Es reanudable: si se interrumpe, la siguiente ejecución continúa donde quedó.
+"""
+import argparse
+import os
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJ_ROOT not in sys.path:
+    sys.path.insert(0, PROJ_ROOT)
+
+from run import app
+from utils import media_migration
+
+
+def _progress(done, total, counts):
+    print(f'  {done}/{total}  movidas={counts["moved"]} reenlazadas={counts["relinked"]} '
+          f'omitidas={counts["skipped"]} faltantes={counts["missing"]} errores={counts["error"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migración de imágenes legacy a instance/uploads')
+    parser.add_argument('--dry-run', action='store_true', help='no mueve archivos ni modifica la BD')
+    parser.add_argument('--workers', type=int, default=8, help='hilos para mover archivos')
+    parser.add_argument('--batch', type=int, default=200, help='elementos por lote (commit + manifiesto)')
+    parser.add_argument('--reset', action='store_true', help='borrar manifiesto y marcador antes de ejecutar')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.reset:
+            for name in (media_migration.MANIFEST_NAME, media_migration.MARKER_NAME):
+                path = os.path.join(app.instance_path, name)
+                if os.path.isfile(path):
+                    os.remove(path)
+        if media_migration.is_done() and not args.dry_run:
+            print('La migración de imágenes ya está completa (usa --reset para repetirla).')
+            return 0
+        counts = media_migration.run(dry_run=args.dry_run, workers=args.workers,
+                                     batch=args.batch, progress=_progress)
+        modo = 'Simulación' if args.dry_run else 'Migración'
+        print(f'{modo} terminada: {counts}')
+        if counts['error']:
+            print('Hubo errores; vuelve a ejecutar para reintentar los pendientes.')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
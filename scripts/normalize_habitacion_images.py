@@ -1,6 +1,7 @@
 import os
 from run import app
 from models.baseDatos import db, nuevaHabitacion
+from utils.page_cache import page_cache
 
 
 def normalize_images():
@@ -37,6 +38,7 @@ def normalize_images():
             changed += 1
 
         if changed:
+            page_cache.invalidate('habitaciones')
             db.session.commit()
         print(f"Habitaciones revisadas: {total} | Imágenes normalizadas: {changed}")
 
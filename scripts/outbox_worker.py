@@ -0,0 +1,67 @@
+"""
+Entrega los correos de la bandeja de salida (tabla email_outbox, ver utils/email_outbox.py).
+
+Uso:
+    python scripts/outbox_worker.py                 # worker continuo (con EMAIL_OUTBOX_WORKER=off)
+    python scripts/outbox_worker.py --once          # drenar lo vencido y salir (cron)
+    python scripts/outbox_worker.py --requeue-failed [--once]
+    python scripts/outbox_worker.py --purge-days 30 --once
+
+Se pueden correr varios a la vez: cada correo se reclama con un UPDATE condicional.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJ_ROOT not in sys.path:
+    sys.path.insert(0, PROJ_ROOT)
+
+from run import app
+from models.baseDatos import db
+from utils import email_outbox
+
+logger = logging.getLogger('outbox_worker')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker de la bandeja de salida de correo')
+    parser.add_argument('--once', action='store_true', help='drenar una vez y salir')
+    parser.add_argument('--requeue-failed', action='store_true', help='reencolar los correos fallidos')
+    parser.add_argument('--purge-days', type=int, default=0, help='borrar enviados con más de N días')
+    parser.add_argument('--workers', type=int, default=None, help='hilos de envío (por defecto EMAIL_DISPATCH_WORKERS)')
+    parser.add_argument('--poll', type=float, default=None, help='segundos entre rondas (por defecto EMAIL_OUTBOX_POLL)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.requeue_failed:
+            print(f'Reencolados: {email_outbox.requeue_failed()}')
+        if args.purge_days:
+            print(f'Enviados eliminados: {email_outbox.purge_sent(args.purge_days)}')
+        poll = args.poll or float(app.config.get('EMAIL_OUTBOX_POLL', 30))
+        while True:
+            try:
+                totals = email_outbox.drain(origen='script', workers=args.workers)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning('No se pudo drenar la bandeja de correo: %s', e)
+                totals = None
+            finally:
+                db.session.remove()
+            if args.once:
+                if totals is not None:
+                    print(f"Enviados: {totals['enviado']}  reintentos: {totals['reintento']}  "
+                          f"fallidos: {totals['fallido']}  p50: {totals['p50_ms']} ms  p95: {totals['p95_ms']} ms")
+                print(f'Estado de la bandeja: {email_outbox.stats()}')
+                return 0 if totals is not None else 1
+            try:
+                time.sleep(poll)
+            except KeyboardInterrupt:
+                return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,6 +19,7 @@ if PROJ_ROOT not in sys.path:
 
 from run import app, db
 from models.baseDatos import PlatoRestaurante
+from utils.page_cache import page_cache
 
 SAMPLES = [
     # Entradas
@@ -76,11 +77,13 @@ def main():
                     activo=True,
                 )
                 db.session.add(pr)
+            page_cache.invalidate('menu')
             db.session.commit()
             print(f"✔ Insertados {len(SAMPLES)} platos de ejemplo")
         else:
             print(f"Ya existen {count} platos; no se insertó nada nuevo.")
             ensure_orders(db.session)
+            page_cache.invalidate('menu')
             db.session.commit()
             print("✔ Orden normalizado por categoría")
 
@@ -10,19 +10,24 @@ from datetime import datetime
 import logging
 
 # Agregar el directorio del proyecto al path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROJ_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJ_ROOT)
 
 from run import create_app
 from utils.notifications import send_daily_notifications, send_reminder_notifications
+from utils.email_outbox import drain
 
-# Configurar logging
+# Configurar logging (force: run.py ya llamó a basicConfig al importarse)
+LOG_DIR = os.path.join(PROJ_ROOT, 'logs')
+os.makedirs(LOG_DIR, exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('logs/notifications.log', encoding='utf-8'),
+        logging.FileHandler(os.path.join(LOG_DIR, 'notifications.log'), encoding='utf-8'),
         logging.StreamHandler()
-    ]
+    ],
+    force=True
 )
 
 logger = logging.getLogger(__name__)
@@ -54,10 +59,15 @@ def main():
             logger.info(f"Check-outs de hoy: {checkouts_sent}")
             logger.info(f"Recordatorios check-in mañana: {checkin_reminders}")
             logger.info(f"Recordatorios check-out mañana: {checkout_reminders}")
-            logger.info(f"Total enviadas: {total_sent}")
+            logger.info(f"Total encoladas: {total_sent}")
+
+            # Entregar ya lo encolado (en este proceso no corre el hilo de la bandeja)
+            resumen = drain(origen='notificaciones')
+            logger.info(f"Entregados: {resumen['enviado']}, reintentos: {resumen['reintento']}, "
+                        f"fallidos: {resumen['fallido']}, p50: {resumen['p50_ms']} ms, p95: {resumen['p95_ms']} ms")
             
             if total_sent > 0:
-                logger.info("✅ Notificaciones enviadas exitosamente")
+                logger.info("✅ Notificaciones procesadas exitosamente")
             else:
                 logger.info("ℹ️ No hay notificaciones para enviar hoy")
                 
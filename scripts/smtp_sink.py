@@ -0,0 +1,138 @@
+"""
+Servidor SMTP local de prueba: acepta cualquier AUTH y descarta (o guarda) los mensajes.
+
+Sirve para probar utils/mailer.py y las notificaciones sin enviar correos reales:
+
+    python scripts/smtp_sink.py [--port 2525] [--latency-ms 0] [--handshake-ms 0] [--save-dir DIR]
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_USE_TLS=false SMTP_USER=x SMTP_PASSWORD=x ...
+
+--latency-ms simula el tiempo de ida y vuelta de cada respuesta y --handshake-ms el costo
+de abrir una sesión (TLS + login en un proveedor real). No implementa STARTTLS.
+"""
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str, delay: bool = True):
+        if delay and self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write((line + '\r\n').encode('ascii'))
+        self.wfile.flush()
+
+    def handle(self):
+        srv = self.server
+        with srv.lock:
+            srv.connections += 1
+        if srv.handshake:
+            time.sleep(srv.handshake)
+        self._reply('220 smtp-sink ready')
+        rcpts = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            cmd = line[:4].upper()
+            if cmd == 'EHLO':
+                self.wfile.write(b'250-smtp-sink\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n')
+                self._reply('250 SIZE 52428800')
+            elif cmd == 'HELO':
+                self._reply('250 smtp-sink')
+            elif cmd == 'AUTH':
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].upper() == 'LOGIN' and len(parts) == 2:
+                    self._reply('334 VXNlcm5hbWU6')
+                    self.rfile.readline()
+                    self._reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                elif len(parts) >= 2 and parts[1].upper() == 'LOGIN':
+                    self._reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self._reply('334 ')
+                    self.rfile.readline()
+                self._reply('235 2.7.0 Authentication successful')
+            elif cmd == 'MAIL':
+                rcpts = []
+                self._reply('250 OK')
+            elif cmd == 'RCPT':
+                rcpts.append(line.split(':', 1)[-1].strip(' <>'))
+                self._reply('250 OK')
+            elif cmd == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    chunks.append(data)
+                with srv.lock:
+                    srv.messages += 1
+                    n = srv.messages
+                if srv.save_dir:
+                    with open(os.path.join(srv.save_dir, f'{n:06d}.eml'), 'wb') as fh:
+                        fh.writelines(chunks)
+                self._reply('250 OK queued')
+            elif cmd == 'RSET':
+                rcpts = []
+                self._reply('250 OK')
+            elif cmd == 'NOOP':
+                self._reply('250 OK')
+            elif cmd == 'QUIT':
+                self._reply('221 Bye', delay=False)
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=2525, latency_ms=0.0, handshake_ms=0.0, save_dir=None):
+        super().__init__((host, port), _Handler)
+        self.latency = latency_ms / 1000.0
+        self.handshake = handshake_ms / 1000.0
+        self.save_dir = save_dir
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Atiende en un hilo en segundo plano (para benchmarks y pruebas)."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SMTP local que descarta los mensajes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='retardo por respuesta')
+    parser.add_argument('--handshake-ms', type=float, default=0.0, help='retardo al abrir cada conexión')
+    parser.add_argument('--save-dir', default=None, help='guardar cada mensaje como .eml')
+    args = parser.parse_args()
+    sink = SmtpSink(args.host, args.port, args.latency_ms, args.handshake_ms, args.save_dir)
+    print(f'SMTP sink en {args.host}:{sink.port} (Ctrl+C para salir)')
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f'{sink.messages} mensajes en {sink.connections} conexiones')
+        sink.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Reporte de arranque en frío: tiempo por fase de create_app() y costo de importación
+por paquete (medido en un proceso nuevo con `python -X importtime`).
+
+Uso:
+    python scripts/startup_report.py [--runs 3] [--top 15] [--json]
+
+Con --runs > 1 se reporta la mediana de cada valor, para comparar contra una
+versión anterior sin que el ruido de una sola corrida engañe.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJ_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJ_ROOT not in sys.path:
+    sys.path.insert(0, PROJ_ROOT)
+
+# No importa run: cada medición arranca la app en un proceso aparte
+from utils.startup_timing import import_cost_report
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values), 2) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reporte de tiempos de arranque')
+    parser.add_argument('--runs', type=int, default=3, help='corridas (se reporta la mediana)')
+    parser.add_argument('--top', type=int, default=15, help='módulos más lentos a mostrar')
+    parser.add_argument('--json', action='store_true', help='salida JSON')
+    args = parser.parse_args()
+
+    reports = [import_cost_report() for _ in range(max(1, args.runs))]
+    failed = [r for r in reports if r.get('returncode') or not r.get('startup')]
+    if failed:
+        print('La app no arrancó en el proceso de medición (returncode=%s)' % failed[0].get('returncode'))
+        return 1
+
+    phases = {}
+    for r in reports:
+        for ph in r['startup']['phases']:
+            phases.setdefault(ph['name'], []).append(ph['ms'])
+    packages = {}
+    for r in reports:
+        for pkg, info in r['packages'].items():
+            packages.setdefault(pkg, []).append(info['ms'])
+
+    result = {
+        'runs': len(reports),
+        'startup_total_ms': _median([r['startup']['total_ms'] for r in reports]),
+        'phases': {name: _median(v) for name, v in phases.items()},
+        'imports_total_ms': _median([r['total_ms'] for r in reports]),
+        'packages': dict(sorted(((p, _median(v)) for p, v in packages.items()), key=lambda kv: kv[1], reverse=True)),
+        'slowest': reports[-1]['slowest'][:args.top],
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0
+
+    print(f"Arranque (mediana de {result['runs']} corridas): {result['startup_total_ms']} ms")
+    for name, ms in result['phases'].items():
+        print(f'  {name:<18} {ms:>9.1f} ms')
+    print(f"\nImports (tiempo propio, -X importtime): {result['imports_total_ms']} ms")
+    for pkg, ms in result['packages'].items():
+        print(f'  {pkg:<18} {ms:>9.1f} ms')
+    print('\nMódulos más lentos (última corrida):')
+    for m in result['slowest']:
+        print(f"  {m['module']:<45} {m['self_ms']:>8.1f} ms  (acumulado {m['cumulative_ms']:.1f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
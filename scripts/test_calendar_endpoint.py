@@ -6,7 +6,17 @@ with app.test_client() as client:
     try:
         j = resp.get_json()
         print('json keys:', list(j.keys()) if isinstance(j, dict) else type(j))
-        # print sample head
+        # tramos [desde, hasta (inclusive), estado]
+        if isinstance(j, dict) and 'runs' in j:
+            print('runs sample (first 6):', j['runs'][:6])
+    except Exception as e:
+        print('cannot parse json; raw:', resp.data[:100])
+
+    # Formato anterior (un registro por día)
+    resp = client.get('/hospedaje/calendar/1?formato=dias')
+    print('status (formato=dias):', resp.status_code)
+    try:
+        j = resp.get_json()
         if isinstance(j, dict) and 'days' in j:
             print('days sample (first 6):', j['days'][:6])
     except Exception as e:
@@ -0,0 +1,47 @@
+# Comprueba que /media no entrega tickets PDF a anónimos, tampoco con rutas sin normalizar
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run import app
+
+BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'uploads')
+NOMBRE = '_prueba_privacidad.pdf'
+
+RUTAS = [
+    f'/media/tickets/{NOMBRE}',
+    f'/media/./tickets/{NOMBRE}',
+    f'/media/x/../tickets/{NOMBRE}',
+    f'/media/tickets/./{NOMBRE}',
+    f'/media/tickets_hospedaje/../tickets/{NOMBRE}',
+    f'/media/x/../../run.py',
+]
+
+carpeta = os.path.join(BASE, 'tickets')
+os.makedirs(carpeta, exist_ok=True)
+ruta = os.path.join(carpeta, NOMBRE)
+with open(ruta, 'wb') as fh:
+    fh.write(b'%PDF-1.4 prueba')
+
+fallos = 0
+try:
+    with app.test_client() as client:
+        for url in RUTAS:
+            resp = client.get(url)
+            ok = resp.status_code == 404
+            fallos += not ok
+            print('OK  ' if ok else 'FALLO', resp.status_code, url)
+
+        with client.session_transaction() as s:
+            s['user'] = {'id': 0, 'rol': 'admin', 'usuario': 'admin'}
+        for url in RUTAS[:3]:
+            resp = client.get(url)
+            ok = resp.status_code == 200
+            fallos += not ok
+            print('OK  ' if ok else 'FALLO', resp.status_code, url, '(admin)')
+finally:
+    os.remove(ruta)
+
+print('Fallos:', fallos)
+sys.exit(1 if fallos else 0)
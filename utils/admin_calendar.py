@@ -0,0 +1,191 @@
+"""
+Datos del calendario de administración limitados a la ventana visible (mes o semana).
+
+- reservation_data(): reservas de restaurante y hospedaje que tocan la ventana, con el
+  mismo formato que consume dashboard/admin_calendar.html.
+- occupancy_matrix(): matriz habitaciones × días (0 disponible, 1 ocupada,
+  2 mantenimiento) construida con una sola consulta y relleno de intervalos por
+  arreglo de diferencias en NumPy (con alternativa en Python puro si no está instalado).
+  El calendario la usa en la vista de hotel (ocupadas por día y estado de cada habitación).
+- history_data(): reservas ya pasadas para el modal de historial, pedidas al abrirlo.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from models.baseDatos import db, Reserva, ReservaRestaurante, nuevaHabitacion
+# NumPy se importa la primera vez que se pide la matriz, no al registrar el blueprint
+from utils.lazy_imports import numpy as np
+
+VISTAS = ('mes', 'semana')
+ESTADOS_MATRIZ = ('disponible', 'ocupada', 'mantenimiento')
+DISPONIBLE, OCUPADA, MANTENIMIENTO = 0, 1, 2
+
+
+def window_for(vista: str, fecha: date):
+    """Ventana [desde, hasta) que contiene `fecha`: el mes completo o la semana (lunes a domingo)."""
+    if vista == 'semana':
+        desde = fecha - timedelta(days=fecha.weekday())
+        return desde, desde + timedelta(days=7)
+    desde = fecha.replace(day=1)
+    if desde.month == 12:
+        return desde, date(desde.year + 1, 1, 1)
+    return desde, date(desde.year, desde.month + 1, 1)
+
+
+def _restaurant_item(reserva):
+    return {
+        'id': reserva.id,
+        'date': reserva.fecha_reserva.strftime('%Y-%m-%d'),
+        'time': reserva.fecha_reserva.strftime('%H:%M'),
+        'guests': reserva.cupo_personas,
+        'name': reserva.nombre_cliente or 'Cliente',
+        'ticket': reserva.ticket_numero,
+        'status': reserva.estado
+    }
+
+
+def _hotel_item(reserva):
+    return {
+        'id': reserva.id,
+        'checkIn': reserva.check_in.strftime('%Y-%m-%d'),
+        'checkOut': reserva.check_out.strftime('%Y-%m-%d') if reserva.check_out else '',
+        'room': reserva.habitacion.numero or reserva.habitacion.nombre,
+        'type': reserva.habitacion.plan or 'Standard',
+        'guest': reserva.ticket.nombre1 if reserva.ticket else reserva.usuario.usuario,
+        'status': reserva.estado,
+        'nights': (reserva.check_out - reserva.check_in).days if reserva.check_out else 1
+    }
+
+
+def _hotel_query():
+    # Habitación, usuario y ticket llegan en la misma consulta (joinedload)
+    return Reserva.query.options(
+        joinedload(Reserva.habitacion, innerjoin=True),
+        joinedload(Reserva.usuario, innerjoin=True),
+        joinedload(Reserva.ticket),
+    )
+
+
+def reservation_data(desde: date, hasta: date):
+    """Reservas que tocan [desde, hasta) en el formato {'restaurant': [...], 'hotel': [...]}."""
+    reservas_restaurante = (
+        ReservaRestaurante.query
+        .filter(ReservaRestaurante.fecha_reserva >= datetime.combine(desde, datetime.min.time()))
+        .filter(ReservaRestaurante.fecha_reserva < datetime.combine(hasta, datetime.min.time()))
+        .order_by(ReservaRestaurante.fecha_reserva.asc())
+        .all()
+    )
+    reservas_hospedaje = (
+        _hotel_query()
+        .filter(Reserva.check_in < hasta)
+        .filter(or_(Reserva.check_out > desde, Reserva.check_out.is_(None)))
+        .order_by(Reserva.check_in.asc())
+        .all()
+    )
+    return {
+        'restaurant': [_restaurant_item(r) for r in reservas_restaurante],
+        'hotel': [_hotel_item(r) for r in reservas_hospedaje],
+    }
+
+
+def history_data(tipo: str, limite: int):
+    """Reservas ya pasadas de `tipo` ('restaurant' u 'hotel'), las más recientes primero.
+
+    Devuelve (items, truncado); truncado indica que había más de `limite`.
+    """
+    if tipo == 'restaurant':
+        rows = (
+            ReservaRestaurante.query
+            .filter(ReservaRestaurante.fecha_reserva < datetime.now())
+            .order_by(ReservaRestaurante.fecha_reserva.desc())
+            .limit(limite + 1)
+            .all()
+        )
+        items = [_restaurant_item(r) for r in rows]
+    else:
+        rows = (
+            _hotel_query()
+            .filter(Reserva.check_out <= date.today())
+            .order_by(Reserva.check_out.desc(), Reserva.id.desc())
+            .limit(limite + 1)
+            .all()
+        )
+        items = [_hotel_item(r) for r in rows]
+    return items[:limite], len(items) > limite
+
+
+def _fill_numpy(n_rooms, n_days, filas, inicios, fines):
+    """Relleno vectorizado: +1 en el inicio y -1 en el fin de cada intervalo, luego suma acumulada."""
+    diff = np.zeros((n_rooms, n_days + 1), dtype=np.int32)
+    if len(filas):
+        filas = np.asarray(filas, dtype=np.intp)
+        np.add.at(diff, (filas, np.asarray(inicios, dtype=np.intp)), 1)
+        np.add.at(diff, (filas, np.asarray(fines, dtype=np.intp)), -1)
+    return (np.cumsum(diff[:, :n_days], axis=1) > 0).astype(np.int8)
+
+
+def _fill_python(n_rooms, n_days, filas, inicios, fines):
+    matriz = [[DISPONIBLE] * n_days for _ in range(n_rooms)]
+    for fila, ini, fin in zip(filas, inicios, fines):
+        matriz[fila][ini:fin] = [OCUPADA] * (fin - ini)
+    return matriz
+
+
+def occupancy_matrix(desde: date, hasta: date):
+    """Matriz de ocupación para [desde, hasta).
+
+    Devuelve (habitaciones, matriz, ocupadas_por_dia); matriz[i][j] es el estado de la
+    habitación i el día desde + j (check_in inclusive, check_out exclusivo).
+    """
+    n_days = (hasta - desde).days
+    # LEFT JOIN: las habitaciones sin reservas en la ventana también forman una fila
+    rows = (
+        db.session.query(
+            nuevaHabitacion.id, nuevaHabitacion.numero, nuevaHabitacion.nombre,
+            nuevaHabitacion.plan, nuevaHabitacion.estado,
+            Reserva.check_in, Reserva.check_out,
+        )
+        .outerjoin(Reserva, and_(
+            Reserva.habitacion_id == nuevaHabitacion.id,
+            Reserva.estado != 'Cancelada',
+            Reserva.check_in < hasta,
+            or_(Reserva.check_out > desde, Reserva.check_out.is_(None)),
+        ))
+        .order_by(nuevaHabitacion.id.asc())
+        .all()
+    )
+
+    habitaciones = []
+    indice = {}
+    mantenimiento = []
+    filas, inicios, fines = [], [], []
+    for hid, numero, nombre, plan, estado, ci, co in rows:
+        fila = indice.get(hid)
+        if fila is None:
+            fila = indice[hid] = len(habitaciones)
+            habitaciones.append({'id': hid, 'numero': numero, 'nombre': nombre, 'plan': plan})
+            if (estado or '').lower() == 'mantenimiento':
+                mantenimiento.append(fila)
+        if ci is None:
+            continue
+        # check_out puede ser None; asumir al menos 1 noche (igual que el calendario de usuario)
+        co = co or (ci + timedelta(days=1))
+        ini = max((ci - desde).days, 0)
+        fin = min((co - desde).days, n_days)
+        if fin > ini:
+            filas.append(fila)
+            inicios.append(ini)
+            fines.append(fin)
+
+    if np.available():
+        matriz = _fill_numpy(len(habitaciones), n_days, filas, inicios, fines)
+        if mantenimiento:
+            matriz[mantenimiento, :] = MANTENIMIENTO
+        ocupadas = (matriz == OCUPADA).sum(axis=0).tolist()
+        return habitaciones, matriz.tolist(), ocupadas
+
+    matriz = _fill_python(len(habitaciones), n_days, filas, inicios, fines)
+    for fila in mantenimiento:
+        matriz[fila] = [MANTENIMIENTO] * n_days
+    ocupadas = [sum(1 for fila in matriz if fila[j] == OCUPADA) for j in range(n_days)]
+    return habitaciones, matriz, ocupadas
@@ -0,0 +1,40 @@
+from typing import Dict, Iterable
+from sqlalchemy.exc import IntegrityError
+from models.baseDatos import db, CacheVersion
+
+
+def get_version(clave: str) -> int:
+    """Devuelve el sello actual de `clave` (0 si nunca se ha incrementado)."""
+    return db.session.query(CacheVersion.version).filter(CacheVersion.clave == clave).scalar() or 0
+
+
+def get_versions(claves: Iterable[str]) -> Dict[str, int]:
+    """Devuelve los sellos de varias claves con una sola consulta."""
+    claves = list(claves)
+    rows = db.session.query(CacheVersion.clave, CacheVersion.version).filter(CacheVersion.clave.in_(claves)).all()
+    found = dict(rows)
+    return {c: found.get(c, 0) for c in claves}
+
+
+def bump_version(clave: str) -> None:
+    """Incrementa el sello de `clave` dentro de la transacción actual.
+
+    No hace commit: el incremento se confirma (o se revierte) junto con el cambio
+    del llamador, de modo que los demás workers solo ven el nuevo sello cuando
+    los datos ya están escritos.
+    """
+    updated = (
+        db.session.query(CacheVersion)
+        .filter(CacheVersion.clave == clave)
+        .update({CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False)
+    )
+    if updated:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CacheVersion(clave=clave, version=1))
+    except IntegrityError:
+        # Otro worker creó la fila entre el UPDATE y el INSERT
+        db.session.query(CacheVersion).filter(CacheVersion.clave == clave).update(
+            {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+        )
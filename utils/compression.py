@@ -0,0 +1,189 @@
+"""
+Compresión de respuestas.
+
+- Respuestas dinámicas (HTML, JSON, CSS/JS generados, CSV de texto): after_request que
+  comprime con brotli (si está instalado y el cliente lo acepta) o gzip cuando el cuerpo
+  supera COMPRESS_MIN_SIZE. Las respuestas en streaming no se acumulan: se envuelven en
+  un generador que comprime y vacía el compresor por cada fragmento.
+- Estáticos: scripts/build_static.py deja hermanos .br/.gz de los archivos de texto de
+  static/dist; la vista 'static' entrega directamente el hermano que el cliente acepte.
+
+No se tocan respuestas de archivos (send_file/send_from_directory), las que ya traen
+Content-Encoding ni las marcadas con Cache-Control: no-transform.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import zlib
+from flask import request, send_from_directory
+from utils.lazy_imports import brotli
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+# Extensiones de static/dist que reciben hermanos precomprimidos en el build
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _accepted(encoding: str) -> bool:
+    return request.accept_encodings[encoding] > 0
+
+
+def choose_encoding():
+    """'br', 'gzip' o None según Accept-Encoding y lo disponible."""
+    if _accepted('br') and brotli.available():
+        return 'br'
+    if _accepted('gzip'):
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        # Calidad baja en caliente: casi todo el ahorro con poco CPU
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _stream(chunks, encoding: str, level: int):
+    """Comprime un iterable de fragmentos sin acumularlo: cada fragmento sale en cuanto llega."""
+    if encoding == 'br':
+        comp = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = comp.process(chunk) + comp.flush()
+            if out:
+                yield out
+        yield comp.finish()
+        return
+    comp = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # formato gzip
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        out = comp.compress(chunk) + comp.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def _add_vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+def _weaken_etag(response):
+    # La representación comprimida es distinta byte a byte: un ETag fuerte ya no aplica
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response, min_size: int, gzip_level: int, br_level: int):
+    if response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.headers.get('Content-Encoding') or 'no-transform' in (response.headers.get('Cache-Control') or ''):
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES or request.method == 'HEAD':
+        return response
+
+    if response.is_streamed:
+        encoding = choose_encoding()
+        if not encoding:
+            return response
+        level = br_level if encoding == 'br' else gzip_level
+        response.response = _stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        encoding = choose_encoding()
+        if not encoding:
+            _add_vary(response)
+            return response
+        level = br_level if encoding == 'br' else gzip_level
+        response.set_data(compress_bytes(data, encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    _add_vary(response)
+    _weaken_etag(response)
+    return response
+
+
+def precompress_file(path: str, gzip_level: int = 9, br_quality: int = 11) -> list:
+    """Escribe los hermanos .gz/.br de un archivo (solo si reducen el tamaño). Devuelve los creados."""
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    created = []
+    for encoding, ext in PRECOMPRESSED:
+        if encoding == 'br' and not brotli.available():
+            continue
+        out = compress_bytes(data, encoding, br_quality if encoding == 'br' else gzip_level)
+        if len(out) >= len(data):
+            continue
+        tmp = path + ext + '.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(out)
+        os.replace(tmp, path + ext)
+        created.append(path + ext)
+    return created
+
+
+def _precompressed_index(app) -> dict:
+    """{'dist/...': {'br', 'gzip'}} de los hermanos existentes, leído una vez al arrancar."""
+    index = {}
+    manifest = app.extensions.get('static_manifest') or {}
+    for hashed in manifest.values():
+        if not hashed.lower().endswith(PRECOMPRESS_EXTENSIONS):
+            continue
+        base = os.path.join(app.static_folder, hashed)
+        found = {enc for enc, ext in PRECOMPRESSED if os.path.isfile(base + ext)}
+        if found:
+            index[hashed] = found
+    return index
+
+
+def init_compression(app) -> None:
+    cfg = app.config
+    if not cfg.get('COMPRESS_RESPONSES', True):
+        return
+    min_size = int(cfg.get('COMPRESS_MIN_SIZE', 1024))
+    gzip_level = int(cfg.get('COMPRESS_GZIP_LEVEL', 6))
+    br_level = int(cfg.get('COMPRESS_BR_LEVEL', 4))
+
+    @app.after_request
+    def _compress(response):
+        try:
+            return compress_response(response, min_size, gzip_level, br_level)
+        except Exception as e:
+            logger.warning('No se pudo comprimir la respuesta de %s: %s', request.path, e)
+            return response
+
+    precompressed = _precompressed_index(app)
+    static_view = app.view_functions.get('static')
+    if not precompressed or static_view is None:
+        return
+    logger.info('Estáticos precomprimidos: %d archivos', len(precompressed))
+
+    def static_precompressed(filename):
+        available = precompressed.get(filename)
+        if available:
+            for encoding, ext in PRECOMPRESSED:
+                if encoding in available and _accepted(encoding):
+                    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                    response = send_from_directory(app.static_folder, filename + ext,
+                                                   mimetype=mimetype, conditional=True)
+                    response.headers['Content-Encoding'] = encoding
+                    _add_vary(response)
+                    return response
+            response = static_view(filename=filename)
+            _add_vary(response)
+            return response
+        return static_view(filename=filename)
+
+    app.view_functions['static'] = static_precompressed
@@ -0,0 +1,100 @@
+"""
+GET condicional (ETag / If-None-Match) a partir de los sellos de cache_version.
+
+    @conditional('reservas:{habitacion_id}', 'contenido:habitaciones')
+    def calendario_habitacion(habitacion_id): ...
+
+El ETag (débil) se calcula sin ejecutar la vista a partir de los sellos declarados (con
+los argumentos de la URL sustituidos) más la ruta, el query string, el usuario de la
+sesión, el día en curso y el identificador del build (manifiesto de estáticos y
+plantillas). Los sellos 'contenido:*' se toman de la instantánea de page_cache (releída
+como mucho cada PAGE_CACHE_VERSION_TTL), así que las páginas públicas no consultan la BD
+ni siquiera para validar; solo los demás sellos (p. ej. 'reservas:{id}') cuestan una
+consulta a cache_version. Si el cliente ya lo tiene se responde 304 sin renderizar; si
+no, la vista se ejecuta y su 200 sale con ese ETag y Cache-Control: no-cache.
+
+Los sellos son contadores, no fechas, así que no se emite Last-Modified. Las peticiones
+con mensajes flash pendientes no se validan (la página los consumiría).
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+from datetime import date
+from flask import current_app, request, session
+from models.baseDatos import db
+from utils.cache_version import get_versions
+from utils.page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+
+def build_id(app=None) -> str:
+    """Identificador del código desplegado: BUILD_ID o hash del manifiesto y las plantillas."""
+    app = app or current_app
+    cached = app.extensions.get('build_id')
+    if cached:
+        return cached
+    value = (app.config.get('BUILD_ID') or '').strip()
+    if not value:
+        h = hashlib.sha1(json.dumps(app.extensions.get('static_manifest') or {}, sort_keys=True).encode('utf-8'))
+        templates = os.path.join(app.root_path, app.template_folder or 'templates')
+        for root, _, files in os.walk(templates):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                try:
+                    h.update(f'{path}:{os.path.getmtime(path)}'.encode('utf-8'))
+                except OSError:
+                    pass
+        value = h.hexdigest()[:12]
+    app.extensions['build_id'] = value
+    return value
+
+
+def compute_etag(stamps, view_args) -> str:
+    claves = [s.format(**view_args) for s in stamps]
+    contenido = page_cache.versions()
+    otras = [c for c in claves if not c.startswith('contenido:')]
+    versions = get_versions(otras) if otras else {}
+    versions.update((c, contenido.get(c, 0)) for c in claves if c.startswith('contenido:'))
+    user = (session.get('user') or {}).get('id') or ''
+    raw = '|'.join([
+        request.endpoint or '', request.query_string.decode('latin-1'), build_id(),
+        str(user), date.today().isoformat(),
+    ] + [f'{c}={versions[c]}' for c in claves])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def _mark(response, etag: str) -> None:
+    response.set_etag(etag, weak=True)
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'private, no-cache' if session.get('user') else 'no-cache'
+    response.vary.add('Accept-Encoding')
+
+
+def conditional(*stamps):
+    """Decorador de vista GET: 304 si el ETag derivado de `stamps` coincide con If-None-Match."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or not current_app.config.get('CONDITIONAL_GET', True)
+                    or session.get('_flashes')):
+                return view(*args, **kwargs)
+            try:
+                etag = compute_etag(stamps, kwargs)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning('No se pudo calcular el ETag de %s: %s', request.path, e)
+                return view(*args, **kwargs)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                _mark(response, etag)
+                return response
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.get_etag()[0]:
+                _mark(response, etag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,224 @@
+"""
+Envío paralelo y con límite de tasa para la bandeja de correo (utils/email_outbox.py).
+
+- Dispatcher: pool acotado de EMAIL_DISPATCH_WORKERS hilos; cada hilo mantiene su propia
+  sesión SMTP autenticada (utils/mailer.SmtpTransport), así N hilos son N conexiones
+  abiertas como mucho. Los hilos solo hablan con SMTP: la lectura y escritura de la
+  tabla la hace el hilo que drena, en orden de llegada de los resultados.
+- RateLimiter: token bucket compartido por todo el proceso (EMAIL_RATE_LIMIT mensajes
+  por segundo, ráfaga de EMAIL_RATE_BURST). 0 = sin límite. El tiempo de espera del
+  limitador no cuenta en la latencia medida. El bucket es local al proceso; que el
+  límite valga para el proveedor lo garantiza email_outbox.drain(), que con límite solo
+  entrega desde el proceso que tiene el turno de envío.
+- RunReport: resultado y latencia por mensaje; al terminar la ronda guarda un
+  EmailDispatchRun con conteos, p50/p95 y los fallos, que muestra notifications_panel.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from flask import current_app
+from models.baseDatos import db, EmailDispatchRun
+from utils import mailer
+
+logger = logging.getLogger(__name__)
+
+MAX_FALLOS_EN_DETALLE = 20
+
+
+def _cfg(name, default):
+    try:
+        return current_app.config.get(name, default)
+    except RuntimeError:
+        return default
+
+
+class RateLimiter:
+    """Token bucket: como mucho `rate` adquisiciones por segundo, con ráfagas de `burst`."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = float(rate or 0)
+        self.capacity = float(burst or max(1, math.ceil(self.rate)))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Bloquea hasta obtener un token. Devuelve los segundos esperados."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """Limitador del proceso; se recrea si cambió la configuración."""
+    global _limiter
+    rate = float(_cfg('EMAIL_RATE_LIMIT', 0) or 0)
+    burst = int(_cfg('EMAIL_RATE_BURST', 0) or 0) or None
+    with _limiter_lock:
+        if _limiter is None or _limiter.rate != rate or (burst and _limiter.capacity != burst):
+            _limiter = RateLimiter(rate, burst)
+        return _limiter
+
+
+class Dispatcher:
+    """Pool de hilos que envía mensajes ya construidos, cada hilo con su conexión SMTP."""
+
+    def __init__(self, workers: int = None, limiter: RateLimiter = None, settings: dict = None):
+        self.workers = max(1, int(workers or _cfg('EMAIL_DISPATCH_WORKERS', 4)))
+        self.limiter = limiter or shared_limiter()
+        self.settings = settings or mailer.smtp_settings()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='email-send')
+        self._local = threading.local()
+        self._transports = []
+        self._lock = threading.Lock()
+
+    @property
+    def from_email(self):
+        return self.settings['from_email']
+
+    def _transport(self) -> mailer.SmtpTransport:
+        transport = getattr(self._local, 'transport', None)
+        if transport is None:
+            transport = self._local.transport = mailer.SmtpTransport(self.settings)
+            with self._lock:
+                self._transports.append(transport)
+        return transport
+
+    def _send(self, key, msg, to_email):
+        self.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            self._transport().send_message(msg, to_email)
+            error = None
+        except Exception as e:
+            error = e
+        return key, error, (time.perf_counter() - start) * 1000
+
+    def run(self, jobs, heartbeat: float = None):
+        """Envía [(clave, mensaje, destinatario)]; produce (clave, error o None, latencia_ms)
+        a medida que terminan. Con `heartbeat`, produce None si pasan esos segundos sin
+        que termine ninguno (para renovar leases mientras tanto)."""
+        futures = {self._pool.submit(self._send, key, msg, to_email) for key, msg, to_email in jobs}
+        while futures:
+            done, futures = wait(futures, timeout=heartbeat, return_when=FIRST_COMPLETED)
+            if not done:
+                yield None
+            for future in done:
+                yield future.result()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _percentile(sorted_values, p: float):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RunReport:
+    """Resultado de una ronda de entrega: conteos, latencias y fallos."""
+
+    def __init__(self, origen: str):
+        self.origen = origen
+        self.iniciado_en = datetime.utcnow()
+        self._start = time.perf_counter()
+        self.counts = {'enviado': 0, 'reintento': 0, 'fallido': 0}
+        self.latencias = []
+        self.fallos = []
+
+    def add(self, outbox_id, destinatario, resultado: str, latencia_ms: float = None, error=None):
+        self.counts[resultado] += 1
+        if latencia_ms is not None:
+            self.latencias.append(latencia_ms)
+        if error is not None:
+            self.fallos.append({
+                'id': outbox_id,
+                'destinatario': destinatario,
+                'resultado': resultado,
+                'error': f'{type(error).__name__}: {error}'[:300],
+            })
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> dict:
+        lat = sorted(self.latencias)
+        duracion_ms = (time.perf_counter() - self._start) * 1000
+        return {
+            'origen': self.origen,
+            'total': self.total,
+            **self.counts,
+            'p50_ms': _percentile(lat, 50),
+            'p95_ms': _percentile(lat, 95),
+            'max_ms': lat[-1] if lat else None,
+            'duracion_ms': round(duracion_ms),
+            'msg_s': round(self.counts['enviado'] / (duracion_ms / 1000), 1) if duracion_ms else 0.0,
+            'fallos': self.fallos[:MAX_FALLOS_EN_DETALLE],
+        }
+
+    def save(self):
+        """Registra la ronda (solo si procesó algún correo). Devuelve el resumen."""
+        resumen = self.summary()
+        if not self.total:
+            return resumen
+        try:
+            db.session.add(EmailDispatchRun(
+                origen=self.origen[:30],
+                iniciado_en=self.iniciado_en,
+                duracion_ms=resumen['duracion_ms'],
+                total=self.total,
+                enviados=self.counts['enviado'],
+                reintentos=self.counts['reintento'],
+                fallidos=self.counts['fallido'],
+                p50_ms=resumen['p50_ms'],
+                p95_ms=resumen['p95_ms'],
+                detalle=json.dumps(resumen['fallos'], ensure_ascii=False) if self.fallos else None,
+            ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning('No se pudo registrar la ronda de envío: %s', e)
+        return resumen
+
+
+def recent_runs(limit: int = 10):
+    """Últimas rondas registradas, con los fallos decodificados (para el panel)."""
+    runs = EmailDispatchRun.query.order_by(EmailDispatchRun.id.desc()).limit(limit).all()
+    for run in runs:
+        try:
+            run.fallos = json.loads(run.detalle) if run.detalle else []
+        except ValueError:
+            run.fallos = []
+    return runs
@@ -0,0 +1,484 @@
+"""
+Bandeja de salida de correo (tabla email_outbox) y worker de entrega.
+
+Las vistas ya no hablan con SMTP: enqueue() inserta el correo en la misma transacción
+que el cambio que lo origina (ticket, recuperación de contraseña, notificaciones) y la
+petición responde de inmediato. Un worker lo entrega después:
+
+- En cada proceso web arranca un hilo 'email-outbox' (EMAIL_OUTBOX_WORKER=thread, por
+  defecto) que se despierta tras cada commit que encoló correos y, además, cada
+  EMAIL_OUTBOX_POLL segundos. Con EMAIL_OUTBOX_WORKER=off la entrega queda en manos de
+  python scripts/outbox_worker.py.
+- Reclamo con UPDATE condicional (estado + lease en bloqueado_hasta): varios workers o
+  procesos pueden drenar a la vez sin enviar dos veces el mismo registro. Si un worker
+  muere a mitad, el lease vence y otro lo retoma.
+- Fallo temporal: reintento con backoff exponencial (EMAIL_OUTBOX_BACKOFF * 2^n, con
+  jitter, máximo 6 h). Rechazo permanente (5xx) o agotar max_intentos: estado 'fallido'
+  (dead letter), que se puede reencolar con requeue_failed().
+- Entrega en paralelo por un pool acotado y con límite de mensajes por segundo
+  (utils/email_dispatch.py); cada ronda queda registrada en email_dispatch_run.
+- Con EMAIL_RATE_LIMIT > 0 el límite es del proveedor, no de cada proceso: drain() solo
+  entrega si tiene el turno de envío (tabla email_sender_lease), así los hilos de los
+  workers web y los scripts no suman sus tasas. Quien no lo tiene sale sin enviar y lo
+  pendiente se entrega en la ronda del que sí lo tiene o en el siguiente sondeo.
+- Los lotes se dimensionan para terminar dentro de EMAIL_OUTBOX_LEASE a la tasa
+  configurada, y mientras se envían se renuevan el lease de las filas y el turno.
+- Al enviarse, el registro conserva solo metadatos (destinatario, asunto, fechas): el
+  HTML y los adjuntos se vacían, así los enlaces de recuperación no quedan en la tabla.
+- Idempotencia: con `key`, encolar dos veces el mismo correo devuelve el registro
+  existente; el Message-ID se deriva del registro, así un reintento tras una caída a
+  mitad de envío no genera un mensaje distinto.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import smtplib
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from flask import current_app
+from sqlalchemy import and_, event, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.baseDatos import db, EmailOutbox, EmailSenderLease
+from utils import mailer
+from utils.email_dispatch import Dispatcher, RunReport
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = 'pendiente'
+ENVIANDO = 'enviando'
+ENVIADO = 'enviado'
+FALLIDO = 'fallido'
+
+MAX_BACKOFF = timedelta(hours=6)
+_PENDING_FLAG = 'email_outbox_pending'
+SENDER_LEASE = 'smtp'
+
+
+def _cfg(name, default):
+    try:
+        return current_app.config.get(name, default)
+    except RuntimeError:
+        return default
+
+
+def _new_row(to_email, subject, html_body, attachments=None, key=None, max_attempts=None) -> EmailOutbox:
+    return EmailOutbox(
+        clave=key,
+        destinatario=to_email,
+        asunto=subject,
+        html=html_body,
+        adjuntos=json.dumps([
+            {'nombre': name, 'datos': base64.b64encode(data).decode('ascii')} for name, data in attachments
+        ]) if attachments else None,
+        estado=PENDIENTE,
+        max_intentos=max_attempts or int(_cfg('EMAIL_OUTBOX_MAX_ATTEMPTS', 6)),
+        proximo_intento=datetime.utcnow(),
+    )
+
+
+def enqueue(to_email: str, subject: str, html_body: str, attachments=None, key: str = None,
+            max_attempts: int = None, commit: bool = True):
+    """Encola un correo. Devuelve el registro (el existente si `key` ya estaba encolada).
+
+    Con commit=False el registro queda en la transacción del llamador y solo se entrega
+    si esta se confirma.
+    """
+    row, _ = _enqueue(to_email, subject, html_body, attachments, key, max_attempts, commit)
+    return row
+
+
+def _enqueue(to_email, subject, html_body, attachments, key, max_attempts, commit):
+    """enqueue() que además indica si el registro es nuevo."""
+    if key:
+        existing = db.session.query(EmailOutbox).filter_by(clave=key).first()
+        if existing is not None:
+            return existing, False
+    row = _new_row(to_email, subject, html_body, attachments, key, max_attempts)
+    try:
+        with db.session.begin_nested():
+            db.session.add(row)
+    except IntegrityError:
+        # Otro proceso encoló la misma clave entre la consulta y el INSERT
+        return db.session.query(EmailOutbox).filter_by(clave=key).first(), False
+    db.session.info[_PENDING_FLAG] = True
+    if commit:
+        db.session.commit()
+    return row, True
+
+
+def enqueue_many(items, commit: bool = True) -> int:
+    """Encola un lote de (destinatario, asunto, html, clave) con una consulta de claves y un commit.
+
+    Las claves ya encoladas (o repetidas dentro del lote) se omiten. Retorna cuántos
+    registros nuevos se crearon.
+    """
+    items = list(items)
+    keys = [item[3] for item in items if item[3]]
+    existing = set()
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        existing.update(k for (k,) in db.session.query(EmailOutbox.clave).filter(EmailOutbox.clave.in_(chunk)))
+    rows = []
+    for to_email, subject, html_body, key in items:
+        if key:
+            if key in existing:
+                continue
+            existing.add(key)
+        rows.append({'clave': key, 'destinatario': to_email, 'asunto': subject, 'html': html_body})
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    max_intentos = int(_cfg('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+    for row in rows:
+        row.update(estado=PENDIENTE, intentos=0, max_intentos=max_intentos, proximo_intento=now, creado_en=now)
+    nuevos = len(rows)
+    try:
+        # INSERT con executemany: sin objetos ORM ni lectura de la clave primaria fila a fila
+        with db.session.begin_nested():
+            db.session.execute(EmailOutbox.__table__.insert(), rows)
+    except IntegrityError:
+        # Carrera con otro proceso encolando las mismas claves: uno por uno
+        nuevos = sum(
+            _enqueue(row['destinatario'], row['asunto'], row['html'], None, row['clave'], None, False)[1]
+            for row in rows
+        )
+    db.session.info[_PENDING_FLAG] = True
+    if commit:
+        db.session.commit()
+    return nuevos
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session):
+    if session.info.pop(_PENDING_FLAG, False):
+        outbox_worker.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(_PENDING_FLAG, None)
+
+
+def _claimable(now):
+    return or_(
+        and_(EmailOutbox.estado == PENDIENTE, EmailOutbox.proximo_intento <= now),
+        # Lease vencido: el worker que lo tenía murió a mitad del envío
+        and_(EmailOutbox.estado == ENVIANDO, EmailOutbox.bloqueado_hasta < now),
+    )
+
+
+def _lease_seconds() -> int:
+    return int(_cfg('EMAIL_OUTBOX_LEASE', 300))
+
+
+def claim(limit: int) -> list:
+    """Reserva hasta `limit` correos vencidos para este worker. Devuelve sus ids."""
+    now = datetime.utcnow()
+    lease = now + timedelta(seconds=_lease_seconds())
+    ids = [i for (i,) in db.session.query(EmailOutbox.id).filter(_claimable(now))
+           .order_by(EmailOutbox.proximo_intento.asc(), EmailOutbox.id.asc()).limit(limit)]
+    claimed = []
+    for i in ids:
+        updated = (
+            db.session.query(EmailOutbox)
+            .filter(EmailOutbox.id == i, _claimable(now))
+            .update({EmailOutbox.estado: ENVIANDO, EmailOutbox.bloqueado_hasta: lease}, synchronize_session=False)
+        )
+        if updated:
+            claimed.append(i)
+    db.session.commit()
+    return claimed
+
+
+def _sender_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'[:150]
+
+
+def acquire_sender() -> bool:
+    """Toma o renueva el turno de envío por EMAIL_OUTBOX_LEASE segundos.
+
+    Devuelve False si otro proceso (o hilo) lo tiene y no ha vencido.
+    """
+    now = datetime.utcnow()
+    owner = _sender_id()
+    hasta = now + timedelta(seconds=_lease_seconds())
+    updated = (
+        db.session.query(EmailSenderLease)
+        .filter(EmailSenderLease.nombre == SENDER_LEASE,
+                or_(EmailSenderLease.dueno == owner, EmailSenderLease.hasta.is_(None), EmailSenderLease.hasta < now))
+        .update({EmailSenderLease.dueno: owner, EmailSenderLease.hasta: hasta}, synchronize_session=False)
+    )
+    if not updated and db.session.query(EmailSenderLease.nombre).filter_by(nombre=SENDER_LEASE).first() is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(EmailSenderLease(nombre=SENDER_LEASE, dueno=owner, hasta=hasta))
+            updated = 1
+        except IntegrityError:
+            updated = 0
+    db.session.commit()
+    return bool(updated)
+
+
+def release_sender() -> None:
+    """Libera el turno de envío si lo tiene este hilo."""
+    db.session.query(EmailSenderLease) \
+        .filter(EmailSenderLease.nombre == SENDER_LEASE, EmailSenderLease.dueno == _sender_id()) \
+        .update({EmailSenderLease.hasta: None}, synchronize_session=False)
+    db.session.commit()
+
+
+def _renew_leases(ids, sender: bool) -> None:
+    """Extiende el lease de las filas aún en envío (y el turno): un lote lento no se reclama dos veces."""
+    hasta = datetime.utcnow() + timedelta(seconds=_lease_seconds())
+    if ids:
+        db.session.query(EmailOutbox) \
+            .filter(EmailOutbox.id.in_(list(ids)), EmailOutbox.estado == ENVIANDO) \
+            .update({EmailOutbox.bloqueado_hasta: hasta}, synchronize_session=False)
+    if sender:
+        acquire_sender()
+    db.session.commit()
+
+
+def _is_permanent(exc) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(exc, 'smtp_code', None)
+    return isinstance(code, int) and 500 <= code < 600
+
+
+def _backoff(intentos: int) -> timedelta:
+    base = float(_cfg('EMAIL_OUTBOX_BACKOFF', 60))
+    delay = timedelta(seconds=base * (2 ** max(0, intentos - 1)) * random.uniform(0.8, 1.2))
+    return min(delay, MAX_BACKOFF)
+
+
+def _build(row: EmailOutbox, from_email: str):
+    attachments = [(a['nombre'], base64.b64decode(a['datos'])) for a in json.loads(row.adjuntos or '[]')]
+    msg = mailer.build_message(from_email, row.destinatario, row.asunto, row.html, attachments)
+    domain = (from_email or '').rpartition('@')[2] or 'localhost'
+    # Estable entre reintentos del mismo registro
+    marca = hashlib.sha1((row.clave or '').encode('utf-8')).hexdigest()[:12]
+    msg['Message-ID'] = f'<outbox.{row.id}.{marca}@{domain}>'
+    msg['Date'] = formatdate(localtime=False)
+    return msg
+
+
+def _apply_result(row: EmailOutbox, error, latencia_ms=None) -> str:
+    """Registra en la fila el resultado de un intento. Devuelve enviado, reintento o fallido."""
+    row.intentos += 1
+    row.bloqueado_hasta = None
+    row.latencia_ms = round(latencia_ms) if latencia_ms is not None else None
+    if error is None:
+        row.estado = ENVIADO
+        row.enviado_en = datetime.utcnow()
+        row.ultimo_error = None
+        # Ya entregado: no guardar el cuerpo (enlaces de recuperación, datos de la reserva) ni los PDF
+        row.html = ''
+        row.adjuntos = None
+        return ENVIADO
+    row.ultimo_error = f'{type(error).__name__}: {error}'[:2000]
+    if _is_permanent(error) or row.intentos >= row.max_intentos:
+        row.estado = FALLIDO
+        logger.error('Correo %s a %s descartado tras %d intentos: %s', row.id, row.destinatario, row.intentos, error)
+        return FALLIDO
+    row.estado = PENDIENTE
+    row.proximo_intento = datetime.utcnow() + _backoff(row.intentos)
+    logger.warning('Correo %s a %s falló (intento %d), reintento a las %s: %s',
+                   row.id, row.destinatario, row.intentos, row.proximo_intento, error)
+    return 'reintento'
+
+
+def deliver(ids, dispatcher, report, sender: bool = False) -> None:
+    """Envía los correos reclamados por el pool del dispatcher y registra cada resultado.
+
+    Cada tercio de EMAIL_OUTBOX_LEASE renueva el lease de los que siguen en vuelo (y el
+    turno de envío si `sender`).
+    """
+    if not ids:
+        return
+    pending = set(ids)
+    renew_every = _lease_seconds() / 3
+    renewed = time.monotonic()
+    rows = {r.id: r for r in db.session.query(EmailOutbox).filter(EmailOutbox.id.in_(ids))}
+    jobs = []
+    for row in sorted(rows.values(), key=lambda r: r.id):
+        try:
+            jobs.append((row.id, _build(row, dispatcher.from_email), row.destinatario))
+        except Exception as e:
+            report.add(row.id, row.destinatario, _apply_result(row, e), error=e)
+            pending.discard(row.id)
+            db.session.commit()
+    for result in dispatcher.run(jobs, heartbeat=renew_every):
+        if result is not None:
+            row_id, error, latencia_ms = result
+            row = rows[row_id]
+            report.add(row.id, row.destinatario, _apply_result(row, error, latencia_ms), latencia_ms, error)
+            pending.discard(row_id)
+            # Un commit por correo: el progreso sobrevive a una caída del worker
+            db.session.commit()
+        if pending and time.monotonic() - renewed >= renew_every:
+            _renew_leases(pending, sender)
+            renewed = time.monotonic()
+
+
+def drain(batch: int = None, origen: str = 'worker', workers: int = None, dispatcher: Dispatcher = None) -> dict:
+    """Entrega todo lo vencido en lotes hasta vaciar la cola.
+
+    Con `dispatcher` usa ese pool (y sus conexiones SMTP ya abiertas) sin cerrarlo; si no,
+    crea uno para la ronda. Devuelve el resumen de la ronda (conteos, p50/p95 de latencia,
+    fallos) y lo registra en email_dispatch_run si se procesó algún correo.
+    """
+    batch = batch or int(_cfg('EMAIL_OUTBOX_BATCH', 50))
+    report = RunReport(origen)
+    rate = float(_cfg('EMAIL_RATE_LIMIT', 0) or 0)
+    sender = rate > 0
+    if sender:
+        # Un lote reclamado debe poder enviarse a esa tasa en la mitad del lease
+        batch = max(1, min(batch, int(rate * _lease_seconds() / 2)))
+        if not acquire_sender():
+            logger.debug('Bandeja de correo (%s): otro proceso tiene el turno de envío', origen)
+            return report.summary()
+    own = dispatcher is None
+    try:
+        if own:
+            dispatcher = Dispatcher(workers)
+        while True:
+            ids = claim(batch)
+            if not ids:
+                break
+            deliver(ids, dispatcher, report, sender)
+            if len(ids) < batch:
+                break
+            if sender:
+                acquire_sender()
+    finally:
+        if own and dispatcher is not None:
+            dispatcher.close()
+        if sender:
+            try:
+                release_sender()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning('No se pudo liberar el turno de envío: %s', e)
+    resumen = report.save()
+    if report.total:
+        logger.info('Bandeja de correo (%s): %d enviados, %d reintentos, %d fallidos, p50=%s ms p95=%s ms',
+                    origen, resumen[ENVIADO], resumen['reintento'], resumen[FALLIDO],
+                    _fmt_ms(resumen['p50_ms']), _fmt_ms(resumen['p95_ms']))
+    return resumen
+
+
+def _fmt_ms(value):
+    return f'{value:.0f}' if value is not None else '-'
+
+
+def requeue_failed(ids=None) -> int:
+    """Vuelve a poner en cola los correos en dead letter (todos o los ids indicados)."""
+    q = db.session.query(EmailOutbox).filter(EmailOutbox.estado == FALLIDO)
+    if ids:
+        q = q.filter(EmailOutbox.id.in_(list(ids)))
+    n = q.update({EmailOutbox.estado: PENDIENTE, EmailOutbox.intentos: 0,
+                  EmailOutbox.proximo_intento: datetime.utcnow()}, synchronize_session=False)
+    db.session.info[_PENDING_FLAG] = bool(n)
+    db.session.commit()
+    return n
+
+
+def purge_sent(days: int = 30) -> int:
+    """Borra los enviados hace más de `days` días (su clave deja de deduplicar)."""
+    limit = datetime.utcnow() - timedelta(days=days)
+    n = db.session.query(EmailOutbox).filter(EmailOutbox.estado == ENVIADO, EmailOutbox.enviado_en < limit) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return n
+
+
+def stats() -> dict:
+    """Conteo por estado (para paneles y scripts)."""
+    rows = db.session.query(EmailOutbox.estado, db.func.count(EmailOutbox.id)).group_by(EmailOutbox.estado).all()
+    out = {PENDIENTE: 0, ENVIANDO: 0, ENVIADO: 0, FALLIDO: 0}
+    out.update(dict(rows))
+    return out
+
+
+class OutboxWorker:
+    """Hilo de entrega por proceso. Se arranca en la primera petición (después del fork).
+
+    Conserva su Dispatcher entre rondas, así las conexiones SMTP autenticadas se reutilizan
+    de un despertar al siguiente; lo cierra tras SMTP_IDLE_TIMEOUT segundos sin enviar.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self, app) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(app,), name='email-outbox', daemon=True)
+            self._thread.start()
+            # Entregar lo que haya quedado pendiente de antes del arranque
+            self._event.set()
+
+    def wake(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            self._event.set()
+
+    def _run(self, app):
+        poll = float(app.config.get('EMAIL_OUTBOX_POLL', 30))
+        dispatcher = None
+        last_used = 0.0
+        next_poll = time.monotonic() + poll
+        while True:
+            deadline = next_poll
+            if dispatcher is not None:
+                deadline = min(deadline, last_used + dispatcher.settings['idle_timeout'])
+            woke = self._event.wait(max(0.0, deadline - time.monotonic()))
+            self._event.clear()
+            now = time.monotonic()
+            if not woke and now < next_poll:
+                # Solo venció la inactividad: cerrar las conexiones SMTP hasta el próximo envío
+                dispatcher.close()
+                dispatcher = None
+                continue
+            next_poll = now + poll
+            with app.app_context():
+                try:
+                    if dispatcher is None:
+                        dispatcher = Dispatcher()
+                        last_used = now
+                    if drain(dispatcher=dispatcher)['total']:
+                        last_used = time.monotonic()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning('No se pudo drenar la bandeja de correo: %s', e)
+                finally:
+                    db.session.remove()
+
+
+outbox_worker = OutboxWorker()
+
+
+def init_email_outbox(app) -> None:
+    mode = (app.config.get('EMAIL_OUTBOX_WORKER') or 'thread').strip().lower()
+    if mode != 'thread':
+        logger.info('Bandeja de correo sin hilo en el proceso web (EMAIL_OUTBOX_WORKER=%s)', mode)
+        return
+
+    @app.before_request
+    def _start_email_outbox_worker():
+        outbox_worker.ensure_started(app)
@@ -0,0 +1,181 @@
+"""
+Plantillas Jinja de los correos (templates/email).
+
+Las notificaciones y el correo del ticket se armaban con f-strings de ~100 líneas que
+repetían el <style> en cada mensaje. Ahora:
+
+- Las plantillas heredan de email/_layout.html; los estilos viven en email/estilos.css.
+- InlineCssLoader, al *cargar* la plantilla, la aplana (sustituye {% extends %} y los
+  {% include %} con nombre fijo por el texto de la plantilla base / incluida) y copia los
+  estilos al atributo style de cada elemento (muchos clientes de correo ignoran <style>).
+  El render no resuelve herencia, no abre contextos para includes ni hace trabajo de CSS:
+  cada correo es una sola función compilada (ver scripts/bench_email_render.py).
+- Un Environment propio por proceso, sin auto_reload: cada plantilla se compila una vez
+  por worker y los lotes de notificaciones reutilizan el código compilado; render_email()
+  guarda la plantilla ya cargada y renderiza sin copiar los globals del Environment.
+- La parte de texto plano la genera utils/mailer.build_message a partir del HTML.
+"""
+import functools
+import logging
+import os
+import re
+import threading
+from jinja2 import Environment, FileSystemLoader
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+STYLESHEET = os.path.join(TEMPLATES_DIR, 'email', 'estilos.css')
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_SELECTOR_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9]*)?((?:\.[\w-]+)*)$')
+_TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?(/?)>')
+_ATTR_RE = re.compile(r'\s(class|style)\s*=\s*"([^"]*)"', re.I)
+_EXTENDS_RE = re.compile(r'^\s*(?:\{#.*?#\}\s*)*\{%-?\s*extends\s+([\'"])([^\'"]+)\1\s*-?%\}', re.S)
+_BLOCK_RE = re.compile(r'\{%-?\s*block\s+(\w+)\s*-?%\}(.*?)\{%-?\s*endblock(?:\s+\1)?\s*-?%\}', re.S)
+_COMMENT_TAG_RE = re.compile(r'\{#.*?#\}', re.S)
+_INCLUDE_RE = re.compile(r'\{%-?\s*include\s+([\'"])([^\'"]+)\1\s*-?%\}')
+
+
+def parse_css(css: str) -> list:
+    """Reglas [(etiqueta|None, {clases}, especificidad, orden, declaraciones)].
+
+    Solo se admiten selectores simples (etiqueta, .clase, etiqueta.clase.otra); los
+    demás se ignoran con un aviso.
+    """
+    rules = []
+    for selectors, body in _RULE_RE.findall(_COMMENT_RE.sub('', css)):
+        decls = [d.strip() for d in body.split(';') if d.strip()]
+        for selector in selectors.split(','):
+            selector = selector.strip()
+            m = _SELECTOR_RE.match(selector)
+            if not selector or not m:
+                logger.warning('Selector de correo no soportado, se ignora: %s', selector)
+                continue
+            tag = (m.group(1) or '').lower() or None
+            classes = frozenset(c for c in m.group(2).split('.') if c)
+            specificity = (len(classes), 1 if tag else 0)
+            rules.append((tag, classes, specificity, len(rules), decls))
+    return rules
+
+
+def inline_css(source: str, rules: list) -> str:
+    """Escribe en style="" las declaraciones de `rules` que aplican a cada etiqueta.
+
+    El style propio del elemento va al final y gana. Las etiquetas cuyo class contiene
+    expresiones Jinja se dejan como están.
+    """
+    def replace(m):
+        tag, attrs, closing = m.group(1).lower(), m.group(2) or '', m.group(3)
+        found = {k.lower(): v for k, v in _ATTR_RE.findall(attrs)}
+        if '{{' in found.get('class', '') or '{%' in found.get('class', ''):
+            return m.group(0)
+        classes = set(found.get('class', '').split())
+        matched = sorted(
+            (r for r in rules if (r[0] is None or r[0] == tag) and r[1] <= classes and (r[0] or r[1])),
+            key=lambda r: (r[2], r[3]),
+        )
+        if not matched:
+            return m.group(0)
+        decls = [d for r in matched for d in r[4]]
+        own = found.get('style', '').strip().rstrip(';')
+        if own:
+            decls.append(own)
+        style = '; '.join(decls) + ';'
+        attrs = _ATTR_RE.sub(lambda a: '' if a.group(1).lower() == 'style' else a.group(0), attrs)
+        return f'<{m.group(1)}{attrs} style="{style}"{closing}>'
+
+    return _TAG_RE.sub(replace, source)
+
+
+def flatten(source: str, load) -> str:
+    """Sustituye {% extends %} y los {% include %} con nombre fijo por el texto de esas plantillas.
+
+    `load(nombre)` devuelve el fuente (ya aplanado) de otra plantilla. Solo se aplana la
+    herencia simple: bloques sin anidar, sin super() ni self.<bloque>, y nada fuera de
+    los bloques en la hija; si no, se deja el {% extends %} para que lo resuelva Jinja.
+    """
+    source = _INCLUDE_RE.sub(lambda m: load(m.group(2)).rstrip('\n'), source)
+    m = _EXTENDS_RE.match(source)
+    if not m:
+        return source
+    body = source[m.end():]
+    # trim_blocks: el salto de línea tras {% block %} no forma parte del contenido
+    blocks = {name: content[1:] if content.startswith('\n') else content for name, content in _BLOCK_RE.findall(body)}
+    rest = _COMMENT_TAG_RE.sub('', _BLOCK_RE.sub('', body))
+    if rest.strip() or 'super()' in body or 'self.' in body or '{% block' in ''.join(blocks.values()):
+        return source
+    parent = load(m.group(2))
+    return _BLOCK_RE.sub(lambda b: blocks.get(b.group(1), b.group(2)), parent)
+
+
+class InlineCssLoader(FileSystemLoader):
+    """FileSystemLoader que aplana y aplica estilos.css en línea al leer cada plantilla .html."""
+
+    def __init__(self, searchpath, stylesheet: str):
+        super().__init__(searchpath)
+        with open(stylesheet, 'r', encoding='utf-8') as fh:
+            self.rules = parse_css(fh.read())
+
+    def _flat_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template.endswith('.html'):
+            source = flatten(source, lambda name: self._flat_source(environment, name)[0])
+        return source, filename, uptodate
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = self._flat_source(environment, template)
+        if template.endswith('.html'):
+            source = inline_css(source, self.rules)
+        return source, filename, uptodate
+
+
+@functools.lru_cache(maxsize=1024)
+def _fecha_texto(value) -> str:
+    return value.strftime('%d de %B de %Y')
+
+
+def _fecha(value, default=''):
+    # Un lote diario repite las mismas fechas; strftime con %B es lo más caro del render
+    return _fecha_texto(value) if value else default
+
+
+_env = None
+_env_lock = threading.Lock()
+_templates = {}  # nombre -> Template compilada (sin pasar por el LRU ni su candado en cada render)
+
+
+def environment() -> Environment:
+    """Environment de correos del proceso (se crea en el primer uso)."""
+    global _env
+    if _env is None:
+        with _env_lock:
+            if _env is None:
+                env = Environment(
+                    loader=InlineCssLoader(TEMPLATES_DIR, STYLESHEET),
+                    # Todas las plantillas de correo son HTML; un bool evita evaluar la regla en cada render
+                    autoescape=True,
+                    auto_reload=False,
+                    cache_size=100,
+                    trim_blocks=True,
+                    lstrip_blocks=True,
+                )
+                env.filters['fecha'] = _fecha
+                _env = env
+    return _env
+
+
+def render_email(name: str, **context) -> str:
+    """Renderiza templates/email/<name> con los estilos ya en línea."""
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = environment().get_template(f'email/{name}')
+    # Contexto sin los globals del Environment (las plantillas de correo no los usan):
+    # Template.render/new_context los copian y recorren en cada llamada
+    env = template.environment
+    ctx = env.context_class(env, context, template.name, template.blocks)
+    try:
+        return env.concat(template.root_render_func(ctx))
+    except Exception:
+        env.handle_exception()
@@ -0,0 +1,80 @@
+"""
+Entrega de archivos delegada al proxy (X-Accel-Redirect / X-Sendfile).
+
+Con workers sync, servir una imagen grande o un PDF a un cliente móvil lento ocupa un
+worker durante toda la descarga. Con FILE_OFFLOAD la vista solo autoriza y responde
+cabeceras; el proxy de delante envía los bytes:
+
+- FILE_OFFLOAD=x-accel (nginx): X-Accel-Redirect con la URI interna que corresponde a
+  instance/uploads (X_ACCEL_UPLOADS_PREFIX, por defecto /_protected/uploads/):
+
+      location /_protected/uploads/ {
+          internal;
+          alias /app/instance/uploads/;
+      }
+
+- FILE_OFFLOAD=x-sendfile (Apache mod_xsendfile, lighttpd): X-Sendfile con la ruta absoluta.
+- Sin valor (por defecto): send_from_directory condicional, con soporte de Range/If-None-Match.
+
+Content-Type, Content-Disposition y Cache-Control los pone la app en todos los modos.
+"""
+import os
+from urllib.parse import quote
+from flask import abort, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file as _werkzeug_send_file
+
+OFFLOAD_MODES = ('', 'x-accel', 'x-sendfile')
+
+
+def offload_mode() -> str:
+    mode = (current_app.config.get('FILE_OFFLOAD') or '').strip().lower()
+    return mode if mode in OFFLOAD_MODES else ''
+
+
+def uploads_root(app=None) -> str:
+    app = app or current_app
+    return os.path.join(app.root_path, 'instance', 'uploads')
+
+
+def _accel_uri(path: str):
+    """URI interna de nginx para una ruta bajo instance/uploads (None si está fuera)."""
+    root = os.path.realpath(uploads_root())
+    real = os.path.realpath(path)
+    if not real.startswith(root + os.sep):
+        return None
+    prefix = current_app.config.get('X_ACCEL_UPLOADS_PREFIX') or '/_protected/uploads/'
+    rel = os.path.relpath(real, root).replace(os.sep, '/')
+    return prefix.rstrip('/') + '/' + quote(rel)
+
+
+def send_protected_file(directory: str, filename: str, **kwargs):
+    """send_from_directory con delegación al proxy según FILE_OFFLOAD. Llamar tras autorizar."""
+    mode = offload_mode()
+    if not mode:
+        kwargs.setdefault('conditional', True)
+        return send_from_directory(directory, filename, **kwargs)
+
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    accel_uri = _accel_uri(path) if mode == 'x-accel' else None
+    if mode == 'x-accel' and accel_uri is None:
+        # Fuera de la ubicación interna configurada: servir desde la app
+        kwargs.setdefault('conditional', True)
+        return send_from_directory(directory, filename, **kwargs)
+
+    response = _werkzeug_send_file(
+        path, request.environ,
+        mimetype=kwargs.get('mimetype'),
+        as_attachment=kwargs.get('as_attachment', False),
+        download_name=kwargs.get('download_name'),
+        use_x_sendfile=True,
+        # Range y condicionales los resuelve el proxy sobre el archivo real
+        conditional=False,
+        max_age=current_app.get_send_file_max_age,
+    )
+    if accel_uri:
+        response.headers.pop('X-Sendfile', None)
+        response.headers['X-Accel-Redirect'] = accel_uri
+    return response
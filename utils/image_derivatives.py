@@ -0,0 +1,358 @@
+"""
+Derivados responsivos de imágenes subidas y estáticas.
+
+Por cada imagen se generan versiones redimensionadas en WebP y AVIF (thumb 320 px,
+card 768 px, hero 1600 px de ancho, sin ampliar) más un placeholder difuminado de 16 px
+como data URI. Los archivos van a instance/uploads/derivatives/<hash del contenido>/
+(servidos por /media con caché immutable) y se registran en la tabla image_derivative
+contra la clave canónica del archivo original (ver utils/media_cache.source_key).
+
+- process_upload(ruta): lo llaman los helpers de subida tras guardar el archivo;
+  invalida media_url y genera los derivados en segundo plano.
+- sources(ruta, sizes) / srcset(ruta, formato) / placeholder(ruta): helpers de
+  plantilla (media_sources, media_srcset, media_placeholder); las imágenes van en
+  <picture> con un <source> AVIF y otro WebP. Leen un índice en memoria de toda la tabla que se recarga cuando
+  cambia el sello 'contenido:imagenes' (el mismo que invalida las páginas en caché, leído
+  de la instantánea de page_cache) o al vencer el TTL de MEDIA_URL_CACHE_TTL.
+- save_rows() reemplaza los registros de una clave bajo SELECT ... FOR UPDATE de sus
+  filas en image_derivative; la primera inserción concurrente de una clave choca con
+  uq_image_derivative y se reintenta. Dos subidas del mismo original no se pisan.
+- Backfill de archivos existentes: python scripts/backfill_image_derivatives.py
+
+Sin Pillow (o sin soporte AVIF en Pillow) se omite lo que no se puede generar y las
+plantillas siguen usando solo src.
+"""
+import base64
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, url_for
+from sqlalchemy.exc import IntegrityError, OperationalError
+from markupsafe import Markup, escape
+from models.baseDatos import db, ImageDerivative
+from utils.lazy_imports import pil_image, pil_imageops, pil_features
+from utils.media_cache import media_url_cache, resolve_source
+from utils.page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+DERIV_DIR = 'derivatives'
+VARIANTS = (('thumb', 320), ('card', 768), ('hero', 1600))
+FORMATS = ('webp', 'avif')
+QUALITY = {'webp': 80, 'avif': 55}
+BLUR_WIDTH = 16
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif')
+SAVE_RETRIES = 3  # save_rows() ante la primera inserción concurrente de una clave
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def uploads_dir(app=None) -> str:
+    app = app or current_app
+    return os.path.join(app.root_path, 'instance', 'uploads')
+
+
+def available_formats():
+    if not pil_image.available():
+        return ()
+    return tuple(f for f in FORMATS if pil_features.check(f))
+
+
+def _content_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def _normalized(raw):
+    """Aplica la orientación EXIF (fotos de teléfono) y deja la imagen en RGB/RGBA."""
+    im = pil_imageops.exif_transpose(raw)
+    has_alpha = im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info
+    if im.mode not in ('RGB', 'RGBA'):
+        im = im.convert('RGBA' if has_alpha else 'RGB')
+    return im
+
+
+def render(key: str, src_path: str, out_dir: str) -> list:
+    """Genera los archivos derivados (sin tocar la BD). Devuelve una lista de dicts para image_derivative."""
+    formats = available_formats()
+    if not formats:
+        return []
+    digest = _content_hash(src_path)
+    stem = os.path.splitext(os.path.basename(src_path))[0][:60]
+    rel_dir = f'{DERIV_DIR}/{digest}'
+    os.makedirs(os.path.join(out_dir, rel_dir), exist_ok=True)
+    rows = []
+    with pil_image.open(src_path) as raw:
+        im = _normalized(raw)
+        width, height = im.size
+        last_width = None
+        for variante, target in VARIANTS:
+            w = min(target, width)
+            if w == last_width:
+                # Imagen pequeña: no repetir el mismo ancho en varias variantes
+                continue
+            last_width = w
+            h = max(1, round(height * w / width))
+            resized = im if w == width else im.resize((w, h), pil_image.LANCZOS)
+            for fmt in formats:
+                rel = f'{rel_dir}/{stem}-{variante}.{fmt}'
+                dst = os.path.join(out_dir, rel)
+                # Temporal propio: dos subidas del mismo contenido escriben los mismos destinos
+                tmp = f'{dst}.{os.getpid()}-{threading.get_ident()}.tmp'
+                # La carpeta puede haberla borrado un reemplazo concurrente que la dejó vacía
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                resized.save(tmp, format=fmt.upper(), quality=QUALITY[fmt])
+                os.replace(tmp, dst)
+                rows.append({'origen': key, 'variante': variante, 'formato': fmt, 'ancho': w, 'alto': h,
+                             'ruta': rel, 'bytes': os.path.getsize(dst), 'datos': None})
+        blur = im.copy()
+        blur.thumbnail((BLUR_WIDTH, BLUR_WIDTH * 4))
+        buf = io.BytesIO()
+        blur.save(buf, format='WEBP', quality=30)
+        rows.append({'origen': key, 'variante': 'blur', 'formato': 'webp', 'ancho': blur.width, 'alto': blur.height,
+                     'ruta': None, 'bytes': buf.tell(),
+                     'datos': 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')})
+    return rows
+
+
+def save_rows(key: str, rows: list, out_dir: str) -> bool:
+    """Reemplaza los registros de la clave y borra los archivos de derivados anteriores que ya no se usan.
+
+    Devuelve False (sin cambios) si otro reemplazo concurrente borró alguno de los archivos
+    nuevos mientras esperaba el bloqueo; el llamador puede volver a generarlos.
+    """
+    for attempt in range(SAVE_RETRIES):
+        try:
+            return _replace_rows(key, rows, out_dir)
+        except (IntegrityError, OperationalError):
+            # Primera inserción concurrente de la clave: choca con uq_image_derivative (o un
+            # deadlock por los bloqueos de hueco); al reintentar las filas ya existen y el
+            # FOR UPDATE serializa el reemplazo.
+            db.session.rollback()
+            if attempt == SAVE_RETRIES - 1:
+                raise
+
+
+def _replace_rows(key: str, rows: list, out_dir: str) -> bool:
+    # Lectura con bloqueo de las filas de la clave hasta el commit: ve lo último confirmado
+    # aunque la transacción empezara antes
+    old = db.session.query(ImageDerivative).filter_by(origen=key).with_for_update().all()
+    new_paths = {r['ruta'] for r in rows if r['ruta']}
+    if any(not os.path.isfile(os.path.join(out_dir, rel)) for rel in new_paths):
+        db.session.rollback()
+        return False
+    stale = [o.ruta for o in old if o.ruta and o.ruta not in new_paths]
+    # DELETE por clave (no fila a fila): también borra lo que otro reemplazo confirmó entretanto
+    for o in old:
+        db.session.expunge(o)
+    db.session.query(ImageDerivative).filter_by(origen=key).delete(synchronize_session=False)
+    for r in rows:
+        db.session.add(ImageDerivative(**r))
+    # Las páginas en caché llevan srcset/placeholder de la imagen
+    page_cache.invalidate('imagenes')
+    db.session.commit()
+    for rel in stale:
+        try:
+            os.remove(os.path.join(out_dir, rel))
+            parent = os.path.dirname(os.path.join(out_dir, rel))
+            if not os.listdir(parent):
+                os.rmdir(parent)
+        except OSError:
+            pass
+    derivative_index.invalidate()
+    return True
+
+
+def generate(image_path) -> int:
+    """Genera y registra los derivados de una ruta guardada. Devuelve cuántos se registraron."""
+    src, key = resolve_source(image_path)
+    if not src or not src.lower().endswith(IMAGE_EXTENSIONS):
+        return 0
+    out_dir = uploads_dir()
+    for _ in range(2):
+        rows = render(key, src, out_dir)
+        if not rows or save_rows(key, rows, out_dir):
+            return len(rows)
+        # Un reemplazo concurrente borró nuestros archivos: volver a escribirlos
+    logger.warning('Derivados de %s descartados: reemplazo concurrente', key)
+    return 0
+
+
+def _generate_in_background(app, image_path):
+    with app.app_context():
+        try:
+            generate(image_path)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning('No se pudieron generar derivados de %s: %s', image_path, e)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        # Se crea en el primer uso (después del fork de gunicorn)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='img-deriv')
+        return _executor
+
+
+def process_upload(image_path) -> None:
+    """Llamar tras guardar una imagen subida: invalida media_url y agenda sus derivados."""
+    media_url_cache.invalidate(image_path)
+    if not image_path or not available_formats():
+        return
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_DERIVATIVES_ASYNC', True):
+        _get_executor().submit(_generate_in_background, app, image_path)
+    else:
+        _generate_in_background(app, image_path)
+
+
+class DerivativeIndex:
+    """Vista en memoria de image_derivative: clave -> {'webp': [(ancho, ruta)], 'avif': [...], 'blur': data URI}."""
+
+    def __init__(self):
+        self._entries = {}
+        self._expires = 0.0
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        entries = {}
+        rows = db.session.query(
+            ImageDerivative.origen, ImageDerivative.variante, ImageDerivative.formato,
+            ImageDerivative.ancho, ImageDerivative.ruta, ImageDerivative.datos,
+        ).all()
+        for origen, variante, formato, ancho, ruta, datos in rows:
+            entry = entries.setdefault(origen, {})
+            if variante == 'blur':
+                entry['blur'] = datos
+            elif ruta:
+                entry.setdefault(formato, []).append((ancho, ruta))
+        for entry in entries.values():
+            for fmt in FORMATS:
+                if fmt in entry:
+                    entry[fmt].sort()
+        return entries
+
+    def get(self, key):
+        if not key:
+            return {}
+        now = time.monotonic()
+        # Otro worker guardó derivados: su commit incrementó contenido:imagenes
+        stamp = page_cache.content_version('imagenes')
+        if now >= self._expires or stamp != self._stamp:
+            with self._lock:
+                if now >= self._expires or stamp != self._stamp:
+                    try:
+                        self._entries = self._load()
+                    except Exception as e:
+                        # Tabla aún no migrada: reintentar en el próximo periodo
+                        db.session.rollback()
+                        logger.warning('No se pudo cargar image_derivative: %s', e)
+                        self._entries = {}
+                    self._stamp = stamp
+                    self._expires = now + max(media_url_cache.ttl, 1)
+        return self._entries.get(key, {})
+
+    def invalidate(self):
+        self._expires = 0.0
+
+
+derivative_index = DerivativeIndex()
+
+
+def srcset(image_path, fmt: str = 'webp') -> str:
+    """Valor para el atributo srcset ('' si la imagen no tiene derivados en ese formato)."""
+    try:
+        entry = derivative_index.get(media_url_cache.key(image_path))
+        return ', '.join(f"{url_for('media_file', filename=ruta)} {ancho}w" for ancho, ruta in entry.get(fmt, ()))
+    except Exception:
+        return ''
+
+
+def sources(image_path, sizes: str) -> Markup:
+    """Etiquetas <source> (AVIF primero, luego WebP) para un <picture>; solo los formatos con derivados."""
+    out = []
+    for fmt in ('avif', 'webp'):
+        value = srcset(image_path, fmt)
+        if value:
+            out.append(f'<source type="image/{fmt}" srcset="{escape(value)}" sizes="{escape(sizes)}">')
+    return Markup(''.join(out))
+
+
+def placeholder(image_path) -> str:
+    """Data URI del placeholder difuminado ('' si no hay)."""
+    try:
+        return derivative_index.get(media_url_cache.key(image_path)).get('blur') or ''
+    except Exception:
+        return ''
+
+
+def iter_backfill_sources(app):
+    """Rutas guardadas equivalentes de los archivos existentes en static/img e instance/uploads."""
+    static_img = os.path.join(app.static_folder, 'img')
+    for root, _, files in os.walk(static_img):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                rel = os.path.relpath(os.path.join(root, name), app.static_folder).replace(os.sep, '/')
+                yield f'static/{rel}'
+    base = uploads_dir(app)
+    for root, dirs, files in os.walk(base):
+        dirs[:] = [d for d in dirs if not (root == base and d == DERIV_DIR)]
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                rel = os.path.relpath(os.path.join(root, name), base).replace(os.sep, '/')
+                yield f'uploads/{rel}'
+
+
+def backfill(force: bool = False, workers: int = 4, progress=None) -> dict:
+    """Genera derivados de los archivos existentes. El render va en paralelo; la BD desde este hilo."""
+    counts = {'total': 0, 'generated': 0, 'skipped': 0, 'error': 0}
+    formats = available_formats()
+    if not formats:
+        raise RuntimeError('Pillow no está instalado o no soporta WebP/AVIF')
+    app = current_app._get_current_object()
+    out_dir = uploads_dir(app)
+    done = set() if force else {k for (k,) in db.session.query(ImageDerivative.origen).distinct()}
+    items = []
+    for stored in iter_backfill_sources(app):
+        src, key = resolve_source(stored)
+        if not src:
+            continue
+        if key in done:
+            counts['skipped'] += 1
+            continue
+        done.add(key)
+        items.append((key, src))
+    counts['total'] = len(items) + counts['skipped']
+
+    def _safe_render(item):
+        key, src = item
+        try:
+            return key, render(key, src, out_dir), None
+        except Exception as e:
+            return key, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for n, (key, rows, error) in enumerate(pool.map(_safe_render, items), start=1):
+            if error:
+                counts['error'] += 1
+                logger.warning('No se pudieron generar derivados de %s: %s', key, error)
+            elif save_rows(key, rows, out_dir):
+                counts['generated'] += 1
+            else:
+                counts['error'] += 1
+                logger.warning('Derivados de %s descartados: reemplazo concurrente', key)
+            if progress:
+                progress(n, len(items), key, counts)
+    return counts
+
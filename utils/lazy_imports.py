@@ -0,0 +1,80 @@
+"""
+Importación perezosa de librerías pesadas u opcionales.
+
+Los blueprints se importan en cada worker al arrancar; reportlab, openpyxl, numpy,
+Pillow, requests y mercadopago solo se necesitan al exportar un PDF/XLSX, generar
+derivados de imágenes, dibujar la matriz de ocupación o hablar con la pasarela de
+pago. Estos proxies importan el módulo real en el primer acceso a un atributo:
+
+    from utils.lazy_imports import rl_canvas, rl_pagesizes
+    c = rl_canvas.Canvas(buf, pagesize=rl_pagesizes.A4)
+
+Si la librería no está instalada, el acceso lanza ImportError; available() permite
+comprobarlo antes para mostrar un mensaje en lugar de un error 500.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_error'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is not None:
+            return module
+        with self.__dict__['_lock']:
+            if self.__dict__['_module'] is None:
+                if self.__dict__['_error'] is not None:
+                    raise ImportError(self.__dict__['_error'])
+                try:
+                    self.__dict__['_module'] = importlib.import_module(self._name)
+                except ImportError as e:
+                    # No reintentar en cada petición si la dependencia no está instalada
+                    self.__dict__['_error'] = str(e)
+                    raise
+            return self.__dict__['_module']
+
+    def available(self) -> bool:
+        try:
+            self._load()
+            return True
+        except ImportError:
+            return False
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        estado = 'cargado' if self.loaded else 'pendiente'
+        return f"<LazyModule {self._name} ({estado})>"
+
+
+# PDF (tickets, exportación de inventario)
+rl_canvas = LazyModule('reportlab.pdfgen.canvas')
+rl_pagesizes = LazyModule('reportlab.lib.pagesizes')
+# XLSX (exportación de inventario)
+openpyxl = LazyModule('openpyxl')
+openpyxl_utils = LazyModule('openpyxl.utils')
+# Derivados de imágenes (WebP/AVIF)
+pil_image = LazyModule('PIL.Image')
+pil_imageops = LazyModule('PIL.ImageOps')
+pil_features = LazyModule('PIL.features')
+# Matriz de ocupación del calendario de administración
+numpy = LazyModule('numpy')
+# Compresión brotli (opcional; sin ella se usa gzip)
+brotli = LazyModule('brotli')
+# Pasarelas de pago
+requests = LazyModule('requests')
+mercadopago = LazyModule('mercadopago')
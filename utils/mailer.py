@@ -1,20 +1,29 @@
 import os
+import re
 import smtplib
-from typing import List, Optional, Tuple
+import threading
+import time
+import logging
+from typing import Iterable, List, Optional, Tuple
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
+from html.parser import HTMLParser
 
+logger = logging.getLogger(__name__)
 
-def send_email(to_email: str, subject: str, html_body: str, attachments: Optional[List[Tuple[str, bytes]]] = None) -> bool:
-    """Send an email using SMTP settings from environment.
+# Errors after which the connection is discarded and the message retried once
+# (SMTPException derives from OSError, so SMTP replies are told apart first)
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
 
-    Args:
-        to_email: Recipient email address
-        subject: Email subject
-        html_body: HTML body content
-        attachments: Optional list of (filename, file_bytes)
+
+def smtp_settings() -> dict:
+    """SMTP settings from environment.
 
     Env vars supported:
         SMTP_HOST (default: smtp.gmail.com)
@@ -23,42 +32,278 @@ def send_email(to_email: str, subject: str, html_body: str, attachments: Optiona
         SMTP_USE_TLS (default: true)
         SMTP_USE_SSL (default: false)
         SMTP_FROM (optional; uses SMTP_USER when not set)
+        SMTP_TIMEOUT (default: 30 seconds)
+        SMTP_PERSISTENT (default: true; reuse one authenticated connection per thread)
+        SMTP_IDLE_TIMEOUT (default: 60 seconds; idle connections older than this are reopened)
+        SMTP_MAX_PER_CONNECTION (default: 100 messages before reconnecting)
     """
-    try:
-        host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-        port = int(os.getenv("SMTP_PORT", "587"))
-        user = os.getenv("SMTP_USER")
-        password = os.getenv("SMTP_PASSWORD")
-        use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
-        use_ssl = os.getenv("SMTP_USE_SSL", "false").lower() == "true"
-        from_email = os.getenv("SMTP_FROM") or user
-
-        if not user or not password:
-            raise RuntimeError("SMTP_USER or SMTP_PASSWORD not configured")
+    user = os.getenv("SMTP_USER")
+    return {
+        "host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "user": user,
+        "password": os.getenv("SMTP_PASSWORD"),
+        "use_tls": _env_bool("SMTP_USE_TLS", "true"),
+        "use_ssl": _env_bool("SMTP_USE_SSL", "false"),
+        "from_email": os.getenv("SMTP_FROM") or user,
+        "timeout": float(os.getenv("SMTP_TIMEOUT", "30")),
+        "persistent": _env_bool("SMTP_PERSISTENT", "true"),
+        "idle_timeout": float(os.getenv("SMTP_IDLE_TIMEOUT", "60")),
+        "max_per_connection": int(os.getenv("SMTP_MAX_PER_CONNECTION", "100")),
+    }
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the readable text of an HTML document, one line per block element."""
+
+    BLOCKS = {"p", "div", "br", "tr", "table", "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5", "h6", "hr"}
+    SKIP = {"head", "style", "script", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+        self._href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+            if tag == "li":
+                self.parts.append("- ")
+        elif tag == "a":
+            self._href = dict(attrs).get("href")
 
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+        elif tag == "a" and self._href:
+            if self._href not in (self.parts[-1] if self.parts else ""):
+                self.parts.append(f" ({self._href})")
+            self._href = None
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def html_to_text(html_body: str) -> str:
+    """Plain-text rendering of an HTML email (used as the text/plain alternative)."""
+    parser = _TextExtractor()
+    parser.feed(html_body or "")
+    parser.close()
+    lines = [line.strip() for line in "".join(parser.parts).splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+
+def build_message(from_email: str, to_email: str, subject: str, html_body: str,
+                  attachments: Optional[List[Tuple[str, bytes]]] = None,
+                  text_body: Optional[str] = None) -> MIMEMultipart:
+    """multipart/alternative (text + HTML), wrapped in multipart/mixed when there are attachments.
+
+    The text part is generated from the HTML unless `text_body` is given.
+    """
+    body = MIMEMultipart("alternative")
+    body.attach(MIMEText(text_body if text_body is not None else html_to_text(html_body), "plain", "utf-8"))
+    body.attach(MIMEText(html_body, "html", "utf-8"))
+    if attachments:
         msg = MIMEMultipart()
-        msg["From"] = from_email
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-        # Attach files
-        for fname, fbytes in (attachments or []):
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(fbytes)
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f'attachment; filename="{fname}"')
-            msg.attach(part)
-
-        if use_ssl:
-            server = smtplib.SMTP_SSL(host, port)
+        msg.attach(body)
+    else:
+        msg = body
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg["Subject"] = subject
+
+    # Attach files
+    for fname, fbytes in (attachments or []):
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(fbytes)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename="{fname}"')
+        msg.attach(part)
+    return msg
+
+
+class SmtpTransport:
+    """One authenticated SMTP connection, reopened on demand.
+
+    The connection is opened on the first send and kept for later ones. It is
+    reopened when the server dropped it, after `idle_timeout` seconds without
+    use, or after `max_per_connection` messages. A message that fails with a
+    connection error is retried once on a fresh connection.
+    """
+
+    def __init__(self, settings: Optional[dict] = None):
+        self.settings = settings or smtp_settings()
+        self._server = None
+        self._last_used = 0.0
+        self._sent_on_connection = 0
+        self.connections_opened = 0
+
+    def _connect(self):
+        s = self.settings
+        if not s["user"] or not s["password"]:
+            raise RuntimeError("SMTP_USER or SMTP_PASSWORD not configured")
+        if s["use_ssl"]:
+            server = smtplib.SMTP_SSL(s["host"], s["port"], timeout=s["timeout"])
         else:
-            server = smtplib.SMTP(host, port)
-            if use_tls:
+            server = smtplib.SMTP(s["host"], s["port"], timeout=s["timeout"])
+            if s["use_tls"]:
                 server.starttls()
-        server.login(user, password)
-        server.sendmail(from_email, to_email, msg.as_string())
-        server.quit()
+        server.login(s["user"], s["password"])
+        self._server = server
+        self._sent_on_connection = 0
+        self.connections_opened += 1
+        return server
+
+    def _ensure(self):
+        s = self.settings
+        if self._server is not None:
+            idle = time.monotonic() - self._last_used
+            if idle > s["idle_timeout"] or self._sent_on_connection >= s["max_per_connection"]:
+                self.close()
+        return self._server or self._connect()
+
+    def send_message(self, msg, to_email: str) -> None:
+        """Send a built message; raises on failure."""
+        from_email = self.settings["from_email"]
+        payload = msg.as_string()
+        for attempt in (1, 2):
+            server = self._ensure()
+            try:
+                server.sendmail(from_email, to_email, payload)
+                self._sent_on_connection += 1
+                self._last_used = time.monotonic()
+                return
+            except _CONNECTION_ERRORS:
+                self._discard()
+                if attempt == 2:
+                    raise
+            except smtplib.SMTPException as e:
+                if getattr(e, "smtp_code", None) == 421:
+                    # Server is closing the session (too many messages, timeout)
+                    self._discard()
+                    if attempt == 2:
+                        raise
+                    continue
+                # Message-level rejection: leave the session in a clean state for the next one
+                try:
+                    server.rset()
+                except Exception:
+                    self._discard()
+                raise
+            except OSError:
+                self._discard()
+                if attempt == 2:
+                    raise
+
+    def send(self, to_email: str, subject: str, html_body: str,
+             attachments: Optional[List[Tuple[str, bytes]]] = None) -> None:
+        msg = build_message(self.settings["from_email"], to_email, subject, html_body, attachments)
+        self.send_message(msg, to_email)
+
+    def _discard(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                try:
+                    server.close()
+                except Exception:
+                    pass
+
+
+# One persistent transport per thread (gunicorn worker thread, notification job...)
+_local = threading.local()
+
+
+def _thread_transport() -> SmtpTransport:
+    transport = getattr(_local, "transport", None)
+    if transport is None:
+        transport = _local.transport = SmtpTransport()
+    return transport
+
+
+def close_transport() -> None:
+    """Close this thread's persistent connection (e.g. at the end of a batch job)."""
+    transport = getattr(_local, "transport", None)
+    if transport is not None:
+        transport.close()
+        _local.transport = None
+
+
+def send_email(to_email: str, subject: str, html_body: str, attachments: Optional[List[Tuple[str, bytes]]] = None) -> bool:
+    """Send an email using SMTP settings from environment (see smtp_settings).
+
+    Args:
+        to_email: Recipient email address
+        subject: Email subject
+        html_body: HTML body content
+        attachments: Optional list of (filename, file_bytes)
+
+    With SMTP_PERSISTENT (default) the thread's authenticated connection is reused;
+    otherwise a connection is opened and closed for this message only.
+    """
+    try:
+        settings = smtp_settings()
+        if settings["persistent"]:
+            _thread_transport().send(to_email, subject, html_body, attachments)
+        else:
+            transport = SmtpTransport(settings)
+            try:
+                transport.send(to_email, subject, html_body, attachments)
+            finally:
+                transport.close()
         return True
-    except Exception:
+    except Exception as e:
+        logger.warning("No se pudo enviar correo a %s: %s", to_email, e)
         return False
+
+
+def send_many(messages: Iterable[tuple], transport: Optional[SmtpTransport] = None) -> List[bool]:
+    """Send several emails over a single SMTP session.
+
+    Args:
+        messages: Iterable of (to_email, subject, html_body) or
+            (to_email, subject, html_body, attachments) tuples
+        transport: Transport to use; by default the thread's persistent one
+            (or a temporary one closed at the end when SMTP_PERSISTENT is off)
+
+    Returns:
+        One bool per message, in order. A failed message does not stop the batch.
+    """
+    own = False
+    if transport is None:
+        settings = smtp_settings()
+        if settings["persistent"]:
+            transport = _thread_transport()
+        else:
+            transport, own = SmtpTransport(settings), True
+    results = []
+    try:
+        for item in messages:
+            to_email, subject, html_body = item[:3]
+            attachments = item[3] if len(item) > 3 else None
+            try:
+                transport.send(to_email, subject, html_body, attachments)
+                results.append(True)
+            except Exception as e:
+                logger.warning("No se pudo enviar correo a %s: %s", to_email, e)
+                results.append(False)
+    finally:
+        if own:
+            transport.close()
+    return results
@@ -0,0 +1,142 @@
+"""
+Caché por worker de las URLs de imágenes que resuelve el helper de plantillas media_url.
+
+Resolver una ruta guardada en BD ('uploads/<f>', 'img/uploads/<f>', 'static/<...>')
+implica hasta cuatro os.path.isfile y un os.path.getmtime; las páginas de hospedaje y
+menú muestran decenas de imágenes por render. Aquí se guarda, por ruta guardada, la URL
+final y el sello de versión (mtime) durante un TTL acotado (MEDIA_URL_CACHE_TTL,
+300 s por defecto).
+
+Los helpers de subida llaman a invalidate() con la ruta que acaban de escribir. Como
+los nombres subidos son únicos, otro worker nunca tiene esa ruta en caché; los cambios
+hechos fuera de la app (scripts/migrate_media.py, copias manuales) se ven al vencer el TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, url_for
+
+PLACEHOLDER = 'img/OIP.webp'
+DEFAULT_TTL = 300
+
+
+def _ttl_from_env() -> float:
+    try:
+        return max(0.0, float(os.getenv('MEDIA_URL_CACHE_TTL', DEFAULT_TTL)))
+    except ValueError:
+        return float(DEFAULT_TTL)
+
+
+def _candidates(app, s: str):
+    """Ubicaciones posibles de la ruta guardada, en orden: [(archivo, endpoint, filename)]."""
+    static_dir = app.static_folder
+    inst_dir = os.path.join(app.root_path, 'instance', 'uploads')
+    if s.startswith('uploads/'):
+        rel = s[8:]
+        # ¿sigue en static por volumen legacy?
+        return [(os.path.join(inst_dir, rel), 'media_file', rel),
+                (os.path.join(static_dir, 'img', 'uploads', rel), 'static', f'img/uploads/{rel}')]
+    if s.startswith('img/uploads/'):
+        rel = s.split('img/uploads/', 1)[1]
+        return [(os.path.join(static_dir, 'img', 'uploads', rel), 'static', f'img/uploads/{rel}'),
+                (os.path.join(inst_dir, rel), 'media_file', rel)]
+    if s.startswith('static/'):
+        rel = s[7:]
+        return [(os.path.join(static_dir, rel), 'static', rel)]
+    # tratar como ruta relativa bajo static/
+    return [(os.path.join(static_dir, s), 'static', s)]
+
+
+def source_key(endpoint: str, filename: str) -> str:
+    """Clave canónica del archivo ('uploads/<f>' o 'static/<ruta>'), común a todas las rutas guardadas que lo apuntan."""
+    return f'uploads/{filename}' if endpoint == 'media_file' else f'static/{filename}'
+
+
+def resolve_source(image_path):
+    """(ruta absoluta, clave canónica) del archivo al que apunta la ruta guardada, o (None, None)."""
+    s = str(image_path or '').strip()
+    if not s or s.startswith('http://') or s.startswith('https://'):
+        return None, None
+    for path, endpoint, filename in _candidates(current_app._get_current_object(), s):
+        if os.path.isfile(path):
+            return path, source_key(endpoint, filename)
+    return None, None
+
+
+def _resolve(s: str):
+    """(url sin versión, mtime, encontrado, clave canónica); la URL es el placeholder si no existe."""
+    app = current_app._get_current_object()
+    for path, endpoint, filename in _candidates(app, s):
+        if os.path.isfile(path):
+            ts = None
+            # Con manifiesto de estáticos el hash ya va en el nombre: sin ?v=<mtime>
+            if not (endpoint == 'static' and filename in app.extensions.get('static_manifest', {})):
+                try:
+                    ts = int(os.path.getmtime(path))
+                except OSError:
+                    pass
+            return url_for(endpoint, filename=filename), ts, True, source_key(endpoint, filename)
+    return url_for('static', filename=PLACEHOLDER), None, False, None
+
+
+class MediaUrlCache:
+    def __init__(self, ttl: float = None, max_entries: int = 4096):
+        self.ttl = _ttl_from_env() if ttl is None else ttl
+        self.max_entries = max_entries
+        # ruta guardada -> (vence, url, mtime, encontrado, clave canónica)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, image_path: str):
+        """(url, mtime, encontrado, clave) de la ruta guardada, desde caché mientras no venza el TTL."""
+        now = time.monotonic()
+        entry = self._entries.get(image_path)
+        if entry is not None and entry[0] > now:
+            return entry[1:]
+        resolved = _resolve(image_path)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[image_path] = (now + self.ttl,) + resolved
+                self._entries.move_to_end(image_path)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return resolved
+
+    def url(self, image_path, version=None) -> str:
+        """Equivalente cacheado de media_url: URL final con ?v=<versión o mtime>."""
+        try:
+            if not image_path:
+                return url_for('static', filename=PLACEHOLDER)
+            s = str(image_path).strip()
+            if s.startswith('http://') or s.startswith('https://'):
+                return s
+            u, ts, found, _ = self.lookup(s)
+            if not found:
+                return u
+            if version is not None:
+                return f"{u}?v={version}"
+            return f"{u}?v={ts}" if ts is not None else u
+        except Exception:
+            try:
+                return url_for('static', filename=PLACEHOLDER)
+            except Exception:
+                return '/static/' + PLACEHOLDER
+
+    def key(self, image_path):
+        """Clave canónica del archivo (ver source_key) o None si no existe."""
+        s = str(image_path or '').strip()
+        if not s or s.startswith('http://') or s.startswith('https://'):
+            return None
+        return self.lookup(s)[3]
+
+    def invalidate(self, image_path: str = None) -> None:
+        """Olvida una ruta guardada (o todas si no se indica)."""
+        with self._lock:
+            if image_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(image_path).strip(), None)
+
+
+media_url_cache = MediaUrlCache()
@@ -0,0 +1,163 @@
+"""
+Migración de imágenes legacy de static/img/uploads a instance/uploads.
+
+Antes se hacía en cada arranque de worker (un os.path.isfile por cada Post y
+PlatoRestaurante con imagen). Ahora es un trabajo por lotes que se ejecuta una vez:
+
+    python scripts/migrate_media.py [--dry-run] [--workers 8] [--batch 200]
+
+- Manifiesto de progreso en instance/media_migration.json: los elementos ya
+  terminados se saltan al reanudar tras una interrupción.
+- Los archivos se mueven en paralelo (ThreadPoolExecutor); los cambios de ruta en
+  la base de datos se confirman por lotes desde el hilo principal.
+- Al terminar sin pendientes se escribe instance/media_migration.done; el arranque
+  solo comprueba ese marcador (is_done()).
+
+Mientras no se ejecute, media_url sigue sirviendo los archivos desde la ruta legacy.
+"""
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from models.baseDatos import db, Post, PlatoRestaurante
+from utils.page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+MARKER_NAME = 'media_migration.done'
+MANIFEST_NAME = 'media_migration.json'
+LEGACY_PREFIXES = ('uploads/', 'img/uploads/', 'static/img/uploads/')
+# Estados finales: no se vuelven a procesar al reanudar
+FINAL_STATES = ('moved', 'relinked', 'skipped')
+MODELS = {'post': Post, 'plato': PlatoRestaurante}
+# Sello de contenido que cambia al reescribir la imagen de cada tipo
+CONTENT_KINDS = {'post': 'posts', 'plato': 'menu'}
+
+
+def _instance_file(name: str) -> str:
+    return os.path.join(current_app.instance_path, name)
+
+
+def is_done() -> bool:
+    """Comprobación de arranque: solo mira el marcador."""
+    return os.path.isfile(_instance_file(MARKER_NAME))
+
+
+def load_manifest() -> dict:
+    try:
+        with open(_instance_file(MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return {'items': {}}
+
+
+def save_manifest(manifest: dict) -> None:
+    path = _instance_file(MANIFEST_NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def plan_items():
+    """Posts y platos con imagen en una ruta legacy, con su origen, destino y nueva ruta en BD."""
+    legacy_dir = os.path.join(current_app.static_folder, 'img', 'uploads')
+    inst_dir = os.path.join(current_app.instance_path, 'uploads')
+    items = []
+    for tipo, model in MODELS.items():
+        rows = db.session.query(model.id, model.imagen).filter(model.imagen.isnot(None)).order_by(model.id.asc()).all()
+        for rid, imagen in rows:
+            path = (imagen or '').strip()
+            prefix = next((p for p in LEGACY_PREFIXES if path.startswith(p)), None)
+            if not prefix:
+                continue
+            fname = path[len(prefix):]
+            if not fname:
+                continue
+            items.append({
+                'key': f'{tipo}:{rid}',
+                'tipo': tipo,
+                'id': rid,
+                'imagen': path,
+                'src': os.path.join(legacy_dir, fname),
+                'dst': os.path.join(inst_dir, fname),
+                # 'uploads/<f>' ya apunta al destino; las rutas img/... se reescriben
+                'nueva': None if prefix == 'uploads/' else f'uploads/{fname}',
+            })
+    return items
+
+
+def _process_file(item: dict, dry_run: bool) -> str:
+    """Mueve el archivo si hace falta. Devuelve el estado resultante (sin tocar la BD)."""
+    src, dst = item['src'], item['dst']
+    if item['nueva'] is None and os.path.isfile(dst):
+        return 'skipped'
+    if os.path.isfile(src):
+        if not dry_run:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.move(src, dst)
+        return 'moved'
+    if os.path.isfile(dst):
+        # Ya movido (p. ej. en una ejecución interrumpida): solo falta la ruta en BD
+        return 'skipped' if item['nueva'] is None else 'relinked'
+    return 'missing'
+
+
+def _safe_process(item: dict, dry_run: bool):
+    try:
+        return _process_file(item, dry_run), None
+    except Exception as e:
+        logger.warning('No se pudo migrar imagen %s -> %s: %s', item['src'], item['dst'], e)
+        return 'error', str(e)
+
+
+def run(dry_run: bool = False, workers: int = 8, batch: int = 200, progress=None) -> dict:
+    """Ejecuta (o simula) la migración. Devuelve el conteo por estado."""
+    manifest = load_manifest()
+    done = manifest.setdefault('items', {})
+    manifest.setdefault('started_at', datetime.utcnow().isoformat())
+
+    items = [it for it in plan_items() if done.get(it['key'], {}).get('status') not in FINAL_STATES]
+    counts = {'total': len(items), 'moved': 0, 'relinked': 0, 'skipped': 0, 'missing': 0, 'error': 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for start in range(0, len(items), batch):
+            chunk = items[start:start + batch]
+            results = list(pool.map(lambda it: _safe_process(it, dry_run), chunk))
+            if not dry_run:
+                touched = set()
+                for item, (status, _) in zip(chunk, results):
+                    if status in ('moved', 'relinked') and item['nueva']:
+                        db.session.query(MODELS[item['tipo']]).filter_by(id=item['id']).update(
+                            {'imagen': item['nueva']}, synchronize_session=False
+                        )
+                        touched.add(CONTENT_KINDS[item['tipo']])
+                for kind in sorted(touched):
+                    page_cache.invalidate(kind)
+                db.session.commit()
+            for item, (status, error) in zip(chunk, results):
+                counts[status] += 1
+                if status == 'missing':
+                    logger.warning('Archivo no encontrado en legacy ni instance: %s', item['imagen'])
+                if not dry_run:
+                    entry = {'status': status, 'imagen': item['imagen']}
+                    if error:
+                        entry['error'] = error
+                    done[item['key']] = entry
+            if not dry_run:
+                manifest['updated_at'] = datetime.utcnow().isoformat()
+                save_manifest(manifest)
+            if progress:
+                progress(min(start + batch, len(items)), len(items), counts)
+
+    if not dry_run and counts['error'] == 0:
+        manifest['completed_at'] = datetime.utcnow().isoformat()
+        save_manifest(manifest)
+        with open(_instance_file(MARKER_NAME), 'w', encoding='utf-8') as fh:
+            fh.write(manifest['completed_at'] + '\n')
+    return counts
+
@@ -0,0 +1,88 @@
+"""
+Carta del restaurante en memoria por worker (modelo de lectura).
+
+La página del menú y el carrito trabajan contra una instantánea inmutable de los platos
+activos: índice por id, agrupación por categoría (Entradas, Principales, Postres,
+Bebidas y después el resto en orden alfabético; dentro de cada una por 'orden') y la
+lista de categorías presentes.
+
+La instantánea sigue el sello 'contenido:menu' que incrementan los endpoints de admin
+del restaurante (page_cache.invalidate('menu')). El sello se lee con el mismo TTL que
+la caché de páginas (ver utils/versioned_snapshot.py), así que ver la carta y añadir al
+carrito no consultan la BD; el precio definitivo se comprueba contra la BD al confirmar
+la reserva (current_prices).
+"""
+from dataclasses import dataclass, fields
+from datetime import datetime
+from types import MappingProxyType
+from typing import Optional, Tuple
+from models.baseDatos import db, PlatoRestaurante
+from utils.versioned_snapshot import VersionedSnapshot
+
+CATEGORY_ORDER = ('Entradas', 'Principales', 'Postres', 'Bebidas')
+DEFAULT_CATEGORY = 'Otros'
+
+
+@dataclass(frozen=True)
+class DishView:
+    """Copia de solo lectura de un PlatoRestaurante activo (mismos nombres de atributo)."""
+    id: int
+    nombre: str
+    descripcion: Optional[str]
+    precio: float
+    categoria: Optional[str]
+    icono: Optional[str]
+    imagen: Optional[str]
+    orden: int
+    creado_en: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, p):
+        return cls(**{f.name: getattr(p, f.name) for f in fields(cls)})
+
+
+def _dish_sort_key(d: DishView):
+    # Igual que antes: orden asc y, a igual orden, el más reciente primero
+    return (d.orden or 0, -(d.creado_en.timestamp() if d.creado_en else 0), d.id)
+
+
+class MenuSnapshot:
+    def __init__(self, version: int, dishes):
+        self.version = version
+        groups = {}
+        for d in sorted(dishes, key=_dish_sort_key):
+            groups.setdefault(d.categoria or DEFAULT_CATEGORY, []).append(d)
+        present = [c for c in CATEGORY_ORDER if c in groups]
+        self.categorias: Tuple[str, ...] = tuple(present + sorted(c for c in groups if c not in CATEGORY_ORDER))
+        self.grupos = MappingProxyType({c: tuple(groups[c]) for c in self.categorias})
+        self.by_id = MappingProxyType({d.id: d for c in self.categorias for d in self.grupos[c]})
+
+    def get(self, plato_id) -> Optional[DishView]:
+        try:
+            return self.by_id.get(int(plato_id))
+        except (TypeError, ValueError):
+            return None
+
+
+class MenuCatalog(VersionedSnapshot):
+    kind = 'menu'
+
+    def _load(self, version: int) -> MenuSnapshot:
+        rows = db.session.query(PlatoRestaurante).filter(PlatoRestaurante.activo.is_(True)).all()
+        return MenuSnapshot(version, [DishView.from_model(p) for p in rows])
+
+
+menu_catalog = MenuCatalog()
+
+
+def current_prices(plato_ids) -> dict:
+    """{id: (nombre, precio)} de los platos activos, leídos de la BD (comprobación al confirmar)."""
+    ids = {int(i) for i in plato_ids if i is not None}
+    if not ids:
+        return {}
+    rows = (
+        db.session.query(PlatoRestaurante.id, PlatoRestaurante.nombre, PlatoRestaurante.precio)
+        .filter(PlatoRestaurante.id.in_(ids), PlatoRestaurante.activo.is_(True))
+        .all()
+    )
+    return {pid: (nombre, float(precio or 0)) for pid, nombre, precio in rows}
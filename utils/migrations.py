@@ -0,0 +1,246 @@
+"""
+Migraciones de esquema versionadas.
+
+Cada paso es una función idempotente registrada con @migration(version, nombre); la
+tabla schema_version guarda los pasos aplicados. Al arrancar, cada worker solo consulta
+MAX(version) (ensure_schema). Si el esquema está atrasado, el primer proceso que obtiene
+el candado (GET_LOCK en MySQL, flock sobre instance/schema_migrate.lock en SQLite)
+aplica los pasos pendientes; los demás esperan el candado y ya no encuentran pendientes.
+
+Para aplicar a mano (p. ej. antes de desplegar con MIGRATE_ON_BOOT=0):
+    python scripts/migrate.py [--status]
+
+Al agregar tablas o columnas nuevas, registrar un paso con la siguiente versión.
+"""
+import logging
+import os
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import func, inspect, text
+from models.baseDatos import db, SchemaVersion
+try:
+    import fcntl
+except Exception:
+    # Windows: sin flock; en desarrollo local normalmente hay un solo proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = 'isla_encanto_schema_migrate'
+LOCK_TIMEOUT = int(os.getenv('MIGRATE_LOCK_TIMEOUT', '300'))
+
+# (version, nombre, funcion) ordenados por versión
+_MIGRATIONS = []
+
+
+def migration(version: int, nombre: str):
+    """Registra un paso de migración. Debe poder ejecutarse más de una vez sin efecto."""
+    def decorator(fn):
+        if any(v == version for v, _, _ in _MIGRATIONS):
+            raise ValueError(f'Versión de migración duplicada: {version}')
+        _MIGRATIONS.append((version, nombre, fn))
+        _MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def target_version() -> int:
+    return _MIGRATIONS[-1][0] if _MIGRATIONS else 0
+
+
+def current_version() -> int:
+    """Versión aplicada del esquema (0 si la tabla schema_version aún no existe)."""
+    try:
+        return db.session.query(func.max(SchemaVersion.version)).scalar() or 0
+    except Exception:
+        db.session.rollback()
+        return 0
+
+
+def pending_migrations():
+    cur = current_version()
+    return [(v, n) for v, n, _ in _MIGRATIONS if v > cur]
+
+
+@contextmanager
+def migration_lock(timeout: int = LOCK_TIMEOUT):
+    """Candado entre procesos para que un solo líder aplique migraciones."""
+    if db.engine.dialect.name == 'mysql':
+        conn = db.engine.connect()
+        try:
+            got = conn.execute(text('SELECT GET_LOCK(:n, :t)'), {'n': LOCK_NAME, 't': timeout}).scalar()
+            if got != 1:
+                raise TimeoutError(f'No se obtuvo el candado de migraciones en {timeout}s')
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT RELEASE_LOCK(:n)'), {'n': LOCK_NAME})
+        finally:
+            conn.close()
+        return
+
+    lock_path = os.path.join(current_app.instance_path, 'schema_migrate.lock')
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a') as fh:
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def run_migrations():
+    """Aplica los pasos pendientes bajo el candado. Devuelve las versiones aplicadas."""
+    applied = []
+    with migration_lock():
+        SchemaVersion.__table__.create(db.engine, checkfirst=True)
+        # Releer dentro del candado: otro proceso pudo haber migrado mientras esperábamos
+        cur = current_version()
+        for version, nombre, fn in _MIGRATIONS:
+            if version <= cur:
+                continue
+            logger.info('Aplicando migración %s (%s)', version, nombre)
+            try:
+                fn()
+                db.session.add(SchemaVersion(version=version, nombre=nombre))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Falló la migración %s (%s); se detiene en la versión %s', version, nombre, cur)
+                raise
+            cur = version
+            applied.append(version)
+    return applied
+
+
+def ensure_schema(auto: bool = True) -> int:
+    """Comprobación de arranque: una consulta si el esquema está al día.
+
+    Con auto=False solo avisa de los pasos pendientes (se aplican con scripts/migrate.py).
+    """
+    cur = current_version()
+    target = target_version()
+    if cur >= target:
+        return cur
+    if not auto:
+        logger.warning('Esquema en versión %s, se esperaba %s. Ejecuta: python scripts/migrate.py', cur, target)
+        return cur
+    applied = run_migrations()
+    if applied:
+        logger.info('Migraciones aplicadas: %s', applied)
+    return current_version()
+
+
+def _add_missing_columns(table: str, columns):
+    """ALTER TABLE ... ADD COLUMN para las columnas que falten (si la tabla existe)."""
+    inspector = inspect(db.engine)
+    if table not in inspector.get_table_names():
+        return
+    existing = {c['name'] for c in inspector.get_columns(table)}
+    for name, ddl in columns:
+        if name in existing:
+            continue
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+        db.session.commit()
+        logger.info('Columna %s.%s agregada', table, name)
+
+
+# ------------------------------
+# Pasos
+# ------------------------------
+
+@migration(1, 'tablas_base')
+def _m001_tablas_base():
+    db.create_all()
+
+
+@migration(2, 'usuario_columnas')
+def _m002_usuario_columnas():
+    _add_missing_columns('usuario', [
+        ('reset_code', 'VARCHAR(6) NULL'),
+        ('reset_expire', 'DATETIME NULL'),
+        ('telefono', 'VARCHAR(20) NULL'),
+        ('avatar', 'VARCHAR(255) NULL'),
+        ('plan_tipo', 'VARCHAR(50) NULL'),
+        ('membresia_activa', 'TINYINT(1) DEFAULT 0'),
+        ('membresia_expira', 'DATE NULL'),
+        ('notif_checkin', 'TINYINT(1) DEFAULT 1'),
+        ('notif_checkout', 'TINYINT(1) DEFAULT 1'),
+    ])
+
+
+@migration(3, 'post_orden')
+def _m003_post_orden():
+    from models.baseDatos import Post
+    _add_missing_columns('post', [('orden', 'INTEGER NOT NULL DEFAULT 0')])
+    # Backfill de orden para posts de categoría 'home'
+    home_posts = db.session.query(Post).filter(Post.categoria == 'home').order_by(Post.creado_en.asc()).all()
+    for idx, p in enumerate(home_posts, start=1):
+        if getattr(p, 'orden', 0) in (None, 0):
+            p.orden = idx
+    db.session.commit()
+
+
+@migration(4, 'habitacion_columnas')
+def _m004_habitacion_columnas():
+    _add_missing_columns('nuevaHabitacion', [
+        ('plan', 'VARCHAR(20) NULL'),
+        ('numero', 'INTEGER NULL'),
+        ('caracteristicas', 'TEXT NULL'),
+        ('estado', "VARCHAR(20) NOT NULL DEFAULT 'Disponible'"),
+        ('cupo_personas', 'INTEGER NOT NULL DEFAULT 1'),
+        ('imagen', 'VARCHAR(255) NULL'),
+        ('model3d', 'VARCHAR(255) NULL'),
+    ])
+
+
+@migration(5, 'plato_imagen')
+def _m005_plato_imagen():
+    _add_missing_columns('plato_restaurante', [('imagen', 'VARCHAR(255) NULL')])
+
+
+@migration(6, 'image_derivative')
+def _m006_image_derivative():
+    from models.baseDatos import ImageDerivative
+    ImageDerivative.__table__.create(db.engine, checkfirst=True)
+
+
+@migration(7, 'server_session')
+def _m007_server_session():
+    from models.baseDatos import SessionRecord
+    SessionRecord.__table__.create(db.engine, checkfirst=True)
+
+
+@migration(8, 'email_outbox')
+def _m008_email_outbox():
+    from models.baseDatos import EmailOutbox
+    EmailOutbox.__table__.create(db.engine, checkfirst=True)
+
+
+@migration(9, 'email_dispatch_run')
+def _m009_email_dispatch_run():
+    from models.baseDatos import EmailDispatchRun
+    _add_missing_columns('email_outbox', [('latencia_ms', 'INTEGER NULL')])
+    EmailDispatchRun.__table__.create(db.engine, checkfirst=True)
+
+
+@migration(10, 'email_sender_lease')
+def _m010_email_sender_lease():
+    from models.baseDatos import EmailSenderLease
+    EmailSenderLease.__table__.create(db.engine, checkfirst=True)
+
+
+@migration(11, 'email_outbox_vaciar_enviados')
+def _m011_email_outbox_vaciar_enviados():
+    # Los ya enviados guardaban el cuerpo completo (incluidos enlaces de recuperación)
+    db.session.execute(text("UPDATE email_outbox SET html = '', adjuntos = NULL WHERE estado = 'enviado'"))
+    db.session.commit()
+
+
+@migration(12, 'cache_version_sin_bloqueos_derivados')
+def _m012_cache_version_sin_bloqueos_derivados():
+    # save_rows() ya no usa filas 'derivados:<hash>' de cache_version como candado
+    db.session.execute(text("DELETE FROM cache_version WHERE clave LIKE 'derivados:%'"))
+    db.session.commit()
@@ -1,12 +1,33 @@
 from datetime import datetime, timedelta, date
 from models.baseDatos import db, Reserva, ReservaDatosHospedaje, Usuario, nuevaHabitacion
-from utils.mailer import send_email
+from utils import email_outbox
+from utils.email_templates import render_email
 from typing import List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
-def send_checkin_notification(reserva_id: int) -> bool:
+
+def _encolar(destinatario: str, subject: str, html_content: str, key: str = None) -> bool:
+    """Deja el correo en la bandeja de salida; con la misma `key` no se repite."""
+    try:
+        email_outbox.enqueue(destinatario, subject, html_content, key=key)
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"No se pudo encolar correo a {destinatario}: {str(e)}")
+        return False
+
+
+def _render_checkin(reserva, usuario, habitacion, datos_hospedaje=None) -> Tuple[str, str]:
+    """Asunto y HTML de la notificación de check-in (día de llegada)."""
+    subject = f"🏨 ¡Tu check-in es hoy! - Reserva #{reserva.id}"
+    html_content = render_email('checkin.html', reserva=reserva, usuario=usuario,
+                                habitacion=habitacion, datos_hospedaje=datos_hospedaje)
+    return subject, html_content
+
+
+def send_checkin_notification(reserva_id: int, dedupe: bool = True) -> bool:
     """
     Envía notificación de check-in al usuario
     Se ejecuta el día de la llegada
@@ -30,84 +51,13 @@ def send_checkin_notification(reserva_id: int) -> bool:
         habitacion = nuevaHabitacion.query.get(reserva.habitacion_id)
         datos_hospedaje = ReservaDatosHospedaje.query.filter_by(reserva_id=reserva_id).first()
         
-        # Plantilla HTML para check-in
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-align: center; padding: 30px; border-radius: 8px 8px 0 0; }}
-                .content {{ background: white; padding: 30px; border: 1px solid #ddd; }}
-                .footer {{ background: #f8f9fa; padding: 20px; text-align: center; border-radius: 0 0 8px 8px; }}
-                .highlight {{ background: #e3f2fd; padding: 15px; border-radius: 5px; margin: 15px 0; }}
-                .button {{ display: inline-block; background: #667eea; color: white; padding: 12px 25px; text-decoration: none; border-radius: 5px; margin: 10px 0; }}
-                .warning {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 15px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🏨 ¡Bienvenido al Hotel Isla Encanto!</h1>
-                    <p>Tu check-in es hoy - ¡Te esperamos!</p>
-                </div>
-                
-                <div class="content">
-                    <h2>Hola {usuario.usuario},</h2>
-                    
-                    <p>¡Qué emoción! Hoy es el día de tu llegada al <strong>Hotel Isla Encanto</strong>. Estamos preparando todo para que tengas una experiencia inolvidable.</p>
-                    
-                    <div class="highlight">
-                        <h3>📋 Detalles de tu Reserva</h3>
-                        <p><strong>Reserva #:</strong> {reserva.id}</p>
-                        <p><strong>Habitación:</strong> {habitacion.nombre if habitacion else f'Habitación #{reserva.habitacion_id}'}</p>
-                        <p><strong>Check-in:</strong> {reserva.check_in.strftime('%d de %B de %Y')}</p>
-                        <p><strong>Check-out:</strong> {reserva.check_out.strftime('%d de %B de %Y') if reserva.check_out else 'No definido'}</p>
-                        {f'<p><strong>Huésped Principal:</strong> {datos_hospedaje.nombre1}</p>' if datos_hospedaje else ''}
-                    </div>
-                    
-                    <div class="warning">
-                        <h3>⏰ Información Importante</h3>
-                        <ul>
-                            <li><strong>Horario de Check-in:</strong> 3:00 PM - 11:00 PM</li>
-                            <li><strong>Documentos requeridos:</strong> Cédula de ciudadanía o pasaporte</li>
-                            <li><strong>Check-in anticipado:</strong> Sujeto a disponibilidad (cargo adicional puede aplicar)</li>
-                        </ul>
-                    </div>
-                    
-                    <h3>🎯 Lo que puedes esperar:</h3>
-                    <ul>
-                        <li>WiFi gratuito en todas las instalaciones</li>
-                        <li>Servicio de recepción 24/7</li>
-                        <li>Desayuno buffet (según tu plan)</li>
-                        <li>Acceso a todas nuestras instalaciones</li>
-                    </ul>
-                    
-                    <p><strong>¿Tienes alguna pregunta?</strong> No dudes en contactarnos:</p>
-                    <p>📞 <strong>Teléfono:</strong> +57 316 027 0709</p>
-                    <p>📧 <strong>Email:</strong> info@hotelislaencanto.com</p>
-                </div>
-                
-                <div class="footer">
-                    <p><strong>Hotel Isla Encanto</strong></p>
-                    <p>Experiencias únicas, momentos inolvidables</p>
-                    <p style="font-size: 12px; color: #666; margin-top: 15px;">
-                        Puedes desactivar estas notificaciones desde tu perfil de usuario.
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        subject = f"🏨 ¡Tu check-in es hoy! - Reserva #{reserva.id}"
+        subject, html_content = _render_checkin(reserva, usuario, habitacion, datos_hospedaje)
         
-        success = send_email(usuario.correo, subject, html_content)
+        success = _encolar(usuario.correo, subject, html_content,
+                           key=f'checkin:{reserva.id}:{reserva.check_in}' if dedupe else None)
         
         if success:
-            logger.info(f"Notificación de check-in enviada para reserva {reserva_id}")
+            logger.info(f"Notificación de check-in encolada para reserva {reserva_id}")
         else:
             logger.error(f"Error enviando notificación de check-in para reserva {reserva_id}")
             
@@ -118,7 +68,15 @@ def send_checkin_notification(reserva_id: int) -> bool:
         return False
 
 
-def send_checkout_notification(reserva_id: int) -> bool:
+def _render_checkout(reserva, usuario, habitacion, datos_hospedaje=None) -> Tuple[str, str]:
+    """Asunto y HTML de la notificación de check-out (día de salida)."""
+    subject = f"🌅 ¡Gracias por tu estadía! Check-out - Reserva #{reserva.id}"
+    html_content = render_email('checkout.html', reserva=reserva, usuario=usuario,
+                                habitacion=habitacion, datos_hospedaje=datos_hospedaje)
+    return subject, html_content
+
+
+def send_checkout_notification(reserva_id: int, dedupe: bool = True) -> bool:
     """
     Envía notificación de check-out al usuario
     Se ejecuta el día de la salida
@@ -142,90 +100,13 @@ def send_checkout_notification(reserva_id: int) -> bool:
         habitacion = nuevaHabitacion.query.get(reserva.habitacion_id)
         datos_hospedaje = ReservaDatosHospedaje.query.filter_by(reserva_id=reserva_id).first()
         
-        # Plantilla HTML para check-out
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-align: center; padding: 30px; border-radius: 8px 8px 0 0; }}
-                .content {{ background: white; padding: 30px; border: 1px solid #ddd; }}
-                .footer {{ background: #f8f9fa; padding: 20px; text-align: center; border-radius: 0 0 8px 8px; }}
-                .highlight {{ background: #e8f5e8; padding: 15px; border-radius: 5px; margin: 15px 0; }}
-                .button {{ display: inline-block; background: #667eea; color: white; padding: 12px 25px; text-decoration: none; border-radius: 5px; margin: 10px 0; }}
-                .thanks {{ background: #f0f8ff; border-left: 4px solid #667eea; padding: 15px; margin: 15px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🌅 ¡Hora del Check-out!</h1>
-                    <p>Esperamos que hayas disfrutado tu estadía</p>
-                </div>
-                
-                <div class="content">
-                    <h2>Hola {usuario.usuario},</h2>
-                    
-                    <p>¡Ha llegado el momento de despedirnos! Esperamos que tu estadía en el <strong>Hotel Isla Encanto</strong> haya sido excepcional y llena de momentos especiales.</p>
-                    
-                    <div class="highlight">
-                        <h3>📋 Detalles de tu Estadía</h3>
-                        <p><strong>Reserva #:</strong> {reserva.id}</p>
-                        <p><strong>Habitación:</strong> {habitacion.nombre if habitacion else f'Habitación #{reserva.habitacion_id}'}</p>
-                        <p><strong>Check-in:</strong> {reserva.check_in.strftime('%d de %B de %Y')}</p>
-                        <p><strong>Check-out:</strong> {reserva.check_out.strftime('%d de %B de %Y') if reserva.check_out else 'Hoy'}</p>
-                        {f'<p><strong>Huésped Principal:</strong> {datos_hospedaje.nombre1}</p>' if datos_hospedaje else ''}
-                    </div>
-                    
-                    <div class="thanks">
-                        <h3>💙 ¡Gracias por elegirnos!</h3>
-                        <p>Tu confianza es nuestro mayor premio. Esperamos haberte brindado una experiencia que supere tus expectativas.</p>
-                    </div>
-                    
-                    <h3>⏰ Recordatorios para tu Check-out:</h3>
-                    <ul>
-                        <li><strong>Horario límite:</strong> 12:00 PM (mediodía)</li>
-                        <li><strong>Entrega de llaves:</strong> En recepción</li>
-                        <li><strong>Revisión de minibar:</strong> Si aplica</li>
-                        <li><strong>Check-out tardío:</strong> Disponible con costo adicional</li>
-                    </ul>
-                    
-                    <h3>🌟 ¿Te gustaría regresar?</h3>
-                    <p>Como huésped especial, tienes acceso a:</p>
-                    <ul>
-                        <li>Descuentos exclusivos en futuras reservas</li>
-                        <li>Early check-in gratuito (sujeto a disponibilidad)</li>
-                        <li>Actualizaciones de habitación sin costo</li>
-                    </ul>
-                    
-                    <p><strong>¿Necesitas ayuda?</strong> Estamos aquí para ti:</p>
-                    <p>📞 <strong>Teléfono:</strong> +57 316 027 0709</p>
-                    <p>📧 <strong>Email:</strong> info@hotelislaencanto.com</p>
-                    
-                    <p style="margin-top: 25px;"><strong>¡Te esperamos pronto de vuelta en el Hotel Isla Encanto!</strong></p>
-                </div>
-                
-                <div class="footer">
-                    <p><strong>Hotel Isla Encanto</strong></p>
-                    <p>Donde cada momento se convierte en un recuerdo especial</p>
-                    <p style="font-size: 12px; color: #666; margin-top: 15px;">
-                        Puedes desactivar estas notificaciones desde tu perfil de usuario.
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        subject = f"🌅 ¡Gracias por tu estadía! Check-out - Reserva #{reserva.id}"
+        subject, html_content = _render_checkout(reserva, usuario, habitacion, datos_hospedaje)
         
-        success = send_email(usuario.correo, subject, html_content)
+        success = _encolar(usuario.correo, subject, html_content,
+                           key=f'checkout:{reserva.id}:{reserva.check_out}' if dedupe else None)
         
         if success:
-            logger.info(f"Notificación de check-out enviada para reserva {reserva_id}")
+            logger.info(f"Notificación de check-out encolada para reserva {reserva_id}")
         else:
             logger.error(f"Error enviando notificación de check-out para reserva {reserva_id}")
             
@@ -265,25 +146,13 @@ def get_checkout_reservations_today() -> List[int]:
 def send_daily_notifications() -> Tuple[int, int]:
     """
     Función principal para enviar todas las notificaciones diarias
-    Retorna (checkins_enviados, checkouts_enviados)
+    Retorna (checkins_encolados, checkouts_encolados)
     """
-    checkin_ids = get_checkin_reservations_today()
-    checkout_ids = get_checkout_reservations_today()
-    
-    checkins_sent = 0
-    checkouts_sent = 0
-    
-    # Enviar notificaciones de check-in
-    for reserva_id in checkin_ids:
-        if send_checkin_notification(reserva_id):
-            checkins_sent += 1
-    
-    # Enviar notificaciones de check-out
-    for reserva_id in checkout_ids:
-        if send_checkout_notification(reserva_id):
-            checkouts_sent += 1
+    today = date.today()
+    checkins_sent = send_notification_batch('checkin', today)
+    checkouts_sent = send_notification_batch('checkout', today)
     
-    logger.info(f"Notificaciones enviadas: {checkins_sent} check-ins, {checkouts_sent} check-outs")
+    logger.info(f"Notificaciones encoladas: {checkins_sent} check-ins, {checkouts_sent} check-outs")
     
     return checkins_sent, checkouts_sent
 
@@ -294,36 +163,21 @@ def send_reminder_notifications() -> Tuple[int, int]:
     Retorna (checkin_reminders, checkout_reminders)
     """
     tomorrow = date.today() + timedelta(days=1)
-    
-    # Recordatorios de check-in (1 día antes)
-    checkin_reminders = Reserva.query.filter(
-        Reserva.check_in == tomorrow,
-        Reserva.estado.in_(['Activa', 'Confirmada'])
-    ).all()
-    
-    # Recordatorios de check-out (1 día antes)
-    checkout_reminders = Reserva.query.filter(
-        Reserva.check_out == tomorrow,
-        Reserva.estado.in_(['Activa', 'Confirmada'])
-    ).all()
-    
-    checkin_sent = 0
-    checkout_sent = 0
-    
-    # Enviar recordatorios de check-in
-    for reserva in checkin_reminders:
-        if send_checkin_reminder(reserva.id):
-            checkin_sent += 1
-    
-    # Enviar recordatorios de check-out
-    for reserva in checkout_reminders:
-        if send_checkout_reminder(reserva.id):
-            checkout_sent += 1
+    checkin_sent = send_notification_batch('recordatorio-checkin', tomorrow)
+    checkout_sent = send_notification_batch('recordatorio-checkout', tomorrow)
     
     return checkin_sent, checkout_sent
 
 
-def send_checkin_reminder(reserva_id: int) -> bool:
+def _render_checkin_reminder(reserva, usuario, habitacion, datos_hospedaje=None) -> Tuple[str, str]:
+    """Asunto y HTML del recordatorio de check-in (1 día antes)."""
+    subject = f"📅 ¡Mañana es tu llegada! - Reserva #{reserva.id}"
+    html_content = render_email('recordatorio_checkin.html', reserva=reserva, usuario=usuario,
+                                habitacion=habitacion, datos_hospedaje=datos_hospedaje)
+    return subject, html_content
+
+
+def send_checkin_reminder(reserva_id: int, dedupe: bool = True) -> bool:
     """
     Envía recordatorio de check-in (1 día antes)
     """
@@ -338,67 +192,24 @@ def send_checkin_reminder(reserva_id: int) -> bool:
             
         habitacion = nuevaHabitacion.query.get(reserva.habitacion_id)
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #ffa726 0%, #ff7043 100%); color: white; text-align: center; padding: 30px; border-radius: 8px 8px 0 0; }}
-                .content {{ background: white; padding: 30px; border: 1px solid #ddd; }}
-                .footer {{ background: #f8f9fa; padding: 20px; text-align: center; border-radius: 0 0 8px 8px; }}
-                .highlight {{ background: #fff3e0; padding: 15px; border-radius: 5px; margin: 15px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>📅 ¡Mañana es tu llegada!</h1>
-                    <p>Recordatorio de tu reserva</p>
-                </div>
-                
-                <div class="content">
-                    <h2>Hola {usuario.usuario},</h2>
-                    
-                    <p>¡Qué emoción! <strong>Mañana</strong> es el día de tu llegada al Hotel Isla Encanto. Estamos muy emocionados de recibirte.</p>
-                    
-                    <div class="highlight">
-                        <h3>📋 Tu Reserva</h3>
-                        <p><strong>Reserva #:</strong> {reserva.id}</p>
-                        <p><strong>Habitación:</strong> {habitacion.nombre if habitacion else f'Habitación #{reserva.habitacion_id}'}</p>
-                        <p><strong>Check-in:</strong> {reserva.check_in.strftime('%d de %B de %Y')} (mañana)</p>
-                        <p><strong>Check-out:</strong> {reserva.check_out.strftime('%d de %B de %Y') if reserva.check_out else 'No definido'}</p>
-                    </div>
-                    
-                    <p><strong>Prepárate para una experiencia increíble:</strong></p>
-                    <ul>
-                        <li>Lleva tu documento de identidad</li>
-                        <li>Check-in a partir de las 3:00 PM</li>
-                        <li>WiFi gratuito en todo el hotel</li>
-                    </ul>
-                    
-                    <p>¡Te esperamos!</p>
-                </div>
-                
-                <div class="footer">
-                    <p><strong>Hotel Isla Encanto</strong></p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        subject = f"📅 ¡Mañana es tu llegada! - Reserva #{reserva.id}"
-        return send_email(usuario.correo, subject, html_content)
+        subject, html_content = _render_checkin_reminder(reserva, usuario, habitacion)
+        return _encolar(usuario.correo, subject, html_content,
+                        key=f'recordatorio-checkin:{reserva.id}:{reserva.check_in}' if dedupe else None)
         
     except Exception as e:
         logger.error(f"Error en send_checkin_reminder: {str(e)}")
         return False
 
 
-def send_checkout_reminder(reserva_id: int) -> bool:
+def _render_checkout_reminder(reserva, usuario, habitacion, datos_hospedaje=None) -> Tuple[str, str]:
+    """Asunto y HTML del recordatorio de check-out (1 día antes)."""
+    subject = f"⏰ Check-out mañana - Reserva #{reserva.id}"
+    html_content = render_email('recordatorio_checkout.html', reserva=reserva, usuario=usuario,
+                                habitacion=habitacion, datos_hospedaje=datos_hospedaje)
+    return subject, html_content
+
+
+def send_checkout_reminder(reserva_id: int, dedupe: bool = True) -> bool:
     """
     Envía recordatorio de check-out (1 día antes)
     """
@@ -413,61 +224,75 @@ def send_checkout_reminder(reserva_id: int) -> bool:
             
         habitacion = nuevaHabitacion.query.get(reserva.habitacion_id)
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #42a5f5 0%, #1e88e5 100%); color: white; text-align: center; padding: 30px; border-radius: 8px 8px 0 0; }}
-                .content {{ background: white; padding: 30px; border: 1px solid #ddd; }}
-                .footer {{ background: #f8f9fa; padding: 20px; text-align: center; border-radius: 0 0 8px 8px; }}
-                .highlight {{ background: #e3f2fd; padding: 15px; border-radius: 5px; margin: 15px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>⏰ Check-out mañana</h1>
-                    <p>Recordatorio de salida</p>
-                </div>
-                
-                <div class="content">
-                    <h2>Hola {usuario.usuario},</h2>
-                    
-                    <p>Esperamos que estés disfrutando tu estadía. Te recordamos que <strong>mañana</strong> es tu día de check-out.</p>
-                    
-                    <div class="highlight">
-                        <h3>📋 Detalles</h3>
-                        <p><strong>Reserva #:</strong> {reserva.id}</p>
-                        <p><strong>Habitación:</strong> {habitacion.nombre if habitacion else f'Habitación #{reserva.habitacion_id}'}</p>
-                        <p><strong>Check-out:</strong> {reserva.check_out.strftime('%d de %B de %Y') if reserva.check_out else 'Mañana'}</p>
-                        <p><strong>Hora límite:</strong> 12:00 PM</p>
-                    </div>
-                    
-                    <p><strong>Para tu check-out:</strong></p>
-                    <ul>
-                        <li>Entrega las llaves en recepción</li>
-                        <li>Verifica que no olvides nada</li>
-                        <li>Check-out tardío disponible (con costo adicional)</li>
-                    </ul>
-                    
-                    <p>¡Gracias por elegirnos!</p>
-                </div>
-                
-                <div class="footer">
-                    <p><strong>Hotel Isla Encanto</strong></p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        subject = f"⏰ Check-out mañana - Reserva #{reserva.id}"
-        return send_email(usuario.correo, subject, html_content)
+        subject, html_content = _render_checkout_reminder(reserva, usuario, habitacion)
+        return _encolar(usuario.correo, subject, html_content,
+                        key=f'recordatorio-checkout:{reserva.id}:{reserva.check_out}' if dedupe else None)
         
     except Exception as e:
         logger.error(f"Error en send_checkout_reminder: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+
+# ----------------- Envío por lotes ----------------- #
+ESTADOS_NOTIFICABLES = ('Activa', 'Confirmada')
+
+# tipo -> (fecha de la reserva que dispara el correo, preferencia del usuario, render)
+_TIPOS = {
+    'checkin': (Reserva.check_in, Usuario.notif_checkin, _render_checkin),
+    'checkout': (Reserva.check_out, Usuario.notif_checkout, _render_checkout),
+    'recordatorio-checkin': (Reserva.check_in, Usuario.notif_checkin, _render_checkin_reminder),
+    'recordatorio-checkout': (Reserva.check_out, Usuario.notif_checkout, _render_checkout_reminder),
+}
+
+
+def build_notification_batch(tipo: str, dia: date) -> List[Tuple[str, str, str, str]]:
+    """
+    Correos de un tipo para las reservas de `dia` con una sola consulta (reserva, usuario,
+    habitación y datos de hospedaje). Usuarios sin correo o con la notificación desactivada
+    se descartan en SQL.
+    Retorna [(destinatario, asunto, html, clave)]
+    """
+    fecha, preferencia, render = _TIPOS[tipo]
+    filas = (
+        db.session.query(Reserva, Usuario, nuevaHabitacion, ReservaDatosHospedaje)
+        .join(Usuario, Usuario.idUsuario == Reserva.usuario_id)
+        .outerjoin(nuevaHabitacion, nuevaHabitacion.id == Reserva.habitacion_id)
+        .outerjoin(ReservaDatosHospedaje, ReservaDatosHospedaje.reserva_id == Reserva.id)
+        .filter(
+            fecha == dia,
+            Reserva.estado.in_(ESTADOS_NOTIFICABLES),
+            preferencia.is_(True),
+            Usuario.correo.isnot(None),
+            Usuario.correo != '',
+        )
+        .order_by(Reserva.id.asc())
+        .all()
+    )
+    lote = []
+    for reserva, usuario, habitacion, datos_hospedaje in filas:
+        try:
+            subject, html_content = render(reserva, usuario, habitacion, datos_hospedaje)
+        except Exception as e:
+            logger.error(f"No se pudo preparar {tipo} para reserva {reserva.id}: {str(e)}")
+            continue
+        # Misma clave que el envío individual: no se duplica si ambos corren el mismo día
+        clave = f'{tipo}:{reserva.id}:{getattr(reserva, fecha.key)}'
+        lote.append((usuario.correo, subject, html_content, clave))
+    return lote
+
+
+def send_notification_batch(tipo: str, dia: date) -> int:
+    """
+    Arma el lote del día y lo encola en una sola transacción; el worker de la bandeja lo
+    entrega por una sesión SMTP. Retorna cuántos correos se encolaron en esta llamada
+    (los que ya estaban en cola por una ejecución anterior no cuentan).
+    """
+    try:
+        lote = build_notification_batch(tipo, dia)
+        nuevos = email_outbox.enqueue_many(lote)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error en el lote de {tipo} para {dia}: {str(e)}")
+        return 0
+    logger.info(f"Lote {tipo} {dia}: {nuevos} encolados ({len(lote) - nuevos} ya estaban en cola)")
+    return nuevos
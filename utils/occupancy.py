@@ -0,0 +1,102 @@
+"""
+Índice de ocupación en memoria por worker.
+
+Cada habitación y año se representa con un entero de bits (bit i = día i del año
+ocupado), construido de forma perezosa a partir de las reservas no canceladas.
+Las comprobaciones de traslape se vuelven pruebas de rango con AND de bits.
+
+La coherencia entre workers se apoya en el sello 'reservas:<habitacion_id>' de la
+tabla cache_version: quien modifica reservas llama a invalidate() antes de su
+commit y los demás workers reconstruyen la entrada al ver un sello distinto.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from models.baseDatos import db, Reserva
+from utils.cache_version import get_version, bump_version
+
+
+def version_key(habitacion_id: int) -> str:
+    return f"reservas:{habitacion_id}"
+
+
+def _year_bounds(year: int):
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def _range_mask(first: int, last_excl: int) -> int:
+    """Máscara con los bits [first, last_excl) encendidos."""
+    if last_excl <= first:
+        return 0
+    return ((1 << (last_excl - first)) - 1) << first
+
+
+class OccupancyIndex:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # (habitacion_id, year) -> (version, bits)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, habitacion_id: int, year: int) -> int:
+        start, end_excl = _year_bounds(year)
+        rows = (
+            db.session.query(Reserva.check_in, Reserva.check_out)
+            .filter(Reserva.habitacion_id == habitacion_id, Reserva.estado != 'Cancelada')
+            .filter(Reserva.check_in < end_excl)
+            .filter((Reserva.check_out > start) | (Reserva.check_out.is_(None)))
+            .all()
+        )
+        bits = 0
+        for ci, co in rows:
+            # check_out puede ser None; asumir al menos 1 noche (igual que el calendario)
+            co = co or (ci + timedelta(days=1))
+            first = (max(ci, start) - start).days
+            last_excl = (min(co, end_excl) - start).days
+            bits |= _range_mask(first, last_excl)
+        return bits
+
+    def year_bits(self, habitacion_id: int, year: int, version: int = None) -> int:
+        """Bits de ocupación de la habitación para el año (reconstruye si el sello cambió)."""
+        if version is None:
+            version = get_version(version_key(habitacion_id))
+        key = (habitacion_id, year)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        bits = self._build(habitacion_id, year)
+        with self._lock:
+            self._entries[key] = (version, bits)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return bits
+
+    def is_free(self, habitacion_id: int, check_in: date, check_out: date) -> bool:
+        """True si ningún día de [check_in, check_out) está ocupado."""
+        version = get_version(version_key(habitacion_id))
+        cur = check_in
+        while cur < check_out:
+            start, end_excl = _year_bounds(cur.year)
+            seg_end = min(check_out, end_excl)
+            mask = _range_mask((cur - start).days, (seg_end - start).days)
+            if self.year_bits(habitacion_id, cur.year, version) & mask:
+                return False
+            cur = seg_end
+        return True
+
+    def invalidate(self, habitacion_id: int) -> None:
+        """Marca la ocupación de la habitación como modificada.
+
+        Incrementa el sello en la transacción en curso (se confirma con el commit
+        del llamador) y descarta las entradas locales de la habitación.
+        """
+        bump_version(version_key(habitacion_id))
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == habitacion_id]:
+                del self._entries[key]
+
+
+occupancy_index = OccupancyIndex()
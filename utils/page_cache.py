@@ -0,0 +1,137 @@
+"""
+Caché de páginas públicas (home, hospedaje, nosotros, restaurante) para visitantes anónimos.
+
+Estas páginas solo cambian cuando un admin edita posts, habitaciones o platos, pero cada
+visita consultaba la BD y renderizaba la plantilla. Con @page_cache.cached('posts') la
+vista guarda el HTML de sus respuestas 200 en memoria del worker, con clave
+endpoint + query string + sellos de contenido (tabla cache_version, claves 'contenido:*').
+
+- Invalidación: los endpoints de admin llaman a page_cache.invalidate('posts' |
+  'habitaciones' | 'menu') antes de su commit; el sello se incrementa en la misma
+  transacción. Los derivados de imágenes ('imagenes') se consideran en todas las páginas.
+- Cada worker lee los sellos con una sola consulta como mucho cada PAGE_CACHE_VERSION_TTL
+  segundos; un acierto no toca la BD. PAGE_CACHE_TTL acota además la vida de cada entrada
+  (cambios hechos fuera de la app, p. ej. scripts de seed).
+- Solo GET sin sesión de usuario ni mensajes flash pendientes; la respuesta lleva
+  X-Page-Cache: HIT/MISS. La compresión se aplica después, igual que sin caché.
+"""
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request, session
+from models.baseDatos import db
+from utils.cache_version import bump_version, get_versions
+
+logger = logging.getLogger(__name__)
+
+CONTENT_KINDS = ('posts', 'habitaciones', 'menu', 'imagenes')
+
+
+def version_key(kind: str) -> str:
+    return f'contenido:{kind}'
+
+
+class PageCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # clave -> (expira, status, mimetype, cuerpo)
+        self._versions = {}
+        self._versions_expire = 0.0
+        self._lock = threading.Lock()
+
+    def _config(self, name, default):
+        try:
+            return current_app.config.get(name, default)
+        except RuntimeError:
+            return default
+
+    def versions(self) -> dict:
+        """Sellos de contenido, releídos de la BD como mucho una vez por PAGE_CACHE_VERSION_TTL."""
+        now = time.monotonic()
+        if now >= self._versions_expire:
+            with self._lock:
+                if now >= self._versions_expire:
+                    try:
+                        self._versions = get_versions(version_key(k) for k in CONTENT_KINDS)
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.warning('No se pudieron leer los sellos de contenido: %s', e)
+                        self._versions = {}
+                    self._versions_expire = now + float(self._config('PAGE_CACHE_VERSION_TTL', 5))
+        return self._versions
+
+    def content_version(self, kind: str) -> int:
+        return self.versions().get(version_key(kind), 0)
+
+    def _cacheable_request(self) -> bool:
+        if request.method != 'GET' or not self._config('PAGE_CACHE', True):
+            return False
+        # Con sesión iniciada o flashes pendientes el HTML deja de ser común a todos
+        return not session.get('user') and not session.get('_flashes')
+
+    def _key(self, kinds):
+        versions = self.versions()
+        args = tuple(sorted(request.args.items(multi=True)))
+        return (request.endpoint, args) + tuple(versions.get(version_key(k), 0) for k in kinds)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, status: int, mimetype: str, body: bytes) -> None:
+        expires = time.monotonic() + float(self._config('PAGE_CACHE_TTL', 300))
+        with self._lock:
+            self._entries[key] = (expires, status, mimetype, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, *kinds):
+        """Decorador de vista: sirve desde memoria mientras no cambien los sellos de `kinds`."""
+        kinds = tuple(kinds) + ('imagenes',)
+        for k in kinds:
+            if k not in CONTENT_KINDS:
+                raise ValueError(f'Tipo de contenido desconocido: {k}')
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._cacheable_request():
+                    return view(*args, **kwargs)
+                key = self._key(kinds)
+                hit = self.get(key)
+                if hit is not None:
+                    _, status, mimetype, body = hit
+                    response = current_app.response_class(body, status=status, mimetype=mimetype)
+                    response.headers['X-Page-Cache'] = 'HIT'
+                    return response
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed and response.mimetype == 'text/html':
+                    self.put(key, response.status_code, response.mimetype, response.get_data())
+                    response.headers['X-Page-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, kind: str) -> None:
+        """Llamar antes del commit del cambio: incrementa el sello de `kind` en esa transacción."""
+        bump_version(version_key(kind))
+        # En este worker, releer los sellos en la próxima petición (ya confirmados)
+        self._versions_expire = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self._versions_expire = 0.0
+
+
+page_cache = PageCache()
@@ -0,0 +1,101 @@
+"""
+Catálogo de habitaciones en memoria por worker (modelo de lectura).
+
+Las vistas de hospedaje (pública, usuario y admin) consumen una instantánea inmutable:
+habitaciones como RoomView congeladas, agrupadas por plan en orden canónico
+(Oro, Plata, Bronce, otros planes alfabéticamente, 'Sin plan' al final; dentro de cada
+plan por número, nombre e id) y con un índice de búsqueda de texto ya construido.
+
+La instantánea se reconstruye cuando cambia el sello 'contenido:habitaciones' de
+cache_version, que los endpoints de admin incrementan antes de su commit
+(page_cache.invalidate('habitaciones')). El sello se lee con el TTL de la caché de
+páginas (ver utils/versioned_snapshot.py): una vista servida desde la instantánea no
+consulta la BD.
+"""
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Optional, Tuple
+from models.baseDatos import db, nuevaHabitacion
+from utils.versioned_snapshot import VersionedSnapshot
+
+PLAN_ORDER = ('Oro', 'Plata', 'Bronce')
+NO_PLAN = 'Sin plan'
+
+
+@dataclass(frozen=True)
+class RoomView:
+    """Copia de solo lectura de una fila de nuevaHabitacion (mismos nombres de atributo)."""
+    id: int
+    nombre: str
+    plan: Optional[str]
+    numero: Optional[int]
+    descripcion: Optional[str]
+    caracteristicas: Optional[str]
+    precio: float
+    estado: str
+    cupo_personas: int
+    imagen: Optional[str]
+    model3d: Optional[str]
+
+    @classmethod
+    def from_model(cls, h):
+        return cls(**{f.name: getattr(h, f.name) for f in fields(cls)})
+
+    @property
+    def plan_label(self) -> str:
+        return (self.plan or '').strip() or NO_PLAN
+
+
+def _room_sort_key(r: RoomView):
+    return (r.numero is None, r.numero or 0, (r.nombre or '').lower(), r.id)
+
+
+def _plan_sort_key(plan: str):
+    if plan in PLAN_ORDER:
+        return (0, PLAN_ORDER.index(plan), '')
+    return (2, 0, '') if plan == NO_PLAN else (1, 0, plan.lower())
+
+
+class RoomSnapshot:
+    """Estado inmutable del catálogo para un sello dado."""
+
+    def __init__(self, version: int, rooms):
+        self.version = version
+        groups = {}
+        for r in sorted(rooms, key=_room_sort_key):
+            groups.setdefault(r.plan_label, []).append(r)
+        self.plan_order: Tuple[str, ...] = tuple(sorted(groups, key=_plan_sort_key))
+        self.by_plan = MappingProxyType({p: tuple(groups[p]) for p in self.plan_order})
+        self.rooms: Tuple[RoomView, ...] = tuple(r for p in self.plan_order for r in self.by_plan[p])
+        self.by_id = MappingProxyType({r.id: r for r in self.rooms})
+        # Texto normalizado por habitación para la búsqueda del panel (nombre, plan, estado)
+        self._search = tuple(
+            (' | '.join(((r.nombre or '').lower(), (r.plan or '').lower(), (r.estado or '').lower())), r)
+            for r in self.rooms
+        )
+
+    def search(self, q: str) -> Tuple[RoomView, ...]:
+        q = (q or '').strip().lower()
+        if not q:
+            return self.rooms
+        return tuple(r for text, r in self._search if q in text)
+
+    def grouped(self, rooms=None):
+        """(habitaciones_por_plan, plan_order) de un subconjunto en el orden canónico."""
+        if rooms is None:
+            return self.by_plan, self.plan_order
+        ids = {r.id for r in rooms}
+        by_plan = {p: tuple(r for r in self.by_plan[p] if r.id in ids) for p in self.plan_order}
+        order = tuple(p for p in self.plan_order if by_plan[p])
+        return MappingProxyType({p: by_plan[p] for p in order}), order
+
+
+class RoomCatalog(VersionedSnapshot):
+    kind = 'habitaciones'
+
+    def _load(self, version: int) -> RoomSnapshot:
+        rows = db.session.query(nuevaHabitacion).all()
+        return RoomSnapshot(version, [RoomView.from_model(h) for h in rows])
+
+
+room_catalog = RoomCatalog()
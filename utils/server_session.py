@@ -0,0 +1,258 @@
+"""
+Sesiones del lado del servidor.
+
+La cookie 'session' de Flask guardaba todo el dict firmado (usuario, flashes, carrito del
+restaurante...) y viajaba en cada petición, incluidas las de estáticos; al crecer
+provocaba los 400 por cookies demasiado grandes (ver handle_bad_request en run.py).
+Con SESSION_BACKEND la cookie solo lleva un identificador opaco aleatorio y los datos
+quedan en el servidor:
+
+- 'db' (por defecto): tabla server_session (sid, datos, expira). Lee y escribe con su
+  propia conexión, sin tocar la transacción de la vista.
+- 'filesystem': un archivo por sesión en SESSION_FILE_DIR (instance/sessions); la
+  expiración es el mtime del archivo. Requiere un volumen compartido entre workers.
+- 'cookie': la sesión firmada de Flask de siempre.
+
+Solo se escribe cuando la sesión cambió (o le queda menos de la mitad de vida). Las
+sesiones vencidas se barren como mucho cada SESSION_SWEEP_INTERVAL segundos por worker.
+Las peticiones a /static no abren sesión. Cuando cambia el usuario de la sesión (login,
+logout, cambio de cuenta) se emite un identificador nuevo para evitar fijación de sesión.
+"""
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import CallbackDict
+from models.baseDatos import db, SessionRecord
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('db', 'filesystem', 'cookie')
+_SID_RE = re.compile(r'^[A-Za-z0-9_-]{32,64}$')
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, expira=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expira = expira
+        self.modified = False
+        # Usuario con el que se abrió: si cambia al guardar se rota el sid
+        self.user_id = _user_id(self)
+
+
+def _user_id(data):
+    user = data.get('user') if data else None
+    return user.get('id') if isinstance(user, dict) else None
+
+
+class DbSessionStore:
+    """Sesiones en la tabla server_session."""
+
+    def __init__(self):
+        self.table = SessionRecord.__table__
+
+    def load(self, sid):
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                self.table.select().with_only_columns(self.table.c.datos, self.table.c.expira)
+                .where(self.table.c.sid == sid)
+            ).first()
+        if row is None or row.expira <= datetime.utcnow():
+            return None
+        return row.datos, row.expira
+
+    def save(self, sid, datos: str, expira: datetime):
+        t = self.table
+        with db.engine.begin() as conn:
+            updated = conn.execute(t.update().where(t.c.sid == sid).values(datos=datos, expira=expira)).rowcount
+            if not updated:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(t.insert().values(sid=sid, datos=datos, expira=expira))
+                except IntegrityError:
+                    conn.execute(t.update().where(t.c.sid == sid).values(datos=datos, expira=expira))
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.sid == sid))
+
+    def sweep(self) -> int:
+        with db.engine.begin() as conn:
+            return conn.execute(self.table.delete().where(self.table.c.expira < datetime.utcnow())).rowcount or 0
+
+
+class FileSessionStore:
+    """Un archivo por sesión; el mtime del archivo es la fecha de expiración."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, sid)
+
+    def load(self, sid):
+        path = self._path(sid)
+        try:
+            expira_ts = os.path.getmtime(path)
+            if expira_ts <= time.time():
+                return None
+            with open(path, 'r', encoding='utf-8') as fh:
+                return fh.read(), datetime.fromtimestamp(expira_ts, timezone.utc).replace(tzinfo=None)
+        except OSError:
+            return None
+
+    def save(self, sid, datos: str, expira: datetime):
+        path = self._path(sid)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            fh.write(datos)
+        ts = (expira - datetime(1970, 1, 1)).total_seconds()
+        os.utime(tmp, (ts, ts))
+        os.replace(tmp, path)
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except OSError:
+            pass
+
+    def sweep(self) -> int:
+        now = time.time()
+        removed = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < now and not entry.name.endswith('.tmp'):
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSession
+
+    def __init__(self, store, sweep_interval: int = 300):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def _lifetime(self, app) -> timedelta:
+        return app.permanent_session_lifetime
+
+    def open_session(self, app, request):
+        static_prefix = (app.static_url_path or '/static').rstrip('/') + '/'
+        if request.path.startswith(static_prefix):
+            # Estáticos: nunca leen ni escriben la sesión
+            return self.make_null_session(app)
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and _SID_RE.match(sid):
+            try:
+                found = self.store.load(sid)
+            except Exception as e:
+                logger.warning('No se pudo leer la sesión del servidor: %s', e)
+                found = None
+            if found is not None:
+                datos, expira = found
+                try:
+                    return self.session_class(self.serializer.loads(datos), sid=sid, expira=expira)
+                except Exception as e:
+                    logger.warning('Sesión ilegible, se descarta: %s', e)
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            removed = self.store.sweep()
+            if removed:
+                logger.info('Sesiones vencidas eliminadas: %d', removed)
+        except Exception as e:
+            logger.warning('No se pudieron barrer sesiones vencidas: %s', e)
+        finally:
+            self._sweep_lock.release()
+
+    def save_session(self, app, session, response):
+        if not isinstance(session, ServerSession):
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            # Sesión vacía: borrar el registro (logout) y la cookie si existían
+            if not session.new:
+                try:
+                    self.store.delete(session.sid)
+                except Exception as e:
+                    logger.warning('No se pudo borrar la sesión del servidor: %s', e)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app))
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        lifetime = self._lifetime(app)
+        now = datetime.utcnow()
+        rotate = not session.new and _user_id(session) != session.user_id
+        touch = session.expira is not None and session.expira - now < lifetime / 2
+        if not (session.new or session.modified or rotate or touch):
+            return
+
+        old_sid = session.sid
+        if rotate:
+            session.sid = secrets.token_urlsafe(32)
+        expira = now + lifetime
+        try:
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), expira)
+            if rotate:
+                self.store.delete(old_sid)
+        except Exception as e:
+            logger.warning('No se pudo guardar la sesión del servidor: %s', e)
+            return
+        session.expira = expira
+
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            partitioned=self.get_cookie_partitioned(app),
+        )
+        self._maybe_sweep()
+
+
+def init_server_session(app) -> None:
+    """Instala el backend de sesiones configurado en SESSION_BACKEND."""
+    backend = (app.config.get('SESSION_BACKEND') or 'db').strip().lower()
+    if backend not in BACKENDS:
+        logger.warning('SESSION_BACKEND desconocido (%s); se usa la cookie firmada', backend)
+        return
+    if backend == 'cookie':
+        return
+    if backend == 'filesystem':
+        directory = app.config.get('SESSION_FILE_DIR') or os.path.join(app.root_path, 'instance', 'sessions')
+        store = FileSessionStore(directory)
+    else:
+        store = DbSessionStore()
+    app.session_interface = ServerSideSessionInterface(store, int(app.config.get('SESSION_SWEEP_INTERVAL', 300)))
+    logger.info('Sesiones del lado del servidor: %s', backend)
@@ -0,0 +1,110 @@
+"""
+Medición del arranque de la aplicación.
+
+- StartupTiming: tiempos por fase de create_app() (se guarda en
+  app.extensions['startup_timing'] y se resume en el log al terminar).
+- import_cost_report(): costo de importación por paquete medido en un proceso
+  nuevo con `python -X importtime`, para ver el arranque en frío real (dentro
+  de un worker los módulos ya están importados y su costo sería 0).
+
+Se consulta con `python scripts/startup_report.py`; /health muestra a los
+administradores solo las fases ya medidas (el costo de imports lanza un proceso
+nuevo y no debe correr dentro de un worker).
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# Paquetes de terceros cuyo costo de importación interesa vigilar
+HEAVY_PACKAGES = (
+    'reportlab', 'openpyxl', 'authlib', 'mercadopago', 'numpy', 'PIL',
+    'requests', 'sqlalchemy', 'flask', 'jinja2', 'werkzeug', 'pymysql',
+)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTiming:
+    def __init__(self):
+        self.phases = []  # [(nombre, ms)] en orden de ejecución
+        self.started_at = time.time()
+
+    def add(self, name: str, ms: float) -> None:
+        self.phases.append((name, round(ms, 2)))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(ms for _, ms in self.phases), 2)
+
+    def as_dict(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'total_ms': self.total_ms,
+            'phases': [{'name': n, 'ms': ms} for n, ms in self.phases],
+        }
+
+    def summary(self) -> str:
+        parts = ', '.join(f'{n}={ms:.0f}ms' for n, ms in self.phases)
+        return f'{self.total_ms:.0f} ms ({parts})'
+
+
+def parse_importtime(stderr: str, packages=HEAVY_PACKAGES, top: int = 15) -> dict:
+    """Agrega la salida de -X importtime: tiempo propio por paquete y los módulos más caros."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, rest = line.split(':', 1)
+            self_us, cumulative_us, name = rest.split('|', 2)
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    by_package = {}
+    for pkg in packages:
+        own = [m for m in modules if m[0] == pkg or m[0].startswith(pkg + '.')]
+        if own:
+            by_package[pkg] = {'ms': round(sum(m[1] for m in own) / 1000, 2), 'modules': len(own)}
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        'total_ms': round(sum(m[1] for m in modules) / 1000, 2),
+        'modules': len(modules),
+        'packages': dict(sorted(by_package.items(), key=lambda kv: kv[1]['ms'], reverse=True)),
+        'slowest': [{'module': n, 'self_ms': round(s / 1000, 2), 'cumulative_ms': round(c / 1000, 2)} for n, s, c in slowest],
+    }
+
+
+def import_cost_report(timeout: int = 120) -> dict:
+    """Arranca la app en un proceso nuevo con -X importtime y devuelve fases + costo de imports."""
+    code = (
+        'import json, run\n'
+        'app = run.get_app()\n'
+        "print('STARTUP_JSON=' + json.dumps(app.extensions['startup_timing'].as_dict()))\n"
+    )
+    env = dict(os.environ)
+    # La medición no debe aplicar migraciones ni depender del candado
+    env['MIGRATE_ON_BOOT'] = '0'
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=_PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    startup = None
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP_JSON='):
+            startup = json.loads(line[len('STARTUP_JSON='):])
+    report = parse_importtime(proc.stderr)
+    report['startup'] = startup
+    report['returncode'] = proc.returncode
+    return report
@@ -0,0 +1,141 @@
+"""
+Archivos estáticos con huella de contenido (fingerprinting).
+
+`python scripts/build_static.py` copia cada archivo de static/ a static/dist/ con el hash
+de su contenido en el nombre (Styles.css -> dist/Styles.3f9a1c0b2d.css) y escribe
+static/dist/manifest.json con la correspondencia. Al arrancar, init_static_assets():
+
+- lee el manifiesto y registra un url_defaults para el endpoint 'static', de modo que
+  url_for('static', filename='Styles.css') (y asset_url en plantillas) devuelve la
+  versión con hash sin cambiar las plantillas;
+- responde los archivos de static/dist/ con Cache-Control público de un año e
+  `immutable`: como el nombre cambia con el contenido, el navegador no revalida.
+
+El build también deja hermanos .br/.gz de los archivos de texto (ver utils/compression.py).
+
+Sin manifiesto (desarrollo, o STATIC_FINGERPRINT=0) todo sigue como antes.
+Las subidas de usuarios (img/uploads, img/avatars) no se incluyen: cambian en caliente.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from flask import request, url_for
+from utils import compression
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+# Rutas relativas a static/ que no se versionan
+EXCLUDE_DIRS = (DIST_DIR, 'img/uploads', 'img/avatars')
+HASH_LEN = 10
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LEN]
+
+
+def _hashed_name(rel: str, digest: str) -> str:
+    base, ext = os.path.splitext(rel)
+    return f'{base}.{digest}{ext}'
+
+
+def iter_sources(static_dir: str):
+    """Rutas relativas (con '/') de los archivos a versionar."""
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir).replace(os.sep, '/')
+        rel_root = '' if rel_root == '.' else rel_root
+        dirs[:] = sorted(d for d in dirs if f'{rel_root}/{d}'.lstrip('/') not in EXCLUDE_DIRS)
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            yield f'{rel_root}/{name}'.lstrip('/')
+
+
+def build(static_dir: str, prune: bool = True, precompress: bool = True) -> dict:
+    """Genera static/dist y su manifiesto. Devuelve el manifiesto {original: 'dist/<con hash>'}."""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    manifest = {}
+    siblings = set()
+    for rel in iter_sources(static_dir):
+        src = os.path.join(static_dir, rel)
+        hashed = _hashed_name(rel, _file_hash(src))
+        dst = os.path.join(dist_dir, hashed)
+        if not os.path.isfile(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                # Enlace duro si se puede (no duplica los ~16 MB de imágenes)
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+        manifest[rel] = f'{DIST_DIR}/{hashed}'
+        if precompress and dst.lower().endswith(compression.PRECOMPRESS_EXTENSIONS):
+            # Hermanos .br/.gz que la vista static entrega si el cliente los acepta
+            siblings.update(os.path.normpath(p) for p in compression.precompress_file(dst))
+
+    os.makedirs(dist_dir, exist_ok=True)
+    tmp = os.path.join(dist_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp, os.path.join(dist_dir, MANIFEST_NAME))
+
+    if prune:
+        keep = {os.path.normpath(os.path.join(static_dir, v)) for v in manifest.values()}
+        keep.add(os.path.normpath(os.path.join(dist_dir, MANIFEST_NAME)))
+        keep.update(siblings)
+        for root, _, files in os.walk(dist_dir):
+            for name in files:
+                path = os.path.normpath(os.path.join(root, name))
+                if path not in keep:
+                    os.remove(path)
+    return manifest
+
+
+def load_manifest(static_dir: str) -> dict:
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning('Manifiesto de estáticos ilegible, se sirven sin huella: %s', e)
+        return {}
+
+
+def asset_url(filename: str, **kwargs) -> str:
+    """url_for('static', ...) con la versión con hash si está en el manifiesto."""
+    return url_for('static', filename=filename, **kwargs)
+
+
+def init_static_assets(app) -> None:
+    manifest = load_manifest(app.static_folder) if app.config.get('STATIC_FINGERPRINT', True) else {}
+    app.extensions['static_manifest'] = manifest
+    app.add_template_global(asset_url)
+    if not manifest:
+        return
+    logger.info('Estáticos con huella: %d archivos en el manifiesto', len(manifest))
+
+    @app.url_defaults
+    def _fingerprint_static(endpoint, values):
+        if endpoint == 'static':
+            hashed = manifest.get(values.get('filename'))
+            if hashed:
+                values['filename'] = hashed
+
+    @app.after_request
+    def _immutable_static(response):
+        if request.endpoint == 'static' and response.status_code in (200, 206, 304):
+            filename = (request.view_args or {}).get('filename') or ''
+            if filename.startswith(DIST_DIR + '/'):
+                response.cache_control.public = True
+                response.cache_control.max_age = IMMUTABLE_MAX_AGE
+                response.cache_control.immutable = True
+                response.cache_control.no_cache = None
+        return response
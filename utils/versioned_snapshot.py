@@ -0,0 +1,42 @@
+"""
+Instantáneas inmutables por worker que siguen un sello de contenido (modelo de lectura).
+
+Base común de los catálogos en memoria (utils/room_catalog.py, utils/menu_catalog.py):
+la subclase indica el tipo de contenido de page_cache ('habitaciones', 'menu', ...) e
+implementa _load(version), que arma la instantánea con un atributo `version`.
+
+Regla de vigencia, la misma que la caché de páginas: el sello 'contenido:<tipo>' se lee
+de page_cache.content_version(), que consulta cache_version como mucho una vez por
+PAGE_CACHE_VERSION_TTL segundos. Una lectura vigente no toca la BD. Los endpoints de admin
+llaman a page_cache.invalidate(<tipo>) antes del commit, lo que además fuerza releer los
+sellos en su propio worker; los demás workers ven el cambio al vencer el TTL, igual que
+las páginas en caché que muestran el mismo contenido.
+"""
+import threading
+from utils.page_cache import page_cache
+
+
+class VersionedSnapshot:
+    kind = None  # tipo de contenido de page_cache (CONTENT_KINDS)
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _load(self, version: int):
+        raise NotImplementedError
+
+    def snapshot(self):
+        """Instantánea vigente (se reconstruye, una sola vez por worker, si el sello cambió)."""
+        version = page_cache.content_version(self.kind)
+        current = self._snapshot
+        if current is not None and current.version == version:
+            return current
+        with self._lock:
+            current = self._snapshot
+            if current is None or current.version != version:
+                current = self._snapshot = self._load(version)
+        return current
+
+    def invalidate(self) -> None:
+        self._snapshot = None